@@ -11,3 +11,15 @@ admin.site.register(OTP)
 admin.site.register(EmployeePosition)
 admin.site.register(BlacklistedToken)
 admin.site.register(Attendance)
+admin.site.register(CourseRatingSummary)
+admin.site.register(UploadSession)
+admin.site.register(UserImportJob)
+admin.site.register(AttendanceRollup)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    # Bodies can carry an initial password or a password-reset code.
+    exclude = ("body",)
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
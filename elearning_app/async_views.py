@@ -0,0 +1,137 @@
+"""
+ASGI-native versions of the UsersView authentication actions.
+
+The ORM is used through its async API and PBKDF2 runs on a bounded thread
+pool (hashlib releases the GIL while hashing), so a single ASGI worker can
+keep many slow logins in flight without blocking its event loop.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .mail import queue_mail
+from .models import User
+from .otp_store import get_otp_store, normalize_email
+from .throttling import throttle
+
+_hashing_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PASSWORD_HASHING_WORKERS", None) or os.cpu_count(),
+    thread_name_prefix="password-hashing",
+)
+
+
+async def run_hashing(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hashing_executor, func, *args)
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _message(message, status=400):
+    return JsonResponse({"message": message}, status=status)
+
+
+@csrf_exempt
+@require_POST
+@throttle("login")
+async def login_view(request):
+    data = _json_body(request)
+    if data is None:
+        return _message("Invalid Credentials")
+    email = str(data.get("email") or "").lower()
+    password = data.get("password")
+    user = await User.objects.filter(email=email).afirst()
+    if user is None or not password:
+        return _message("Invalid Credentials")
+    if not await run_hashing(check_password, password, user.password):
+        return _message("Invalid Credentials")
+    access_token = AccessToken.for_user(user)
+    expires_in_datetime = datetime.fromtimestamp(access_token.payload["exp"])
+    return JsonResponse(
+        {
+            "user": user.id,
+            "access_token": str(access_token),
+            "expires_in": int((expires_in_datetime - datetime.now()).total_seconds()),
+            "type": user.user_type,
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+@throttle("register")
+async def register(request):
+    data = _json_body(request)
+    if data is None:
+        return _message("An unexpected error occurred")
+    email = User.objects.normalize_email(data.get("email") or "")
+    password = data.get("password")
+    errors = {}
+    try:
+        validate_email(email)
+    except ValidationError:
+        errors["email"] = ["Enter a valid email address."]
+    if not password:
+        errors["password"] = ["This field is required."]
+    if errors:
+        return JsonResponse(errors, status=400)
+    if await User.objects.filter(email=email).aexists():
+        return _message("Email already exists")
+    user = User(email=email, password=await run_hashing(make_password, password))
+    try:
+        await user.asave()
+    except IntegrityError:
+        return _message("Email already exists")
+    return _message("User Added Successfully", status=201)
+
+
+@csrf_exempt
+@require_POST
+@throttle("send_otp")
+async def send_otp(request):
+    data = _json_body(request) or {}
+    email = normalize_email(str(data.get("email") or ""))
+    if not email or not await User.objects.filter(email=email).aexists():
+        return _message("You are not a registered user")
+    otp = await get_otp_store().aissue_code(email)
+    await sync_to_async(queue_mail)(
+        "Password Reset OTP",
+        f"Your OTP for password reset is: {otp}",
+        settings.EMAIL_HOST_USER,
+        [email],
+    )
+    return _message("OTP sent successfully.", status=200)
+
+
+@csrf_exempt
+@require_POST
+@throttle("verify_otp")
+async def verify_otp(request):
+    data = _json_body(request) or {}
+    email = normalize_email(str(data.get("email") or ""))
+    otp = data.get("otp")
+    if not email or not otp:
+        return _message("Failed to verify OTP. Please try again later.")
+    token = await get_otp_store().averify_code(email, str(otp))
+    if token is None:
+        return _message("Invalid OTP.")
+    return JsonResponse({"message": "OTP verified successfully.", "token": token})
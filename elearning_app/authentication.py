@@ -0,0 +1,176 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import BlacklistedToken
+
+REVOCATION_DEFAULTS = {
+    "CAPACITY": 100000,
+    "ERROR_RATE": 0.001,
+    "SYNC_INTERVAL": 5,
+    "SYNC_OVERLAP": 60,
+    "PURGE_INTERVAL": 3600,
+    "CONFIRMED_CACHE_SIZE": 10000,
+}
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings. Lookups never miss a key that was
+    added; false positives happen at roughly ``error_rate`` once ``capacity``
+    keys are stored.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationCache:
+    """
+    In-process view of BlacklistedToken keyed by jti.
+
+    Tokens that are not in the bloom filter are accepted without touching the
+    database. Bloom hits are confirmed with one indexed lookup and remembered,
+    so only revoked tokens and rare false positives cost a query. New rows are
+    pulled in every SYNC_INTERVAL seconds; every PURGE_INTERVAL seconds expired
+    rows are deleted and the filter is rebuilt without them. A SYNC_INTERVAL
+    of None keeps the cache purely in memory.
+
+    created_at is stamped by the writing process before its transaction
+    commits, so a row can become visible with a created_at older than rows
+    already seen. Each sync therefore re-reads the last SYNC_OVERLAP seconds;
+    it should exceed the longest transaction plus clock skew between hosts.
+    """
+
+    def __init__(self, options=None):
+        options = {**REVOCATION_DEFAULTS, **(options or {})}
+        self.capacity = options["CAPACITY"]
+        self.error_rate = options["ERROR_RATE"]
+        self.sync_interval = options["SYNC_INTERVAL"]
+        self.sync_overlap = timedelta(seconds=options["SYNC_OVERLAP"])
+        self.purge_interval = options["PURGE_INTERVAL"]
+        self.confirmed_cache_size = options["CONFIRMED_CACHE_SIZE"]
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._confirmed = {}
+        self._synced_at = None
+        self._purged_at = None
+        self._high_water = None
+
+    def add(self, jti, expires_at=None):
+        self._bloom.add(jti)
+        if expires_at is not None:
+            self._remember(jti, expires_at.timestamp())
+
+    def is_revoked(self, jti):
+        self._refresh()
+        if jti not in self._bloom:
+            return False
+        expires = self._confirmed.get(jti)
+        if expires is None:
+            expires_at = (
+                BlacklistedToken.objects.filter(jti=jti)
+                .values_list("expires_at", flat=True)
+                .first()
+            )
+            # 0 marks a confirmed bloom false positive.
+            expires = expires_at.timestamp() if expires_at else 0
+            self._remember(jti, expires)
+        return expires > time.time()
+
+    def _remember(self, jti, expires):
+        if len(self._confirmed) >= self.confirmed_cache_size:
+            self._confirmed.clear()
+        self._confirmed[jti] = expires
+
+    def _refresh(self):
+        if self.sync_interval is None:
+            return
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+                self._rebuild()
+                self._purged_at = now
+            else:
+                self._sync()
+            self._synced_at = now
+        finally:
+            self._lock.release()
+
+    def _sync(self):
+        rows = BlacklistedToken.objects.filter(jti__isnull=False)
+        if self._high_water is not None:
+            rows = rows.filter(created_at__gte=self._high_water - self.sync_overlap)
+        rows = rows.values_list("jti", "created_at", "expires_at")
+        for jti, created_at, expires_at in rows.iterator():
+            self._bloom.add(jti)
+            if jti in self._confirmed:
+                # May have been cached as a false positive before this row existed.
+                self._confirmed[jti] = expires_at.timestamp() if expires_at else 0
+            if created_at and (self._high_water is None or created_at > self._high_water):
+                self._high_water = created_at
+
+    def _rebuild(self):
+        purge_expired_tokens()
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._confirmed = {}
+        self._high_water = None
+        self._sync()
+
+
+def purge_expired_tokens():
+    deleted, _ = BlacklistedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def token_expiry(token):
+    return datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc)
+
+
+revocation_cache = RevocationCache(getattr(settings, "TOKEN_REVOCATION", None))
+
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also rejects access tokens revoked through logout.
+    """
+
+    revocation_cache = revocation_cache
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti and self.revocation_cache.is_revoked(jti):
+            raise InvalidToken({"detail": "Token has been revoked", "code": "token_revoked"})
+        return validated_token
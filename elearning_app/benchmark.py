@@ -0,0 +1,63 @@
+"""
+Small timing helpers shared by the bench_* management commands.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Summarize a list of durations in seconds as microsecond statistics."""
+    return {
+        "count": len(samples),
+        "mean_us": sum(samples) / len(samples) * 1e6 if samples else 0.0,
+        "p50_us": percentile(samples, 0.50) * 1e6,
+        "p95_us": percentile(samples, 0.95) * 1e6,
+        "p99_us": percentile(samples, 0.99) * 1e6,
+    }
+
+
+def time_calls(func, iterations, *args):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def format_summary(name, summary, unit="us"):
+    scale = 1000.0 if unit == "ms" else 1.0
+    return (
+        f"{name:<40} n={summary['count']:<7} "
+        f"mean={summary['mean_us'] / scale:9.2f}{unit} "
+        f"p50={summary['p50_us'] / scale:9.2f}{unit} "
+        f"p95={summary['p95_us'] / scale:9.2f}{unit} "
+        f"p99={summary['p99_us'] / scale:9.2f}{unit}"
+    )
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Run the block against a freshly migrated throwaway test database, the same
+    one ``manage.py test`` would create, and drop it afterwards.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
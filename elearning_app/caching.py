@@ -0,0 +1,161 @@
+"""
+Versioned response cache for read-mostly viewsets.
+
+Every cached model has a version counter in the cache, and each response key
+embeds the current versions of the models it was built from. Saving or
+deleting a row bumps the model's counter (see signals.py), and so do
+QuerySet.update(), bulk_create() and bulk_update() through VersionedQuerySet,
+which makes every older entry unreachable without scanning or deleting keys;
+they simply age out.
+
+The counters must be seen by every worker, so the cache is only used when
+RESPONSE_CACHE_ENABLED is set and RESPONSE_CACHE_ALIAS names a shared
+backend (memcached, redis, file-based). On a per-process locmem cache,
+responses are never cached.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+KEY_PREFIX = "response-cache"
+STATS = ("hits", "misses")
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def is_shared(cache):
+    """locmem caches live inside one process, so other workers never see their writes."""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def is_enabled():
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", False) and is_shared(get_cache())
+
+
+def version_key(model):
+    return f"{KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def _initial_version():
+    # A counter that was evicted must not restart at a value older entries
+    # were stored under, so fresh counters start from the clock.
+    return time.time_ns()
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    cache = get_cache()
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def bump_version_on_commit(model):
+    # Bump after commit so a concurrent reader can never cache the old rows
+    # under the new version.
+    transaction.on_commit(lambda: bump_version(model))
+
+
+class VersionedQuerySet(models.QuerySet):
+    """QuerySet for cached models; bumps the version on writes that send no signals."""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_version_on_commit(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            bump_version_on_commit(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            bump_version_on_commit(self.model)
+        return rows
+
+
+def _count(stat):
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:stats:{stat}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    values = cache.get_many([f"{KEY_PREFIX}:stats:{stat}" for stat in STATS])
+    stats = {stat: values.get(f"{KEY_PREFIX}:stats:{stat}", 0) for stat in STATS}
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0
+    return stats
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list`` and ``retrieve`` from the cache. ``cache_models`` lists
+    every model the serialized data is read from; responses are shared by all
+    users who pass the viewset's permission checks. Each of those models must
+    use VersionedQuerySet as its manager.
+    """
+
+    cache_models = ()
+    cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        versions = get_versions(self.cache_models or (self.queryset.model,))
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        version = ".".join(str(value) for value in versions)
+        return f"{KEY_PREFIX}:{type(self).__name__}:{self.action}:{version}:{path}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not is_enabled():
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _count("hits")
+            return Response(data, headers={"X-Cache": "HIT"})
+        _count("misses")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            timeout = self.cache_timeout
+            if timeout is None:
+                timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+            cache.set(key, response.data, timeout)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from . import caching, throttling
+
+
+@register()
+def check_response_cache(app_configs, **kwargs):
+    if not getattr(settings, "RESPONSE_CACHE_ENABLED", False) or caching.is_shared(caching.get_cache()):
+        return []
+    return [
+        Warning(
+            "The response cache is per-process, so cached responses are disabled.",
+            hint="Point RESPONSE_CACHE_ALIAS at a shared cache (memcached, redis or file-based).",
+            id="elearning_app.W001",
+        )
+    ]
+
+
+# A deploy check: local runs on the default locmem cache are expected.
+@register(deploy=True)
+def check_throttle_cache(app_configs, **kwargs):
+    if not getattr(settings, "THROTTLE_ENABLED", True) or caching.is_shared(throttling.get_cache()):
+        return []
+    return [
+        Warning(
+            "Throttle quotas are counted per-process, so each worker allows the full rate.",
+            hint="Point THROTTLE_CACHE_ALIAS at a shared cache (memcached, redis or file-based).",
+            id="elearning_app.W002",
+        )
+    ]
@@ -0,0 +1,285 @@
+"""
+Deterministic synthetic datasets for benchmarks and load tests.
+
+The same size and ``seed`` always produce the same rows, primary keys
+included, so benchmark runs on different commits measure the same data.
+Rows are generated lazily and written with bulk_create in batches (or COPY
+on Postgres with psycopg 3), and every synthetic user shares one precomputed
+password hash, so seeding is bound by I/O rather than PBKDF2.
+"""
+import io
+import random
+import time
+import uuid
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import (
+    Attendance,
+    ClassDetails,
+    CourseDetails,
+    CourseRating,
+    CourseSection,
+    CourseSubSection,
+    EmployeePosition,
+    User,
+)
+
+PASSWORD = "bench-password"
+EMPLOYEE_TYPES = ["teacher", "admin", "other", "driver"]
+
+SIZES = {
+    "small": {
+        "classes": 5,
+        "students": 500,
+        "employees": 50,
+        "courses": 20,
+        "sections": 3,
+        "subsections": 3,
+        "attendance_days": 10,
+        "ratings": 2,
+    },
+    "medium": {
+        "classes": 20,
+        "students": 5000,
+        "employees": 200,
+        "courses": 100,
+        "sections": 5,
+        "subsections": 4,
+        "attendance_days": 5,
+        "ratings": 3,
+    },
+    "large": {
+        "classes": 50,
+        "students": 20000,
+        "employees": 500,
+        "courses": 250,
+        "sections": 5,
+        "subsections": 5,
+        "attendance_days": 5,
+        "ratings": 3,
+    },
+    "scale": {
+        "classes": 200,
+        "students": 100000,
+        "employees": 2000,
+        "courses": 2000,
+        "sections": 5,
+        "subsections": 4,
+        "attendance_days": 2,
+        "ratings": 10,
+    },
+}
+
+
+class Dataset:
+    """Ids of the seeded rows that benchmarks need to build requests."""
+
+    def __init__(self, size, seed, counts):
+        self.size = size
+        self.seed = seed
+        self.counts = counts
+        self.admin = None
+        self.student = None
+        self.classes = []
+        self.positions = []
+        self.courses = []
+        self.sections = []
+        self.subsections = []
+        self.students = []
+        self.employees = []
+        self.report = []
+
+
+def can_copy():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy")
+
+
+def copy_insert(model, rows):
+    """Stream unsaved instances into the model's table with COPY FROM STDIN."""
+    fields = [
+        field for field in model._meta.concrete_fields if not isinstance(field, AutoFieldMixin)
+    ]
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(model._meta.db_table), ", ".join(quote(field.column) for field in fields)
+    )
+    total = 0
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for obj in rows:
+                copy.write_row(
+                    [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+                )
+                total += 1
+    return total
+
+
+def insert(model, rows, batch_size=1000, use_copy=False):
+    """bulk_create an iterable of unsaved instances in fixed-size batches."""
+    if use_copy:
+        return copy_insert(model, rows)
+    rows = iter(rows)
+    total = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return total
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        total += len(batch)
+
+
+class DatasetBuilder:
+    def __init__(self, size="small", seed=0, batch_size=1000, use_copy=False, **overrides):
+        if size not in SIZES:
+            raise ValueError(f"Unknown dataset size: {size}")
+        counts = dict(SIZES[size], **{k: v for k, v in overrides.items() if v is not None})
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.use_copy = use_copy and can_copy()
+        self.dataset = Dataset(size, seed, counts)
+        self.password = make_password(PASSWORD, salt=f"dataset{seed}")
+        self.today = timezone.localdate()
+
+    def uuid(self):
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def insert(self, model, rows):
+        started = time.perf_counter()
+        total = insert(model, rows, self.batch_size, self.use_copy)
+        self.dataset.report.append((model._meta.label, total, time.perf_counter() - started))
+        return total
+
+    def user(self, email, user_type, id=None, **fields):
+        return User(
+            id=id or self.uuid(),
+            email=email,
+            password=self.password,
+            user_type=user_type,
+            first_name=f"{user_type.title()}",
+            last_name=email.split("@")[0],
+            **fields,
+        )
+
+    def build(self):
+        counts = self.dataset.counts
+        ds = self.dataset
+        ds.classes = [ClassDetails(id=self.uuid(), name=f"Class {i + 1}") for i in range(counts["classes"])]
+        ds.positions = [EmployeePosition(id=self.uuid(), name=name) for name in ("Teacher", "Principal", "Staff")]
+        self.insert(ClassDetails, ds.classes)
+        self.insert(EmployeePosition, ds.positions)
+
+        ds.admin = self.user("admin@bench.example.com", "admin")
+        ds.admin.save()
+        ds.employees = [
+            self.user(
+                f"employee{i}@bench.example.com",
+                EMPLOYEE_TYPES[i % len(EMPLOYEE_TYPES)],
+                employee_type="full_time" if i % 3 else "part_time",
+                position=ds.positions[i % len(ds.positions)],
+            )
+            for i in range(counts["employees"])
+        ]
+        self.insert(User, ds.employees)
+        ds.students = [
+            (self.uuid(), ds.classes[i % len(ds.classes)].id) for i in range(counts["students"])
+        ]
+        self.insert(
+            User,
+            (
+                self.user(f"student{i}@bench.example.com", "student", id=user_id, class_name_id=class_id)
+                for i, (user_id, class_id) in enumerate(ds.students)
+            ),
+        )
+        ds.student = User.objects.get(id=ds.students[0][0])
+
+        ds.courses = [
+            CourseDetails(
+                id=self.uuid(),
+                title=f"Course {i + 1}",
+                description=f"Synthetic course {i + 1}",
+                class_name=ds.classes[i % len(ds.classes)],
+                created_by=ds.admin,
+            )
+            for i in range(counts["courses"])
+        ]
+        self.insert(CourseDetails, ds.courses)
+        ds.sections = [
+            CourseSection(
+                id=self.uuid(),
+                section=f"Section {j + 1}",
+                course_name=course,
+                created_by=ds.admin,
+            )
+            for course in ds.courses
+            for j in range(counts["sections"])
+        ]
+        self.insert(CourseSection, ds.sections)
+        ds.subsections = [
+            CourseSubSection(
+                id=self.uuid(),
+                sub_section_name=f"Lesson {k + 1}",
+                description="Synthetic lesson",
+                course_section=section,
+            )
+            for section in ds.sections
+            for k in range(counts["subsections"])
+        ]
+        self.insert(CourseSubSection, ds.subsections)
+
+        courses_by_class = {}
+        for course in ds.courses:
+            courses_by_class.setdefault(course.class_name_id, []).append(course.id)
+        self.insert(Attendance, self.attendance_rows(courses_by_class))
+        self.insert(CourseRating, self.rating_rows(courses_by_class))
+        return ds
+
+    def attendance_rows(self, courses_by_class):
+        for user_id, class_id in self.dataset.students:
+            for course_id in courses_by_class.get(class_id, ()):
+                for day in range(1, self.dataset.counts["attendance_days"] + 1):
+                    yield Attendance(
+                        user_id=user_id,
+                        course_id=course_id,
+                        class_name_id=class_id,
+                        date=self.today - timedelta(days=day),
+                        status="present" if self.random.random() < 0.85 else "absent",
+                    )
+
+    def rating_rows(self, courses_by_class):
+        for user_id, class_id in self.dataset.students:
+            courses = courses_by_class.get(class_id, ())
+            for course_id in self.random.sample(courses, min(len(courses), self.dataset.counts["ratings"])):
+                yield CourseRating(
+                    id=self.uuid(),
+                    user_id=user_id,
+                    course_name_id=course_id,
+                    star=self.random.randint(1, 5),
+                    comment="Synthetic review",
+                )
+
+
+def seed_dataset(size="small", seed=0, batch_size=1000, use_copy=False, **overrides):
+    """
+    Seed a dataset and rebuild the derived summary tables from it.
+    ``dataset.report`` lists (model, rows, seconds) for every insert.
+    """
+    builder = DatasetBuilder(size, seed, batch_size, use_copy, **overrides)
+    with transaction.atomic():
+        dataset = builder.build()
+        call_command("rebuild_rating_summaries", stdout=io.StringIO())
+        call_command("rebuild_attendance_rollups", stdout=io.StringIO())
+    # bulk_create sends no post_save, so invalidate cached responses here.
+    for model in (ClassDetails, CourseDetails, CourseSection):
+        bump_version(model)
+    return dataset
@@ -0,0 +1,33 @@
+"""
+Database connection reuse statistics, for sizing the pool.
+
+Reports how each database alias reuses connections and, when the psycopg
+pool is enabled (DB_POOL), the pool's own counters: configured and current
+size, idle connections, requests waiting, total wait time, and connection
+errors or losses. The pool belongs to the worker process, so each worker
+reports its own numbers.
+"""
+from django.db import connections
+
+POOL_GAUGES = ("pool_min", "pool_max", "pool_size", "pool_available", "requests_waiting")
+
+
+def connection_mode(connection):
+    if connection.vendor == "postgresql" and connection.settings_dict["OPTIONS"].get("pool"):
+        return "pool"
+    if connection.settings_dict.get("CONN_MAX_AGE"):
+        return "persistent"
+    return "per-request"
+
+
+def pool_stats():
+    stats = {}
+    for connection in connections.all():
+        mode = connection_mode(connection)
+        stats[connection.alias] = {
+            "mode": mode,
+            "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+            "health_checks": connection.settings_dict.get("CONN_HEALTH_CHECKS", False),
+            "pool": connection.pool.get_stats() if mode == "pool" else None,
+        }
+    return stats
@@ -0,0 +1,144 @@
+"""
+Resized variants (thumbnail, medium, ...) of uploaded profile photos and
+subsection images.
+
+Rows whose variants do not match their current file are pending, and the
+generate_media_derivatives command renders them in a process pool outside
+the web workers; with MEDIA_DERIVATIVES_ASYNC off (development) they are
+rendered in-process once the upload commits. Variants are written next to
+the original as ``<name>.<variant>.jpg``, keeping the original extension so
+``avatar.png`` and ``avatar.jpg`` never share one, and their names are stored
+on the row together with the source's SHA-256, so unchanged files are never
+reprocessed. Storing them bumps updated_at, which the course tree ETag reads. Files that are not images (lecture videos) are never read.
+Pillow is optional; without it no variants are produced.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANTS = {
+    "thumbnail": (150, 150),
+    "medium": (800, 800),
+}
+READ_SIZE = 1024 * 1024
+
+
+def get_variant_sizes():
+    return getattr(settings, "MEDIA_DERIVATIVES", DEFAULT_VARIANTS)
+
+
+def get_executor():
+    return ProcessPoolExecutor(max_workers=getattr(settings, "MEDIA_DERIVATIVE_WORKERS", 2))
+
+
+def is_image(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return bool(content_type) and content_type.startswith("image/")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(partial(source.read, READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_variants(source_path, known_hash, targets, quality=85):
+    """
+    Worker entry point; only touches the filesystem. ``targets`` maps a
+    variant name to (size, path, storage name). Returns None when the source
+    hash matches ``known_hash`` and every variant exists, else the new
+    variants mapping.
+    """
+    digest = file_digest(source_path)
+    if digest == known_hash and all(os.path.exists(path) for _, path, _ in targets.values()):
+        return None
+    result = {"hash": digest}
+    try:
+        from PIL import Image, UnidentifiedImageError
+    except ImportError:
+        return result
+    try:
+        with Image.open(source_path) as image:
+            image.load()
+            for variant, (size, path, name) in targets.items():
+                resized = image.copy()
+                resized.thumbnail(size)
+                if resized.mode not in ("RGB", "L"):
+                    resized = resized.convert("RGB")
+                resized.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+                result[variant] = name
+    except (UnidentifiedImageError, OSError):
+        pass
+    return result
+
+
+def variant_name(name, variant):
+    return f"{name}.{variant}.jpg"
+
+
+def build_job(field_file, variants):
+    targets = {}
+    for variant, size in get_variant_sizes().items():
+        name = variant_name(field_file.name, variant)
+        targets[variant] = (size, default_storage.path(name), name)
+    return default_storage.path(field_file.name), (variants or {}).get("hash"), targets
+
+
+def store_result(model, pk, file_field, variants_field, source_name, previous, result):
+    if result is None:
+        return
+    result["source"] = source_name
+    updated = model.objects.filter(pk=pk, **{file_field: source_name}).update(
+        **{variants_field: result}, updated_at=timezone.now()
+    )
+    if updated:
+        for variant, name in (previous or {}).items():
+            if variant not in ("hash", "source") and name != result.get(variant):
+                default_storage.delete(name)
+
+
+def needs_derivatives(instance, file_field, variants_field):
+    field_file = getattr(instance, file_field)
+    variants = getattr(instance, variants_field) or {}
+    return (
+        bool(field_file)
+        and bool(get_variant_sizes())
+        and is_image(field_file.name)
+        and variants.get("source") != field_file.name
+    )
+
+
+def schedule(instance, file_field, variants_field):
+    """
+    Render derivatives for ``instance`` after the current transaction commits
+    when MEDIA_DERIVATIVES_ASYNC is off. Otherwise the row stays pending for
+    generate_media_derivatives, so a web worker restart never loses a render.
+    """
+    if getattr(settings, "MEDIA_DERIVATIVES_ASYNC", True):
+        return
+    if not needs_derivatives(instance, file_field, variants_field):
+        return
+    field_file = getattr(instance, file_field)
+    previous = getattr(instance, variants_field)
+    job = build_job(field_file, previous)
+    store_args = (type(instance), instance.pk, file_field, variants_field, field_file.name, previous)
+
+    def render():
+        try:
+            store_result(*store_args, render_variants(*job))
+        except Exception:
+            logger.exception("Could not generate derivatives for %s %s", store_args[0].__name__, store_args[1])
+
+    transaction.on_commit(render)
@@ -0,0 +1,236 @@
+"""
+Streaming CSV and XLSX exports of students, employees and attendance.
+
+Rows come from ``values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)``.
+On Postgres that reads through a server-side cursor, and no model instances
+are built. CSV is written into a StreamingHttpResponse in ~64 KiB pieces, so
+the first bytes go out as soon as the first chunk is fetched and memory stays
+flat whatever the row count. The querysets are ordered along existing
+indexes so the database does not sort before the first row.
+
+An XLSX file is a zip archive that cannot be sent before it is complete. It
+is built with openpyxl's write-only workbook, which also uses constant
+memory, in a temporary file, and that file is then streamed.
+
+Django's ASGI handler buffers a synchronous streaming body in full, so under
+ASGI the CSV rows are fetched a chunk at a time in the ORM thread and the
+XLSX file is read through an async iterator instead.
+"""
+import csv
+import io
+import os
+import re
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Attendance, User
+from .streaming import AsyncFileRangeIterator
+
+EMPLOYEE_USER_TYPES = ["teacher", "admin", "other", "driver"]
+FLUSH_SIZE = 64 * 1024
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Text a spreadsheet would run as a formula; phone numbers like +27 ... are left alone.
+FORMULA_START = frozenset("=@\t\r+-")
+FORMULA_RE = re.compile(r"^(?:[=@\t\r]|[+-](?![\d\s()-]*$))")
+
+STUDENT_COLUMNS = [
+    ("id", "id"),
+    ("email", "email"),
+    ("first_name", "first_name"),
+    ("middle_name", "middle_name"),
+    ("last_name", "last_name"),
+    ("gender", "gender"),
+    ("date_of_birth", "date_of_birth"),
+    ("contact", "contact"),
+    ("class", "class_name__name"),
+    ("mother_first_name", "mother_first_name"),
+    ("mother_last_name", "mother_last_name"),
+    ("mother_contact_no", "mother_contact_no"),
+    ("father_first_name", "father_first_name"),
+    ("father_last_name", "father_last_name"),
+    ("father_contact_no", "father_contact_no"),
+    ("parent_mail", "parent_mail"),
+    ("attendance", "attendance"),
+    ("created_at", "created_at"),
+]
+EMPLOYEE_COLUMNS = [
+    ("id", "id"),
+    ("email", "email"),
+    ("first_name", "first_name"),
+    ("middle_name", "middle_name"),
+    ("last_name", "last_name"),
+    ("contact", "contact"),
+    ("user_type", "user_type"),
+    ("employee_type", "employee_type"),
+    ("position", "position__name"),
+    ("leaves", "leaves"),
+    ("created_at", "created_at"),
+]
+ATTENDANCE_COLUMNS = [
+    ("date", "date"),
+    ("status", "status"),
+    ("user_id", "user_id"),
+    ("email", "user__email"),
+    ("first_name", "user__first_name"),
+    ("last_name", "user__last_name"),
+    ("class", "class_name__name"),
+    ("course_id", "course_id"),
+    ("course", "course__title"),
+]
+
+
+def student_rows(class_name=None):
+    queryset = User.objects.filter(user_type="student")
+    if class_name:
+        queryset = queryset.filter(class_name=class_name)
+    # Matches user_class_created_idx / user_type_created_idx.
+    return STUDENT_COLUMNS, queryset.order_by("-created_at", "-id")
+
+
+def employee_rows(user_type=None):
+    queryset = User.objects.filter(user_type__in=[user_type] if user_type else EMPLOYEE_USER_TYPES)
+    return EMPLOYEE_COLUMNS, queryset.order_by("-created_at", "-id")
+
+
+def attendance_rows(start=None, end=None, course_id=None, class_id=None, user_id=None):
+    queryset = Attendance.objects.all()
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    if course_id:
+        queryset = queryset.filter(course_id=course_id)
+    if class_id:
+        queryset = queryset.filter(class_name_id=class_id)
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    # Primary key order is an index scan, so rows stream without a sort.
+    return ATTENDANCE_COLUMNS, queryset.order_by("id")
+
+
+def values(columns, queryset):
+    return queryset.values_list(*[lookup for _, lookup in columns])
+
+
+def chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def iter_values(columns, queryset):
+    return values(columns, queryset).iterator(chunk_size=chunk_size())
+
+
+async def aiter_values(columns, queryset):
+    # QuerySet.aiterator() runs the values_list() query on the event loop,
+    # so pull chunks from the sync iterator in the ORM thread instead.
+    rows = iter_values(columns, queryset)
+    size = chunk_size()
+    next_chunk = sync_to_async(lambda: list(islice(rows, size)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+def cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    value = str(value)
+    if value[:1] in FORMULA_START and FORMULA_RE.match(value):
+        return "'" + value
+    return value
+
+
+def xlsx_cell(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        # Excel has no time zones.
+        return timezone.localtime(value).replace(tzinfo=None)
+    if isinstance(value, (int, float)) or hasattr(value, "isoformat"):
+        return value
+    return cell(value) or None
+
+
+class CSVBuffer:
+    """Formats rows and hands back text in ~FLUSH_SIZE pieces."""
+
+    def __init__(self, columns):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow([header for header, _ in columns])
+
+    def write(self, row):
+        self.writer.writerow([cell(value) for value in row])
+        return self.flush() if self.buffer.tell() >= FLUSH_SIZE else None
+
+    def flush(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+
+def stream_csv(columns, queryset):
+    buffer = CSVBuffer(columns)
+    for row in iter_values(columns, queryset):
+        if text := buffer.write(row):
+            yield text
+    yield buffer.flush()
+
+
+async def astream_csv(columns, queryset):
+    buffer = CSVBuffer(columns)
+    async for row in aiter_values(columns, queryset):
+        if text := buffer.write(row):
+            yield text
+    yield buffer.flush()
+
+
+def write_xlsx(columns, queryset, fileobj, title):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError("XLSX export requires the openpyxl package.")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append([header for header, _ in columns])
+    for row in iter_values(columns, queryset):
+        sheet.append([xlsx_cell(value) for value in row])
+    workbook.save(fileobj)
+
+
+def export_response(name, columns, queryset, file_type="csv", asgi=False):
+    """``asgi`` selects async iterators, for requests served by the ASGI handler."""
+    filename = f"{name}-{timezone.localdate():%Y%m%d}.{file_type}"
+    disposition = f'attachment; filename="{filename}"'
+    if file_type == "xlsx":
+        fileobj = tempfile.TemporaryFile()
+        try:
+            write_xlsx(columns, queryset, fileobj, name)
+        except BaseException:
+            fileobj.close()
+            raise
+        fileobj.seek(0)
+        if not asgi:
+            return FileResponse(
+                fileobj, as_attachment=True, filename=filename, content_type=CONTENT_TYPES["xlsx"]
+            )
+        size = os.fstat(fileobj.fileno()).st_size
+        response = StreamingHttpResponse(
+            AsyncFileRangeIterator(fileobj, 0, size, FLUSH_SIZE), content_type=CONTENT_TYPES["xlsx"]
+        )
+        response["Content-Length"] = str(size)
+    else:
+        rows = astream_csv(columns, queryset) if asgi else stream_csv(columns, queryset)
+        response = StreamingHttpResponse(rows, content_type=CONTENT_TYPES["csv"])
+    response["Content-Disposition"] = disposition
+    return response
@@ -0,0 +1,276 @@
+"""
+Streaming spreadsheet import of students and employees.
+
+Rows carry the same fields StudentDetailView.create receives under
+``basic_info``/``parent_info`` (columns may keep those prefixes, e.g.
+``basic_info.email``). Rows are validated a chunk at a time and each chunk
+is written with bulk_create together with its welcome emails. Password
+hashes are computed in-process unless ``workers`` asks for a process pool;
+only the management commands do that, web workers never fork one.
+
+Uploads through the API are stored as a UserImportJob and run later by the
+run_user_imports command, so no import runs inside a web request.
+"""
+import csv
+import io
+import os
+import random
+import string
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .mail import ACCOUNT_CREATED_SUBJECT, account_created_message
+from .models import OutboxEmail, User, UserImportJob
+from .serializers import EmployeeRegistrationSerializer, StudentRegistrationSerializer
+
+EMPLOYEE_USER_TYPES = ["teacher", "admin", "other", "driver"]
+COLUMN_PREFIXES = ("basic_info.", "parent_info.")
+MANY_TO_MANY_FIELDS = ("groups", "user_permissions")
+IGNORED_COLUMNS = {"id", "password", "created_at", "updated_at"}
+DATE_FIELDS = {
+    field.name for field in User._meta.concrete_fields if field.get_internal_type() == "DateField"
+}
+
+
+def generate_password():
+    return "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+def normalize_column(name):
+    name = (name or "").strip().lower()
+    for prefix in COLUMN_PREFIXES:
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def iter_rows(fileobj, filename):
+    """Yield (row_number, dict) pairs without loading the whole file."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        yield from _iter_xlsx_rows(fileobj)
+    else:
+        yield from _iter_csv_rows(fileobj)
+
+
+def _iter_csv_rows(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = [normalize_column(column) for column in next(reader, [])]
+    for row_number, values in enumerate(reader, start=2):
+        yield row_number, dict(zip(header, values))
+
+
+def _iter_xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import requires the openpyxl package.")
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ValueError("The uploaded file is not a valid XLSX workbook.")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [normalize_column(str(column or "")) for column in next(rows, [])]
+        for row_number, values in enumerate(rows, start=2):
+            yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def _clean_value(column, value):
+    if isinstance(value, str):
+        return value.strip()
+    # openpyxl reads date-formatted cells as datetimes.
+    if isinstance(value, datetime) and column in DATE_FIELDS:
+        return value.date()
+    return value
+
+
+def _clean_row(row, user_type):
+    data = {
+        column: _clean_value(column, value)
+        for column, value in row.items()
+        if column and column not in IGNORED_COLUMNS and value not in (None, "")
+    }
+    if user_type == "student":
+        data["user_type"] = "student"
+    return data
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _hash_in_process(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def _init_hash_worker():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "elearning_backend.settings")
+    django.setup()
+
+
+class UserImporter:
+    """
+    Import students (user_type="student") or employees from a spreadsheet.
+
+    Returns a report ``{"created": n, "failed": n, "errors": [...]}`` where
+    each error names the spreadsheet row number and the validation errors.
+    """
+
+    def __init__(self, user_type="student", chunk_size=500, workers=0):
+        self.user_type = user_type
+        self.chunk_size = chunk_size
+        self.workers = workers
+        # One serializer instance is reused for every row, the same way
+        # ListSerializer drives its child, so fields are only built once.
+        if user_type == "student":
+            self.serializer = StudentRegistrationSerializer()
+        else:
+            self.serializer = EmployeeRegistrationSerializer()
+
+    def run(self, fileobj, filename):
+        report = {"created": 0, "failed": 0, "errors": []}
+        seen_emails = set()
+        chunks = _chunks(iter_rows(fileobj, filename), self.chunk_size)
+        if self.workers:
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_hash_worker
+            ) as executor:
+
+                def hash_passwords(passwords):
+                    chunksize = max(1, len(passwords) // (self.workers * 2))
+                    return executor.map(make_password, passwords, chunksize=chunksize)
+
+                for chunk in chunks:
+                    self._import_chunk(chunk, seen_emails, hash_passwords, report)
+        else:
+            for chunk in chunks:
+                self._import_chunk(chunk, seen_emails, _hash_in_process, report)
+        report["failed"] = len(report["errors"])
+        return report
+
+    def _import_chunk(self, chunk, seen_emails, hash_passwords, report):
+        candidates = []
+        for row_number, row in chunk:
+            data = _clean_row(row, self.user_type)
+            email = User.objects.normalize_email(data.get("email", "")).lower()
+            if email:
+                data["email"] = email
+            errors = self._validate(data)
+            if not errors and email in seen_emails:
+                errors = {"email": ["Email is repeated in the file."]}
+            if errors:
+                report["errors"].append({"row": row_number, "errors": errors})
+                continue
+            seen_emails.add(email)
+            candidates.append((row_number, data))
+
+        existing = set(
+            User.objects.filter(
+                email__in=[data["email"] for _, data in candidates]
+            ).values_list("email", flat=True)
+        )
+        accepted = []
+        for row_number, data in candidates:
+            if data["email"] in existing:
+                report["errors"].append(
+                    {"row": row_number, "errors": {"email": ["Email already exists"]}}
+                )
+            else:
+                accepted.append(data)
+
+        passwords = [data.pop("password") for data in accepted]
+        hashes = hash_passwords(passwords)
+        users = []
+        emails = []
+        for data, password, password_hash in zip(accepted, passwords, hashes):
+            for field in MANY_TO_MANY_FIELDS:
+                data.pop(field, None)
+            users.append(User(password=password_hash, **data))
+            emails.append(
+                OutboxEmail(
+                    subject=ACCOUNT_CREATED_SUBJECT,
+                    body=account_created_message(password),
+                    from_email=settings.EMAIL_HOST_USER,
+                    recipients=[data["email"]],
+                )
+            )
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.chunk_size)
+            OutboxEmail.objects.bulk_create(emails, batch_size=self.chunk_size)
+        report["created"] += len(users)
+
+    def _validate(self, data):
+        if self.user_type != "student" and data.get("user_type") not in EMPLOYEE_USER_TYPES:
+            return {"user_type": [f"Must be one of {', '.join(EMPLOYEE_USER_TYPES)}."]}
+        try:
+            validated_data = self.serializer.run_validation(
+                {**data, "password": generate_password()}
+            )
+        except serializers.ValidationError as e:
+            return e.detail
+        data.clear()
+        data.update(validated_data)
+        return None
+
+
+def queue_import(upload, user_type, user):
+    """Store an uploaded spreadsheet as a pending UserImportJob."""
+    job = UserImportJob(user_type=user_type, filename=upload.name, created_by=user)
+    job.file.save(upload.name, upload, save=False)
+    job.save()
+    return job
+
+
+def claim_import_job():
+    """Mark the oldest pending job as running and return it, or None."""
+    with transaction.atomic():
+        job = (
+            UserImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=UserImportJob.PENDING)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = UserImportJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at", "updated_at"])
+    return job
+
+
+def run_import_job(job, workers=0, chunk_size=500):
+    """Import a claimed job's file, store the report and delete the file."""
+    importer = UserImporter(user_type=job.user_type, chunk_size=chunk_size, workers=workers)
+    try:
+        with job.file.open("rb") as fileobj:
+            job.report = importer.run(fileobj, job.filename)
+        job.status = UserImportJob.DONE
+    except Exception as e:
+        # Chunks written before the error stay committed.
+        job.report = {"message": str(e)}
+        job.status = UserImportJob.FAILED
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save(update_fields=["status", "report", "finished_at", "file", "updated_at"])
+    return job
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+ACCOUNT_CREATED_SUBJECT = "Your Account has been added successfully"
+
+
+def account_created_message(password):
+    return (
+        f"Your email is your Username and Your password for login is: {password}"
+        "\nClick this link for login: https://web-app.testyourapp.online/"
+    )
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Store an email in the outbox instead of sending it inline. Takes the same
+    arguments as django.core.mail.send_mail; the send_outbox_emails worker
+    delivers it.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def deliver_outbox(batch_size=100, max_attempts=5, backoff=30, connection=None, lease=600):
+    """
+    Send one batch of due outbox emails over a single backend connection.
+
+    The batch is claimed in a short transaction that moves next_attempt_at
+    ``lease`` seconds ahead, so no row lock is held during SMTP I/O. If the
+    worker dies mid-batch, the rows are picked up again once the lease runs
+    out. Failed messages are retried with exponential backoff (backoff * 2 ** n
+    seconds) and marked failed after max_attempts. Bodies can hold an initial
+    password or a reset code, so they are cleared once a message is sent or
+    given up on. Returns (sent, failed) for the batch.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+        OutboxEmail.objects.filter(id__in=[email.id for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=lease)
+        )
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            _record_failure(email, e, now, max_attempts, backoff)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email,
+                    email.recipients,
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as e:
+                    _record_failure(email, e, now, max_attempts, backoff)
+                    failed += 1
+                else:
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.last_error = None
+                    sent += 1
+        finally:
+            connection.close()
+
+    for email in batch:
+        email.updated_at = timezone.now()
+        if email.status != OutboxEmail.PENDING:
+            email.body = ""
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(
+            batch,
+            ["status", "attempts", "next_attempt_at", "last_error", "sent_at", "updated_at", "body"],
+        )
+    return sent, failed
+
+
+def purge_outbox(days):
+    """Delete sent and failed outbox rows last touched more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEmail.objects.filter(
+        status__in=[OutboxEmail.SENT, OutboxEmail.FAILED], updated_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def _record_failure(email, error, now, max_attempts, backoff):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = now + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
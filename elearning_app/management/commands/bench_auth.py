@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+from elearning_app.benchmark import benchmark_database, format_summary, summarize
+from elearning_app.models import User
+
+ENDPOINTS = {
+    "sync": "/api/user/login/",
+    "async": "/api/async/user/login/",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and latency of the sync UsersView.login_view with "
+        "the async login view, both served through the ASGI handler with the "
+        "same number of concurrent requests. Uses a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--users", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Throttling is off so repeated requests measure the view itself;
+        # bench_throttle measures the throttle.
+        with benchmark_database(), override_settings(THROTTLE_ENABLED=False):
+            password = "bench-password"
+            User.objects.create_user(email="bench0@example.com", password=password)
+            template = User.objects.get(email="bench0@example.com")
+            User.objects.bulk_create(
+                User(email=f"bench{i}@example.com", password=template.password)
+                for i in range(1, options["users"])
+            )
+            for name, url in ENDPOINTS.items():
+                elapsed, latencies, failures = asyncio.run(
+                    self.drive(url, password, options)
+                )
+                summary = summarize(latencies)
+                self.stdout.write(
+                    f"{name:<6} {len(latencies) / elapsed:8.2f} req/s, {failures} failed"
+                )
+                self.stdout.write(format_summary(f"{name} login latency", summary, unit="ms"))
+
+    async def drive(self, url, password, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+        failures = 0
+
+        async def login(i):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    url,
+                    {"email": f"bench{i % options['users']}@example.com", "password": password},
+                    content_type="application/json",
+                )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(options["requests"])))
+        return time.perf_counter() - started, latencies, failures
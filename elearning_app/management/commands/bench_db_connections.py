@@ -0,0 +1,72 @@
+import copy
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from elearning_app.benchmark import format_summary, summarize, time_calls
+
+# (alias suffix, label, CONN_MAX_AGE, CONN_HEALTH_CHECKS, pooled)
+MODES = [
+    ("per-request", "new connection per request", 0, False, False),
+    ("persistent", "persistent + health checks", 600, True, False),
+    ("pool", "pool + health checks", 0, True, True),
+]
+
+
+def simulated_request(connection):
+    # close_old_connections() runs on request_started and request_finished.
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    connection.close_if_unusable_or_obsolete()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the database cost of a request (connect if needed, one query, "
+        "end of request) with a new connection per request, persistent "
+        "connections with health checks, and the psycopg connection pool. The "
+        "difference from the first row is the handshake saved per request. "
+        "Needs PostgreSQL; the pool mode needs psycopg[pool]."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--pool-size", type=int, default=4)
+
+    def handle(self, *args, **options):
+        base = connections[options["database"]]
+        if base.vendor != "postgresql":
+            raise CommandError(f"This benchmark needs PostgreSQL; {base.alias!r} is {base.vendor}.")
+
+        baseline = None
+        for suffix, name, max_age, health_checks, pooled in MODES:
+            settings_dict = copy.deepcopy(base.settings_dict)
+            settings_dict["CONN_MAX_AGE"] = max_age
+            settings_dict["CONN_HEALTH_CHECKS"] = health_checks
+            settings_dict["OPTIONS"].pop("pool", None)
+            if pooled:
+                settings_dict["OPTIONS"]["pool"] = {"min_size": 1, "max_size": options["pool_size"]}
+            # A separate alias so neither the pool nor the connection is shared
+            # with the configured one.
+            connection = base.__class__(settings_dict, alias=f"{base.alias}-bench-{suffix}")
+            try:
+                simulated_request(connection)  # warm up: open the pool, load types
+                samples = time_calls(simulated_request, options["requests"], connection)
+                stats = connection.pool.get_stats() if pooled else None
+            finally:
+                connection.close()
+                if pooled:
+                    connection.close_pool()
+
+            summary = summarize(samples)
+            if baseline is None:
+                baseline = summary
+            self.stdout.write(format_summary(name, summary, unit="ms"))
+            if summary is not baseline:
+                saved = (baseline["p50_us"] - summary["p50_us"]) / 1000
+                self.stdout.write(f"{'':<40} saves {saved:.2f}ms per request at p50")
+            if stats:
+                self.stdout.write(f"{'':<40} pool stats: {stats}")
@@ -0,0 +1,319 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from elearning_app.benchmark import benchmark_database, format_summary, summarize
+from elearning_app.datasets import PASSWORD, SIZES, seed_dataset
+from elearning_app.models import UploadSession
+from elearning_app.otp_store import get_otp_store
+
+
+def server_error(result):
+    return any(code >= 500 for code in result["statuses"])
+
+
+class Endpoint:
+    """
+    One benchmarked request. ``path`` and ``prepare`` may be callables taking
+    (dataset, iteration); ``prepare`` runs outside the timed section and
+    returns extra keyword arguments for the client call (data, headers, ...).
+    """
+
+    def __init__(self, name, method, path, prepare=None, role="admin"):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.prepare = prepare
+        self.role = role
+
+    def request(self, ds, i):
+        path = self.path(ds, i) if callable(self.path) else self.path
+        kwargs = {"format": "json"} if self.method != "get" else {}
+        if self.prepare:
+            kwargs.update(self.prepare(ds, i))
+        return path, kwargs
+
+
+def login_data(ds, i):
+    return {"data": {"email": ds.student.email, "password": PASSWORD}}
+
+
+def verify_otp_data(ds, i):
+    code = get_otp_store().issue_code(ds.student.email)
+    return {"data": {"email": ds.student.email, "otp": code}}
+
+
+def reset_password_data(ds, i):
+    store = get_otp_store()
+    token = store.verify_code(ds.student.email, store.issue_code(ds.student.email))
+    return {
+        "data": {"email": ds.student.email, "new_password": PASSWORD},
+        "headers": {"Authorization": token},
+    }
+
+
+def upload_session_path(ds, i):
+    if not hasattr(ds, "upload_session"):
+        ds.upload_session = UploadSession.objects.create(
+            subsection=ds.subsections[0], filename="lesson.mp4", size=1024, created_by=ds.admin
+        )
+    return f"/api/media-uploads/{ds.upload_session.id}/"
+
+
+ENDPOINTS = [
+    Endpoint(
+        "user.register", "post", "/api/user/register/",
+        lambda ds, i: {"data": {"email": f"register{i}@bench.example.com", "password": PASSWORD}},
+        role=None,
+    ),
+    Endpoint("user.login", "post", "/api/user/login/", login_data, role=None),
+    Endpoint("user.login.async", "post", "/api/async/user/login/", login_data, role=None),
+    Endpoint(
+        "user.send-otp", "post", "/api/user/send-otp/",
+        lambda ds, i: {"data": {"email": ds.student.email}},
+        role=None,
+    ),
+    Endpoint("user.verify-otp", "post", "/api/user/verify-otp/", verify_otp_data, role=None),
+    Endpoint("user.reset-password", "post", "/api/user/reset-password/", reset_password_data, role=None),
+    Endpoint(
+        "user.logout", "post", "/api/user/logout/",
+        lambda ds, i: {"data": {"access_token": str(AccessToken.for_user(ds.student))}},
+    ),
+    Endpoint("user.list", "get", "/api/user/"),
+    Endpoint("course-details.list", "get", "/api/course-details/"),
+    Endpoint("course-details.retrieve", "get", lambda ds, i: f"/api/course-details/{ds.courses[0].id}/"),
+    Endpoint("course-details.tree", "get", lambda ds, i: f"/api/course-details/{ds.courses[0].id}/tree/"),
+    Endpoint("class-details.list", "get", "/api/class-details/"),
+    Endpoint("class-details.retrieve", "get", lambda ds, i: f"/api/class-details/{ds.classes[0].id}/"),
+    Endpoint("course-section.list", "get", "/api/course-section/"),
+    Endpoint("course-subsection.list", "get", "/api/course-subsection/"),
+    Endpoint(
+        "course-subsection.retrieve", "get",
+        lambda ds, i: f"/api/course-subsection/{ds.subsections[0].id}/",
+    ),
+    Endpoint("employee-details.list", "get", "/api/employee-details/"),
+    Endpoint(
+        "employee-details.create", "post", "/api/employee-details/",
+        lambda ds, i: {"data": {"email": f"hire{i}@bench.example.com", "user_type": "teacher"}},
+    ),
+    Endpoint("employee-details.export", "get", "/api/employee-details/export/"),
+    Endpoint("employee-type.list", "get", "/api/employee-type/?employee_type=full_time"),
+    Endpoint("student-details.list", "get", "/api/student-details/"),
+    Endpoint(
+        "student-details.list.expand", "get",
+        "/api/student-details/?expand=class_name,position&records=100",
+    ),
+    Endpoint("student-details.export", "get", "/api/student-details/export/"),
+    Endpoint("student-details.export.xlsx", "get", "/api/student-details/export/?file_type=xlsx"),
+    Endpoint(
+        "student-details.create", "post", "/api/student-details/",
+        lambda ds, i: {
+            "data": {
+                "basic_info": {"email": f"enrol{i}@bench.example.com", "user_type": "student"},
+                "parent_info": {"father_first_name": "Parent"},
+            }
+        },
+    ),
+    Endpoint(
+        "student-details.bulk", "patch", "/api/student-details/bulk/",
+        lambda ds, i: {
+            "data": {"filter": {"class_name": str(ds.classes[0].id)}, "changes": {"leaves": i}}
+        },
+    ),
+    Endpoint(
+        "attendance.mark", "post", "/api/attendance/mark/",
+        lambda ds, i: {
+            "data": {
+                "user_id": str(ds.students[i % len(ds.students)][0]),
+                "course_id": str(ds.courses[0].id),
+                "status": "present",
+            }
+        },
+    ),
+    Endpoint(
+        "attendance.bulk-mark", "post", "/api/attendance/bulk-mark/",
+        lambda ds, i: {
+            "data": {
+                "course_id": str(ds.courses[0].id),
+                "records": [
+                    {"user_id": str(user_id), "status": "present" if i % 2 else "absent"}
+                    for user_id, class_id in ds.students[:200]
+                    if class_id == ds.courses[0].class_name_id
+                ],
+            }
+        },
+    ),
+    Endpoint("attendance.rates.course", "get", "/api/attendance/rates/?group=course"),
+    Endpoint("attendance.rates.class", "get", "/api/attendance/rates/?group=class"),
+    Endpoint(
+        "attendance.rates.student", "get",
+        lambda ds, i: f"/api/attendance/rates/?group=student&course_id={ds.courses[0].id}",
+    ),
+    Endpoint("attendance.export", "get", "/api/attendance/export/"),
+    Endpoint(
+        "course-review.create", "post", "/api/course-review/",
+        lambda ds, i: {"data": {"course_name": str(ds.courses[i % len(ds.courses)].id), "star": i % 5 + 1}},
+    ),
+    Endpoint("course-rating.retrieve", "get", lambda ds, i: f"/api/course-rating/{ds.courses[0].id}/"),
+    Endpoint(
+        "course-rating.bulk", "get",
+        lambda ds, i: "/api/course-rating/bulk/?course_ids="
+        + ",".join(str(course.id) for course in ds.courses[:50]),
+    ),
+    Endpoint("search", "get", "/api/search/?q=synthetic+course"),
+    Endpoint("search.subsection", "get", "/api/search/?q=lesson+3&type=subsection"),
+    Endpoint("people.search", "get", "/api/people/search/?q=student12"),
+    Endpoint(
+        "people.search.class", "get",
+        lambda ds, i: f"/api/people/search/?q=stud&user_type=student&class_name={ds.classes[0].id}",
+    ),
+    Endpoint("media-uploads.retrieve", "get", upload_session_path),
+    Endpoint("response-cache.stats", "get", "/api/response-cache/stats/"),
+    Endpoint("metrics", "get", "/metrics"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the routed API endpoints through the test client against a seeded "
+        "dataset in a throwaway database, report latency percentiles and query "
+        "counts, and compare them with a stored baseline. Upload chunks and "
+        "media streaming are left out since they measure disk rather than the app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=sorted(SIZES), default="small")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--only", default="", help="Only run endpoints whose name contains this text.")
+        parser.add_argument("--baseline", help="Baseline JSON to compare against.")
+        parser.add_argument("--save-baseline", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--threshold", type=float, default=20.0,
+            help="Allowed p95 slowdown in percent before the run fails.",
+        )
+        parser.add_argument(
+            "--min-delta-ms", type=float, default=1.0,
+            help="Ignore p95 slowdowns smaller than this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [endpoint for endpoint in ENDPOINTS if options["only"] in endpoint.name]
+        if not endpoints:
+            raise CommandError(f"No endpoints match {options['only']!r}")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as fileobj:
+                baseline = json.load(fileobj)
+
+        # Throttling is off so repeated requests measure the view itself;
+        # bench_throttle measures the throttle.
+        with benchmark_database(), override_settings(THROTTLE_ENABLED=False):
+            started = time.perf_counter()
+            ds = seed_dataset(options["size"], options["seed"])
+            self.stdout.write(
+                f"Seeded {options['size']} dataset (seed {options['seed']}) "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            results = {}
+            for endpoint in endpoints:
+                results[endpoint.name] = self.run_endpoint(endpoint, ds, options)
+
+        report = {
+            "size": options["size"],
+            "seed": options["seed"],
+            "iterations": options["iterations"],
+            "results": results,
+        }
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as fileobj:
+                json.dump(report, fileobj, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+        if baseline is not None:
+            self.compare(baseline, report, options)
+        else:
+            failing = [name for name, result in results.items() if server_error(result)]
+            if failing:
+                raise CommandError(f"{len(failing)} endpoint(s) returned a server error: " + ", ".join(failing))
+
+    def run_endpoint(self, endpoint, ds, options):
+        client = APIClient()
+        if endpoint.role == "admin":
+            client.force_authenticate(ds.admin)
+        elif endpoint.role == "student":
+            client.force_authenticate(ds.student)
+        samples = []
+        queries = []
+        statuses = set()
+        for i in range(options["warmup"] + options["iterations"]):
+            path, kwargs = endpoint.request(ds, i)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(path, **kwargs)
+                if response.streaming:
+                    # Exports do their work while the body is consumed.
+                    for _ in response.streaming_content:
+                        pass
+                elapsed = time.perf_counter() - started
+            if i < options["warmup"]:
+                continue
+            samples.append(elapsed)
+            queries.append(len(context))
+            statuses.add(response.status_code)
+
+        summary = summarize(samples)
+        result = {
+            "p50_ms": summary["p50_us"] / 1000,
+            "p95_ms": summary["p95_us"] / 1000,
+            "p99_ms": summary["p99_us"] / 1000,
+            "queries": max(queries),
+            "statuses": sorted(statuses),
+        }
+        line = format_summary(endpoint.name, summary, unit="ms")
+        self.stdout.write(f"{line} queries={result['queries']:<4} status={result['statuses']}")
+        if server_error(result):
+            self.stderr.write(f"{endpoint.name} returned a server error")
+        return result
+
+    def compare(self, baseline, report, options):
+        if (baseline.get("size"), baseline.get("seed")) != (report["size"], report["seed"]):
+            self.stderr.write("Baseline was recorded with a different dataset size or seed")
+        regressions = []
+        self.stdout.write(f"\n{'endpoint':<40} {'p95 base':>10} {'p95 now':>10} {'change':>8} queries")
+        for name, current in report["results"].items():
+            previous = baseline.get("results", {}).get(name)
+            # A server error, or any change in the statuses returned, fails
+            # the run however fast the responses were.
+            failing = server_error(current)
+            if previous is None:
+                flag = " REGRESSION" if failing else ""
+                self.stdout.write(
+                    f"{name:<40} {'-':>10} {current['p95_ms']:>9.2f}ms {'new':>8} "
+                    f"status={current['statuses']}{flag}"
+                )
+            else:
+                delta = current["p95_ms"] - previous["p95_ms"]
+                change = delta / previous["p95_ms"] * 100 if previous["p95_ms"] else 0.0
+                slower = change > options["threshold"] and delta > options["min_delta_ms"]
+                more_queries = current["queries"] > previous["queries"]
+                statuses_changed = current["statuses"] != previous.get("statuses")
+                flag = " REGRESSION" if slower or more_queries or failing or statuses_changed else ""
+                statuses = f" status={previous.get('statuses')}->{current['statuses']}" if statuses_changed else ""
+                self.stdout.write(
+                    f"{name:<40} {previous['p95_ms']:>9.2f}ms {current['p95_ms']:>9.2f}ms "
+                    f"{change:>+7.1f}% {previous['queries']}->{current['queries']}{statuses}{flag}"
+                )
+            if flag:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} endpoint(s) regressed (p95 beyond {options['threshold']}%, "
+                f"more queries, server errors or changed statuses): " + ", ".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
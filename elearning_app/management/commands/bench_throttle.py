@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory, override_settings
+
+from elearning_app import throttling
+from elearning_app.benchmark import benchmark_database, format_summary, summarize, time_calls
+from elearning_app.models import User
+
+OPEN = {"login": {"ip": "1000000000/min", "email": "1000000000/15min"}}
+CLOSED = {"login": {"ip": "0/min", "email": "0/15min"}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what the sliding-window throttle adds to a request: the check "
+        "itself when the request is allowed and when it is rejected, and a "
+        "rejected login (429) next to a failed login that runs PBKDF2. Uses "
+        "the configured throttle cache and a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10000)
+        parser.add_argument("--requests", type=int, default=50)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        body = json.dumps({"email": "someone@example.com", "password": "wrong"})
+        request = RequestFactory().post("/api/async/user/login/", body, content_type="application/json")
+
+        results = {}
+        with override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES=OPEN):
+            results["check, allowed (ip + email rules)"] = time_calls(
+                throttling.check, iterations, "login", request
+            )
+        with override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES=CLOSED):
+            results["check, rejected (ip + email rules)"] = time_calls(
+                throttling.check, iterations, "login", request
+            )
+
+        with benchmark_database():
+            User.objects.create_user(email="someone@example.com", password="bench-password")
+            client = Client()
+            data = {"email": "someone@example.com", "password": "wrong"}
+            for path in ("/api/user/login/", "/api/async/user/login/"):
+                with override_settings(THROTTLE_ENABLED=False):
+                    results[f"{path} failed login"] = time_calls(
+                        client.post, options["requests"], path, data, "application/json"
+                    )
+                with override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES=CLOSED):
+                    response = client.post(path, data, "application/json")
+                    if response.status_code != 429:
+                        self.stderr.write(f"{path} answered {response.status_code}, expected 429")
+                    results[f"{path} throttled (429)"] = time_calls(
+                        client.post, options["requests"], path, data, "application/json"
+                    )
+
+        for name, samples in results.items():
+            self.stdout.write(format_summary(name, summarize(samples)))
@@ -0,0 +1,55 @@
+import uuid
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from elearning_app.authentication import (
+    RevocationAwareJWTAuthentication,
+    RevocationCache,
+)
+from elearning_app.benchmark import format_summary, summarize, time_calls
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of the revoked token check. Runs purely "
+        "in memory; the database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--revoked", type=int, default=100000)
+        parser.add_argument("--iterations", type=int, default=100000)
+
+    def handle(self, *args, **options):
+        revoked = options["revoked"]
+        iterations = options["iterations"]
+
+        cache = RevocationCache({"CAPACITY": max(revoked, 1), "SYNC_INTERVAL": None})
+        for _ in range(revoked):
+            cache.add(uuid.uuid4().hex)
+        probe = uuid.uuid4().hex
+
+        token = AccessToken()
+        token["user_id"] = str(uuid.uuid4())
+        raw_token = str(token).encode()
+
+        plain = JWTAuthentication()
+        checked = RevocationAwareJWTAuthentication()
+        checked.revocation_cache = cache
+
+        results = {
+            "bloom lookup (not revoked)": time_calls(cache.is_revoked, iterations, probe),
+            "JWTAuthentication token validation": time_calls(
+                plain.get_validated_token, iterations, raw_token
+            ),
+            "RevocationAware token validation": time_calls(
+                checked.get_validated_token, iterations, raw_token
+            ),
+        }
+        self.stdout.write(
+            f"{revoked} revoked tokens, bloom filter {len(cache._bloom.bits) / 1024:.0f} KiB, "
+            f"{cache._bloom.hash_count} hashes"
+        )
+        for name, samples in results.items():
+            self.stdout.write(format_summary(name, summarize(samples)))
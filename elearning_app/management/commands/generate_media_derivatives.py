@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+
+from elearning_app import derivatives
+from elearning_app.models import CourseSubSection, User
+
+SOURCES = [
+    (User, "photo", "photo_variants"),
+    (CourseSubSection, "image", "image_variants"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render pending media derivatives (thumbnails etc.) in a process pool. "
+        "Run periodically; uploads only mark their rows as pending."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render rows whose variants are already recorded.",
+        )
+
+    def handle(self, *args, **options):
+        with derivatives.get_executor() as executor:
+            pending = self.submit(executor, options["force"])
+            done, failed = self.store(pending)
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {done} files ({failed} failed)")
+        )
+
+    def submit(self, executor, force):
+        pending = []
+        for model, file_field, variants_field in SOURCES:
+            rows = (
+                model.objects.exclude(**{file_field: ""})
+                .exclude(**{f"{file_field}__isnull": True})
+                .only("pk", file_field, variants_field)
+            )
+            for instance in rows.iterator(chunk_size=500):
+                if not derivatives.is_image(getattr(instance, file_field).name):
+                    continue
+                if not force and not derivatives.needs_derivatives(
+                    instance, file_field, variants_field
+                ):
+                    continue
+                field_file = getattr(instance, file_field)
+                previous = getattr(instance, variants_field)
+                source_path, known_hash, targets = derivatives.build_job(field_file, previous)
+                if force:
+                    known_hash = None
+                future = executor.submit(
+                    derivatives.render_variants, source_path, known_hash, targets
+                )
+                pending.append(
+                    (future, (model, instance.pk, file_field, variants_field, field_file.name, previous))
+                )
+        return pending
+
+    def store(self, pending):
+        done = failed = 0
+        for future, store_args in pending:
+            try:
+                derivatives.store_result(*store_args, future.result())
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{store_args[0].__name__} {store_args[1]}: {exc}")
+        return done, failed
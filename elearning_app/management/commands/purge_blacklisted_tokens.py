@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from elearning_app.authentication import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete BlacklistedToken rows whose access token has already expired."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired tokens"))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from elearning_app.mail import purge_outbox
+
+
+class Command(BaseCommand):
+    help = "Delete sent and failed OutboxEmail rows older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "OUTBOX_RETENTION_DAYS", 7),
+            help="Keep rows updated within this many days.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_outbox(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} outbox emails"))
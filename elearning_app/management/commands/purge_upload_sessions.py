@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from elearning_app.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete media upload sessions idle for longer than MEDIA_UPLOAD_SESSION_TTL, "
+        "together with their partial files."
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} upload sessions"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from elearning_app.models import Attendance, AttendanceRollup, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild AttendanceRollup rows and User.attendance from Attendance. "
+        "Rows are grouped by the class stored on each attendance row."
+    )
+
+    def handle(self, *args, **options):
+        rows = (
+            Attendance.objects.values("course_id", "class_name_id", "date")
+            .order_by()
+            .annotate(
+                present=Count("id", filter=Q(status="present")),
+                absent=Count("id", filter=Q(status="absent")),
+            )
+        )
+        rollups = [
+            AttendanceRollup(
+                course_id=row["course_id"],
+                class_name_id=row["class_name_id"],
+                date=row["date"],
+                present=row["present"],
+                absent=row["absent"],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ]
+        present_days = (
+            Attendance.objects.filter(user=OuterRef("pk"), status="present")
+            .order_by()
+            .values("user")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        with transaction.atomic():
+            AttendanceRollup.objects.all().delete()
+            AttendanceRollup.objects.bulk_create(rollups, batch_size=1000)
+            users = User.objects.update(attendance=Coalesce(Subquery(present_days), 0))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(rollups)} attendance rollups and {users} user counters"
+            )
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from elearning_app.models import RATING_STARS, CourseRating, CourseRatingSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild CourseRatingSummary rows from CourseRating with one aggregate query."
+
+    def handle(self, *args, **options):
+        histogram = {
+            f"star_{star}": Count("id", filter=Q(star=star)) for star in RATING_STARS
+        }
+        rows = (
+            CourseRating.objects.filter(course_name__isnull=False, star__in=RATING_STARS)
+            .values("course_name")
+            .order_by()
+            .annotate(count=Count("id"), total=Sum("star", default=0), **histogram)
+        )
+        summaries = [
+            CourseRatingSummary(
+                course_id=row.pop("course_name"),
+                **row,
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            CourseRatingSummary.objects.all().delete()
+            CourseRatingSummary.objects.bulk_create(summaries, batch_size=1000)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating summaries for {len(summaries)} courses")
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from elearning_app.search import install_search
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate and repopulate the full-text search columns, triggers and "
+        "indexes (Postgres tsvector or SQLite FTS5) for courses and sections."
+    )
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            install_search(schema_editor)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the {connection.vendor} search index"))
@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from elearning_app.importers import claim_import_job, run_import_job
+from elearning_app.models import UserImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run spreadsheet imports queued through the API, hashing passwords in a "
+        "process pool. Run periodically; uploads only store the file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Password hashing processes (default: CPU count, 0 hashes in-process).",
+        )
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        while (job := claim_import_job()) is not None:
+            run_import_job(job, workers=options["workers"], chunk_size=options["chunk_size"])
+            if job.status == UserImportJob.FAILED:
+                failed += 1
+                self.stderr.write(f"{job.id} {job.filename}: {job.report['message']}")
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} imports ({failed} failed)"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from elearning_app.mail import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued OutboxEmail rows in batches over one reused connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--backoff", type=int, default=30, help="Base retry delay in seconds."
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling instead of exiting once the outbox is drained."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty."
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+                backoff=options["backoff"],
+            )
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from elearning_app.otp_store import get_otp_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired password-reset codes and tokens in batches. Stores "
+        "with native expiry, such as the cache store, have nothing to sweep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        store = get_otp_store()
+        deleted = store.sweep(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Swept {deleted} expired entries from {type(store).__name__}")
+        )
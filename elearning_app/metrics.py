@@ -0,0 +1,252 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+MetricsMiddleware times every request, counts and times its SQL through an
+execute_wrapper installed on each connection, and adds the time spent
+building serializer output. The request's RequestTiming lives in a
+ContextVar, which sync_to_async copies into its worker threads, so queries
+made through the async ORM or from sync views under ASGI are counted too. Observations go into fixed-bucket histograms keyed by route, so
+recording is a few additions under a lock. Each worker process keeps its own
+registry; Prometheus aggregates across workers when scraping them.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.serializers import BaseSerializer
+
+from .db_pool import POOL_GAUGES, pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+current_timing = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    __slots__ = ("queries", "query_time", "serializer_time", "serializer_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += perf_counter() - start
+
+    def server_timing(self, duration):
+        return ", ".join(
+            [
+                f'db;dur={self.query_time * 1000:.1f};desc="{self.queries} queries"',
+                f"serializer;dur={self.serializer_time * 1000:.1f}",
+                f"total;dur={duration * 1000:.1f}",
+            ]
+        )
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield _format_number(bound), cumulative
+        yield "+Inf", self.count
+
+
+class RouteStats:
+    __slots__ = ("latency", "queries", "query_time", "serializer_time")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.responses = {}
+
+    def observe(self, route, method, status_code, duration, timing):
+        key = (route, method)
+        with self.lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.latency.observe(duration)
+            stats.queries.observe(timing.queries)
+            stats.query_time += timing.query_time
+            stats.serializer_time += timing.serializer_time
+            status_key = (route, method, str(status_code))
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+            self.responses.clear()
+
+    def render(self):
+        with self.lock:
+            routes = sorted(self.routes.items())
+            responses = sorted(self.responses.items())
+            lines = []
+            _header(lines, "http_requests_total", "counter", "Responses by route, method and status.")
+            for (route, method, status_code), count in responses:
+                lines.append(
+                    f"elearning_http_requests_total{_labels(route=route, method=method, status=status_code)} {count}"
+                )
+            _histogram(lines, routes, "latency", "http_request_duration_seconds", "Request latency by route.")
+            _histogram(lines, routes, "queries", "db_queries_per_request", "SQL queries per request by route.")
+            _header(lines, "db_query_seconds_total", "counter", "Time spent in SQL by route.")
+            for (route, method), stats in routes:
+                lines.append(
+                    f"elearning_db_query_seconds_total{_labels(route=route, method=method)} {stats.query_time:.6f}"
+                )
+            _header(lines, "serializer_seconds_total", "counter", "Time spent building serializer output by route.")
+            for (route, method), stats in routes:
+                lines.append(
+                    f"elearning_serializer_seconds_total{_labels(route=route, method=method)} {stats.serializer_time:.6f}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f"# HELP elearning_{name} {help_text}")
+    lines.append(f"# TYPE elearning_{name} {kind}")
+
+
+def _histogram(lines, routes, attribute, name, help_text):
+    _header(lines, name, "histogram", help_text)
+    for (route, method), stats in routes:
+        histogram = getattr(stats, attribute)
+        for bound, cumulative in histogram.samples():
+            lines.append(
+                f"elearning_{name}_bucket{_labels(route=route, method=method, le=bound)} {cumulative}"
+            )
+        labels = _labels(route=route, method=method)
+        lines.append(f"elearning_{name}_sum{labels} {histogram.total:.6f}")
+        lines.append(f"elearning_{name}_count{labels} {histogram.count}")
+
+
+registry = Registry()
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+def time_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing.execute_wrapper(execute, sql, params, many, context)
+
+
+def _add_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def install_query_timer():
+    """Time queries on every connection, including ones opened later in other threads."""
+    connection_created.connect(_add_query_timer, dispatch_uid="metrics-query-timer")
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(None, connection)
+
+
+def instrument_serializers():
+    """
+    Time ``serializer.data`` for the request in progress. Nested serializers
+    render through to_representation, so only the outermost call is counted;
+    queries run while serializing are also included in the db timing.
+
+    This replaces BaseSerializer.data for the whole process, including code
+    outside requests, where it only adds a ContextVar lookup. Set
+    METRICS_SERIALIZER_TIMING = False to leave DRF untouched.
+    """
+    if getattr(BaseSerializer.data.fget, "instrumented", False):
+        return
+    original = BaseSerializer.data.fget
+
+    def data(self):
+        timing = current_timing.get()
+        if timing is None or timing.serializer_depth:
+            return original(self)
+        timing.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return original(self)
+        finally:
+            timing.serializer_depth -= 1
+            timing.serializer_time += perf_counter() - start
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+def render_pool_stats(stats):
+    """Prometheus lines for the psycopg pool counters in ``db_pool.pool_stats()``."""
+    series = {}
+    for alias, values in sorted(stats.items()):
+        for name, value in (values["pool"] or {}).items():
+            series.setdefault(name, []).append((alias, value))
+    lines = []
+    for name, samples in sorted(series.items()):
+        if name in POOL_GAUGES:
+            metric, kind = f"db_pool_{name}", "gauge"
+        else:
+            metric, kind = f"db_pool_{name}_total", "counter"
+        _header(lines, metric, kind, f"psycopg_pool {name} for this process.")
+        for alias, value in samples:
+            lines.append(f"elearning_{metric}{_labels(alias=alias)} {value}")
+    return "".join(line + "\n" for line in lines)
+
+
+def metrics_view(request):
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", None)
+    if allowed and request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponseForbidden()
+    body = registry.render() + render_pool_stats(pool_stats())
+    return HttpResponse(body, content_type=CONTENT_TYPE)
@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL and serializer time per route into metrics.registry
+    and report them to the client in a Server-Timing header. Runs natively
+    under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.server_timing = getattr(settings, "METRICS_SERVER_TIMING", True)
+        metrics.install_query_timer()
+        if getattr(settings, "METRICS_SERIALIZER_TIMING", True):
+            metrics.instrument_serializers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timing = metrics.RequestTiming()
+        token = metrics.current_timing.set(timing)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_timing.reset(token)
+        return self.record(request, response, timing, perf_counter() - start)
+
+    async def __acall__(self, request):
+        timing = metrics.RequestTiming()
+        token = metrics.current_timing.set(timing)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_timing.reset(token)
+        return self.record(request, response, timing, perf_counter() - start)
+
+    def record(self, request, response, timing, duration):
+        metrics.registry.observe(
+            metrics.route_name(request), request.method, response.status_code, duration, timing
+        )
+        if self.server_timing:
+            response["Server-Timing"] = timing.server_timing(duration)
+        return response
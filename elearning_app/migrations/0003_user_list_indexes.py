@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('elearning_app', '0002_alter_user_user_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['user_type', '-created_at', '-id'], name='user_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['class_name', 'user_type', '-created_at', '-id'], name='user_class_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['employee_type', '-created_at', '-id'], name='user_emp_type_created_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    CourseRating = apps.get_model('elearning_app', 'CourseRating')
+    CourseRatingSummary = apps.get_model('elearning_app', 'CourseRatingSummary')
+    histogram = {
+        f'star_{star}': Count('id', filter=Q(star=star)) for star in range(1, 6)
+    }
+    rows = (
+        CourseRating.objects.filter(course_name__isnull=False)
+        .values('course_name')
+        .order_by()
+        .annotate(count=Count('id'), total=Sum('star', default=0), **histogram)
+    )
+    CourseRatingSummary.objects.bulk_create(
+        [CourseRatingSummary(course_id=row.pop('course_name'), **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0003_user_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseRatingSummary',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='elearning_app.coursedetails', verbose_name='Course')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Ratings')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total Stars')),
+                ('star_1', models.PositiveIntegerField(default=0)),
+                ('star_2', models.PositiveIntegerField(default=0)),
+                ('star_3', models.PositiveIntegerField(default=0)),
+                ('star_4', models.PositiveIntegerField(default=0)),
+                ('star_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Course Rating Summary',
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0004_course_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='date',
+            field=models.DateField(null=True, verbose_name='Date'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+
+
+def backfill_and_deduplicate(apps, schema_editor):
+    Attendance = apps.get_model('elearning_app', 'Attendance')
+    Attendance.objects.filter(date__isnull=True).update(date=TruncDate('date_time'))
+    duplicates = (
+        Attendance.objects.values('user_id', 'course_id', 'date')
+        .order_by()
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates.iterator():
+        Attendance.objects.filter(
+            user_id=row['user_id'], course_id=row['course_id'], date=row['date']
+        ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0005_attendance_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_and_deduplicate, migrations.RunPython.noop),
+    ]
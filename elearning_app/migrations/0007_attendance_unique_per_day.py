@@ -0,0 +1,33 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0006_attendance_date_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate, verbose_name='Date'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendance',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('user', 'course', 'date'), name='unique_attendance_per_day'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+from datetime import datetime, timezone
+
+import jwt
+from django.db import migrations, models
+
+
+def backfill_jti(apps, schema_editor):
+    BlacklistedToken = apps.get_model('elearning_app', 'BlacklistedToken')
+    now = datetime.now(tz=timezone.utc)
+    for blacklisted in BlacklistedToken.objects.filter(jti__isnull=True).iterator():
+        try:
+            payload = jwt.decode(blacklisted.token, options={'verify_signature': False})
+            expires_at = datetime.fromtimestamp(payload['exp'], tz=timezone.utc)
+            jti = payload['jti']
+        except (jwt.InvalidTokenError, KeyError):
+            blacklisted.delete()
+            continue
+        if expires_at <= now:
+            blacklisted.delete()
+            continue
+        blacklisted.jti = jti
+        blacklisted.expires_at = expires_at
+        blacklisted.save(update_fields=['jti', 'expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0007_attendance_unique_per_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='jti',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_jti, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:51
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0009_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(auto_created=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('filename', models.CharField(max_length=255, verbose_name='File Name')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Received Bytes')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', max_length=10)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+                ('subsection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='elearning_app.coursesubsection', verbose_name='Course SubSection')),
+            ],
+            options={
+                'verbose_name': 'Upload Session',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0010_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursesubsection',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_rollups(apps, schema_editor):
+    Attendance = apps.get_model('elearning_app', 'Attendance')
+    AttendanceRollup = apps.get_model('elearning_app', 'AttendanceRollup')
+    User = apps.get_model('elearning_app', 'User')
+    rows = (
+        Attendance.objects.values('course_id', 'user__class_name_id', 'date')
+        .order_by()
+        .annotate(
+            present=Count('id', filter=Q(status='present')),
+            absent=Count('id', filter=Q(status='absent')),
+        )
+    )
+    AttendanceRollup.objects.bulk_create(
+        [
+            AttendanceRollup(
+                course_id=row['course_id'],
+                class_name_id=row['user__class_name_id'],
+                date=row['date'],
+                present=row['present'],
+                absent=row['absent'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+    present_days = (
+        Attendance.objects.filter(user=OuterRef('pk'), status='present')
+        .order_by()
+        .values('user')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    User.objects.update(attendance=Coalesce(Subquery(present_days), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0011_media_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('class_name', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='elearning_app.classdetails')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='elearning_app.coursedetails')),
+            ],
+            options={
+                'verbose_name': 'Attendance Rollup',
+                'indexes': [models.Index(fields=['class_name', 'date'], name='rollup_class_date_idx'), models.Index(fields=['date'], name='rollup_date_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('class_name__isnull', False)), fields=('course', 'class_name', 'date'), name='unique_rollup_per_class_day'), models.UniqueConstraint(condition=models.Q(('class_name__isnull', True)), fields=('course', 'date'), name='unique_rollup_unassigned_day')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,132 @@
+from django.db import migrations
+
+# The statements are copied here rather than generated by elearning_app.search,
+# so later changes to that module cannot change what this migration runs.
+POSTGRES_INSTALL = [
+    'ALTER TABLE elearning_app_coursedetails ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """
+        CREATE OR REPLACE FUNCTION elearning_app_coursedetails_search_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_update ON elearning_app_coursedetails',
+    """
+        CREATE TRIGGER elearning_app_coursedetails_search_update
+        BEFORE INSERT OR UPDATE OF title, description ON elearning_app_coursedetails
+        FOR EACH ROW EXECUTE FUNCTION elearning_app_coursedetails_search_update()
+    """,
+    "UPDATE elearning_app_coursedetails SET search_vector = setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+    'CREATE INDEX IF NOT EXISTS elearning_app_coursedetails_search_idx ON elearning_app_coursedetails USING gin (search_vector)',
+    'ALTER TABLE elearning_app_coursesection ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """
+        CREATE OR REPLACE FUNCTION elearning_app_coursesection_search_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.section, '')), 'A');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_update ON elearning_app_coursesection',
+    """
+        CREATE TRIGGER elearning_app_coursesection_search_update
+        BEFORE INSERT OR UPDATE OF section ON elearning_app_coursesection
+        FOR EACH ROW EXECUTE FUNCTION elearning_app_coursesection_search_update()
+    """,
+    "UPDATE elearning_app_coursesection SET search_vector = setweight(to_tsvector('english', coalesce(section, '')), 'A')",
+    'CREATE INDEX IF NOT EXISTS elearning_app_coursesection_search_idx ON elearning_app_coursesection USING gin (search_vector)',
+    'ALTER TABLE elearning_app_coursesubsection ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """
+        CREATE OR REPLACE FUNCTION elearning_app_coursesubsection_search_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.sub_section_name, '')), 'A') || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_update ON elearning_app_coursesubsection',
+    """
+        CREATE TRIGGER elearning_app_coursesubsection_search_update
+        BEFORE INSERT OR UPDATE OF sub_section_name, description ON elearning_app_coursesubsection
+        FOR EACH ROW EXECUTE FUNCTION elearning_app_coursesubsection_search_update()
+    """,
+    "UPDATE elearning_app_coursesubsection SET search_vector = setweight(to_tsvector('english', coalesce(sub_section_name, '')), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+    'CREATE INDEX IF NOT EXISTS elearning_app_coursesubsection_search_idx ON elearning_app_coursesubsection USING gin (search_vector)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_update ON elearning_app_coursedetails',
+    'DROP FUNCTION IF EXISTS elearning_app_coursedetails_search_update()',
+    'ALTER TABLE elearning_app_coursedetails DROP COLUMN IF EXISTS search_vector',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_update ON elearning_app_coursesection',
+    'DROP FUNCTION IF EXISTS elearning_app_coursesection_search_update()',
+    'ALTER TABLE elearning_app_coursesection DROP COLUMN IF EXISTS search_vector',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_update ON elearning_app_coursesubsection',
+    'DROP FUNCTION IF EXISTS elearning_app_coursesubsection_search_update()',
+    'ALTER TABLE elearning_app_coursesubsection DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INSTALL = [
+    'DROP TABLE IF EXISTS elearning_search',
+    "CREATE VIRTUAL TABLE elearning_search USING fts5(kind UNINDEXED, object_id UNINDEXED, title, body, tokenize = 'porter unicode61')",
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_ad',
+    "CREATE TRIGGER elearning_app_coursedetails_search_ai AFTER INSERT ON elearning_app_coursedetails BEGIN INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('course', NEW.id, coalesce(NEW.title, ''), coalesce(NEW.description, '')); END",
+    "CREATE TRIGGER elearning_app_coursedetails_search_au AFTER UPDATE OF title, description ON elearning_app_coursedetails BEGIN DELETE FROM elearning_search WHERE kind = 'course' AND object_id = OLD.id; INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('course', NEW.id, coalesce(NEW.title, ''), coalesce(NEW.description, '')); END",
+    "CREATE TRIGGER elearning_app_coursedetails_search_ad AFTER DELETE ON elearning_app_coursedetails BEGIN DELETE FROM elearning_search WHERE kind = 'course' AND object_id = OLD.id; END",
+    "INSERT INTO elearning_search (kind, object_id, title, body) SELECT 'course', id, coalesce(title, ''), coalesce(description, '') FROM elearning_app_coursedetails",
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_ad',
+    "CREATE TRIGGER elearning_app_coursesection_search_ai AFTER INSERT ON elearning_app_coursesection BEGIN INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('section', NEW.id, coalesce(NEW.section, ''), ''); END",
+    "CREATE TRIGGER elearning_app_coursesection_search_au AFTER UPDATE OF section ON elearning_app_coursesection BEGIN DELETE FROM elearning_search WHERE kind = 'section' AND object_id = OLD.id; INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('section', NEW.id, coalesce(NEW.section, ''), ''); END",
+    "CREATE TRIGGER elearning_app_coursesection_search_ad AFTER DELETE ON elearning_app_coursesection BEGIN DELETE FROM elearning_search WHERE kind = 'section' AND object_id = OLD.id; END",
+    "INSERT INTO elearning_search (kind, object_id, title, body) SELECT 'section', id, coalesce(section, ''), '' FROM elearning_app_coursesection",
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_ad',
+    "CREATE TRIGGER elearning_app_coursesubsection_search_ai AFTER INSERT ON elearning_app_coursesubsection BEGIN INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('subsection', NEW.id, coalesce(NEW.sub_section_name, ''), coalesce(NEW.description, '')); END",
+    "CREATE TRIGGER elearning_app_coursesubsection_search_au AFTER UPDATE OF sub_section_name, description ON elearning_app_coursesubsection BEGIN DELETE FROM elearning_search WHERE kind = 'subsection' AND object_id = OLD.id; INSERT INTO elearning_search (kind, object_id, title, body) VALUES ('subsection', NEW.id, coalesce(NEW.sub_section_name, ''), coalesce(NEW.description, '')); END",
+    "CREATE TRIGGER elearning_app_coursesubsection_search_ad AFTER DELETE ON elearning_app_coursesubsection BEGIN DELETE FROM elearning_search WHERE kind = 'subsection' AND object_id = OLD.id; END",
+    "INSERT INTO elearning_search (kind, object_id, title, body) SELECT 'subsection', id, coalesce(sub_section_name, ''), coalesce(description, '') FROM elearning_app_coursesubsection",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursedetails_search_ad',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesection_search_ad',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_ai',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_au',
+    'DROP TRIGGER IF EXISTS elearning_app_coursesubsection_search_ad',
+    'DROP TABLE IF EXISTS elearning_search',
+]
+
+
+def run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql, params=None)
+
+
+def install(apps, schema_editor):
+    run(schema_editor, {"postgresql": POSTGRES_INSTALL, "sqlite": SQLITE_INSTALL})
+
+
+def uninstall(apps, schema_editor):
+    run(schema_editor, {"postgresql": POSTGRES_UNINSTALL, "sqlite": SQLITE_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0012_attendance_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Copied from elearning_app.search so later changes there cannot alter this migration.
+INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS elearning_app_user_people_trgm ON elearning_app_user USING gin ((lower(coalesce(first_name, '') || ' ' || coalesce(middle_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') || ' ' || coalesce(contact, '') || ' ' || coalesce(mother_first_name, '') || ' ' || coalesce(mother_middle_name, '') || ' ' || coalesce(mother_last_name, '') || ' ' || coalesce(father_first_name, '') || ' ' || coalesce(father_middle_name, '') || ' ' || coalesce(father_last_name, ''))) gin_trgm_ops)",
+]
+UNINSTALL = [
+    "DROP INDEX IF EXISTS elearning_app_user_people_trgm",
+]
+
+
+def run(schema_editor, statements):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+def install(apps, schema_editor):
+    run(schema_editor, INSTALL)
+
+
+def uninstall(apps, schema_editor):
+    run(schema_editor, UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0013_content_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
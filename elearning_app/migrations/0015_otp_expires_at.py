@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0014_people_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_created_at(apps, schema_editor):
+    User = apps.get_model('elearning_app', 'User')
+    User.objects.filter(created_at__isnull=True).update(created_at=F('date_joined'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0015_otp_expires_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
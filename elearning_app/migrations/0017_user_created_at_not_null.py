@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0016_user_created_at_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def redact_delivered(apps, schema_editor):
+    OutboxEmail = apps.get_model('elearning_app', 'OutboxEmail')
+    OutboxEmail.objects.filter(status__in=['sent', 'failed']).exclude(body='').update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0017_user_created_at_not_null'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_delivered, migrations.RunPython.noop),
+    ]
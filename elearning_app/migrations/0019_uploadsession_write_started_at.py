@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0018_outbox_redact_delivered'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='write_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_class_name(apps, schema_editor):
+    # Existing rollups were built from each student's current class.
+    Attendance = apps.get_model('elearning_app', 'Attendance')
+    User = apps.get_model('elearning_app', 'User')
+    Attendance.objects.update(
+        class_name=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('class_name')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning_app', '0019_uploadsession_write_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='class_name',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='elearning_app.classdetails', verbose_name='Class'),
+        ),
+        migrations.RunPython(backfill_class_name, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,15 @@
 import uuid
+from collections import defaultdict
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from ckeditor.fields import RichTextField
 from django.utils import timezone
 
+from .caching import VersionedQuerySet
+
 GENDER_CHOICES = [
     ("male", "Male"),
     ("female", "Female"),
@@ -22,6 +26,7 @@ EMPLOYEE_TYPE = [
     ("part_time", "Part Time"),
     ("full_time", "Full Time"),
 ]
+RATING_STARS = range(1, 6)
 
 
 class DateTimeMixin(models.Model):
@@ -87,6 +92,8 @@ class EmployeePosition(DateTimeMixin):
 class ClassDetails(DateTimeMixin):
     name = models.CharField(max_length=200)
 
+    objects = VersionedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Class Details")
 
@@ -101,6 +108,8 @@ class User(AbstractUser, DateTimeMixin):
         blank=True,
         null=True,
     )
+    # The user lists page on created_at, which must not be NULL.
+    created_at = models.DateTimeField(auto_now_add=True)
     middle_name = models.CharField(max_length=100, null=True, blank=True,verbose_name=_("Middle Name"))
     contact = models.CharField(max_length=15, blank=True, null=True,verbose_name=_("Contact Number"))
     emergency_contact = models.CharField(max_length=15, blank=True, null=True,verbose_name=_("Emergency contact"))
@@ -147,6 +156,7 @@ class User(AbstractUser, DateTimeMixin):
         verbose_name=_("Class"),
     )
     photo = models.FileField(upload_to="media/student/profile/", null=True, blank=True)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     mother_first_name = models.CharField(max_length=100, null=True, blank=True)
     mother_middle_name = models.CharField(max_length=100, null=True, blank=True)
     mother_last_name = models.CharField(max_length=100, null=True, blank=True)
@@ -164,6 +174,22 @@ class User(AbstractUser, DateTimeMixin):
     REQUIRED_FIELDS = []
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=["user_type", "-created_at", "-id"],
+                name="user_type_created_idx",
+            ),
+            models.Index(
+                fields=["class_name", "user_type", "-created_at", "-id"],
+                name="user_class_created_idx",
+            ),
+            models.Index(
+                fields=["employee_type", "-created_at", "-id"],
+                name="user_emp_type_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -176,6 +202,8 @@ class OTP(DateTimeMixin):
     email = models.EmailField(unique=True)
     otp = models.CharField(max_length=4)
     token = models.CharField(max_length=12, blank=True, null=True)
+    # Rows written before expiry existed default to already expired.
+    expires_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f"{self.email} - {self.otp}"
@@ -202,6 +230,8 @@ class CourseDetails(DateTimeMixin):
         verbose_name=_("Created By"),
     )
 
+    objects = VersionedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Course Details")
 
@@ -228,6 +258,8 @@ class CourseSection(DateTimeMixin):
         null=True,
     )
 
+    objects = VersionedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Course Section")
 
@@ -253,6 +285,7 @@ class CourseSubSection(DateTimeMixin):
         blank=True,
         null=True,
     )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_by = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -268,6 +301,78 @@ class CourseSubSection(DateTimeMixin):
         return self.sub_section_name
 
 
+class UploadSession(DateTimeMixin):
+    UPLOADING = "uploading"
+    COMPLETE = "complete"
+    STATUS_CHOICES = [
+        (UPLOADING, "Uploading"),
+        (COMPLETE, "Complete"),
+    ]
+    subsection = models.ForeignKey(
+        CourseSubSection,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        verbose_name=_("Course SubSection"),
+    )
+    filename = models.CharField(max_length=255, verbose_name=_("File Name"))
+    size = models.BigIntegerField(verbose_name=_("Size"))
+    offset = models.BigIntegerField(default=0, verbose_name=_("Received Bytes"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    # Set while a chunk is being written, so two requests cannot write at once.
+    write_started_at = models.DateTimeField(blank=True, null=True, editable=False)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name=_("Created By"),
+    )
+
+    class Meta:
+        verbose_name = _("Upload Session")
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def partial_name(self):
+        return f"media/uploads/partial/{self.id}.part"
+
+
+class UserImportJob(DateTimeMixin):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    user_type = models.CharField(max_length=10, verbose_name=_("User Type"))
+    # Removed once the job has run; only the report is kept.
+    file = models.FileField(upload_to="media/imports/", blank=True, verbose_name=_("File"))
+    filename = models.CharField(max_length=255, verbose_name=_("File Name"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    report = models.JSONField(blank=True, null=True, verbose_name=_("Report"))
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name=_("Created By"),
+    )
+
+    class Meta:
+        verbose_name = _("User Import Job")
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
 class CourseRating(DateTimeMixin):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, blank=True, null=True, verbose_name=_("user")
@@ -288,6 +393,54 @@ class CourseRating(DateTimeMixin):
         verbose_name = _("Course Rating Table")
 
 
+class CourseRatingSummary(models.Model):
+    course = models.OneToOneField(
+        CourseDetails,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="rating_summary",
+        verbose_name=_("Course"),
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Ratings"))
+    total = models.PositiveIntegerField(default=0, verbose_name=_("Total Stars"))
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Course Rating Summary")
+
+    @property
+    def overall_rating(self):
+        if not self.count:
+            return 0
+        return self.total / self.count
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f"star_{star}") for star in RATING_STARS}
+
+    @classmethod
+    def apply(cls, course_id, star, delta=1):
+        """
+        Add (delta=1) or remove (delta=-1) one rating from the course summary.
+        Must run inside the transaction that writes the CourseRating row.
+        """
+        if course_id is None or star not in RATING_STARS:
+            # Legacy rows without a 1-5 star are left out of the summary.
+            return
+        changes = {
+            "count": models.F("count") + delta,
+            "total": models.F("total") + star * delta,
+            f"star_{star}": models.F(f"star_{star}") + delta,
+        }
+        if not cls.objects.filter(course_id=course_id).update(**changes):
+            cls.objects.get_or_create(course_id=course_id)
+            cls.objects.filter(course_id=course_id).update(**changes)
+
+
 class QuizSection(DateTimeMixin):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, blank=True, null=True, verbose_name=_("user")
@@ -333,8 +486,39 @@ class CourseLevel(DateTimeMixin):
     class Meta:
         verbose_name = _("Course Level Table")
 
+class OutboxEmail(DateTimeMixin):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+    subject = models.CharField(max_length=255, verbose_name=_("Subject"))
+    body = models.TextField(verbose_name=_("Body"))
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    recipients = models.JSONField(default=list, verbose_name=_("Recipients"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Email Outbox")
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+
 class BlacklistedToken(DateTimeMixin):
     token = models.CharField(max_length=355, unique=True)
+    jti = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     blacklisted_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -344,9 +528,18 @@ class BlacklistedToken(DateTimeMixin):
 class Attendance(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_records') 
     course = models.ForeignKey(CourseDetails, on_delete=models.CASCADE)
-
+    # The student's class when the row was first written. Rollups count the
+    # row under this class, so a later class change leaves them consistent.
+    class_name = models.ForeignKey(
+        ClassDetails,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='attendance_records',
+        verbose_name=_("Class"),
+    )
+    date = models.DateField(default=timezone.localdate, verbose_name=_("Date"))
     date_time = models.DateTimeField(auto_now=True)
-      # Corrected line
     STATUS_CHOICES = [
         ('present', 'Present'),
         ('absent', 'Absent'),
@@ -354,5 +547,86 @@ class Attendance(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
 
     class Meta:
-        unique_together = ('user', 'date_time')
-            
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'course', 'date'], name='unique_attendance_per_day'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+            models.Index(fields=['date'], name='attendance_date_idx'),
+        ]
+
+
+class AttendanceRollup(models.Model):
+    """
+    Present/absent counts per course, class and day, kept in step with
+    Attendance writes so rate reports never scan the raw table. Rows are
+    counted under Attendance.class_name, the class at the time of marking.
+    """
+    course = models.ForeignKey(CourseDetails, on_delete=models.CASCADE, related_name='attendance_rollups')
+    class_name = models.ForeignKey(
+        ClassDetails, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_rollups'
+    )
+    date = models.DateField(verbose_name=_("Date"))
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Attendance Rollup")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['course', 'class_name', 'date'],
+                condition=models.Q(class_name__isnull=False),
+                name='unique_rollup_per_class_day',
+            ),
+            models.UniqueConstraint(
+                fields=['course', 'date'],
+                condition=models.Q(class_name__isnull=True),
+                name='unique_rollup_unassigned_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['class_name', 'date'], name='rollup_class_date_idx'),
+            models.Index(fields=['date'], name='rollup_date_idx'),
+        ]
+
+    @classmethod
+    def apply(cls, course_id, class_id, day, present=0, absent=0):
+        changes = {
+            'present': models.F('present') + present,
+            'absent': models.F('absent') + absent,
+        }
+        rows = cls.objects.filter(course_id=course_id, class_name_id=class_id, date=day)
+        if not rows.update(**changes):
+            cls.objects.get_or_create(course_id=course_id, class_name_id=class_id, date=day)
+            rows.update(**changes)
+
+    @classmethod
+    def record(cls, course_id, day, changes):
+        """
+        Apply attendance transitions to the rollup and to User.attendance.
+        ``changes`` yields (user_id, class_id, previous, current) where a status
+        of None means there was no row. Must run inside the transaction that
+        writes the Attendance rows.
+        """
+        deltas = defaultdict(lambda: {'present': 0, 'absent': 0})
+        gained, lost = [], []
+        for user_id, class_id, previous, current in changes:
+            if previous == current:
+                continue
+            if previous in ('present', 'absent'):
+                deltas[class_id][previous] -= 1
+            if current in ('present', 'absent'):
+                deltas[class_id][current] += 1
+            if current == 'present':
+                gained.append(user_id)
+            elif previous == 'present':
+                lost.append(user_id)
+        for class_id, counts in deltas.items():
+            if counts['present'] or counts['absent']:
+                cls.apply(course_id, class_id, day, **counts)
+        if gained:
+            User.objects.filter(id__in=gained).update(attendance=Coalesce('attendance', 0) + 1)
+        if lost:
+            User.objects.filter(id__in=lost).update(attendance=Coalesce('attendance', 0) - 1)
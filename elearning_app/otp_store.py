@@ -0,0 +1,213 @@
+"""
+Short-lived password-reset codes and reset tokens.
+
+send-otp issues a code, verify-otp exchanges it for a reset token, and
+reset-password spends the token. Each step is one keyed operation on the
+store, each code or token can be used only once, and both expire:
+OTP_CODE_TTL and OTP_TOKEN_TTL are in seconds. OTP_STORE selects the
+backend.
+
+- CacheOTPStore keeps entries in a Django cache, which expires them itself.
+- DatabaseOTPStore uses the OTP table and its indexed ``expires_at``.
+  Expired rows are ignored on read and removed in batches by the
+  sweep_expired_otps command.
+"""
+import hashlib
+import secrets
+import string
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+from .models import OTP
+
+CODE_LENGTH = 4
+TOKEN_LENGTH = 12
+
+
+def generate_code():
+    return "".join(secrets.choice(string.digits) for _ in range(CODE_LENGTH))
+
+
+def generate_token():
+    return "".join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(TOKEN_LENGTH))
+
+
+def normalize_email(email):
+    """The form emails are stored and looked up in; views apply it once on input."""
+    return (email or "").strip().lower()
+
+
+class BaseOTPStore(ABC):
+    def __init__(self, code_ttl=None, token_ttl=None):
+        self.code_ttl = code_ttl or getattr(settings, "OTP_CODE_TTL", 600)
+        self.token_ttl = token_ttl or getattr(settings, "OTP_TOKEN_TTL", 900)
+
+    @abstractmethod
+    def issue_code(self, email, code=None):
+        """Store a fresh code for ``email``, replacing any pending one, and return it."""
+
+    @abstractmethod
+    def verify_code(self, email, code):
+        """Consume a matching, unexpired code and return a new reset token, or None."""
+
+    @abstractmethod
+    def consume_token(self, email, token):
+        """Consume a matching, unexpired reset token; return whether there was one."""
+
+    def sweep(self, batch_size=1000):
+        """Delete expired entries and return how many went. Stores with native TTLs have none."""
+        return 0
+
+    async def aissue_code(self, email, code=None):
+        return await sync_to_async(self.issue_code)(email, code)
+
+    async def averify_code(self, email, code):
+        return await sync_to_async(self.verify_code)(email, code)
+
+    async def aconsume_token(self, email, token):
+        return await sync_to_async(self.consume_token)(email, token)
+
+
+class CacheOTPStore(BaseOTPStore):
+    def __init__(self, alias=None, **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias or getattr(settings, "OTP_CACHE_ALIAS", "default")
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, kind, email):
+        digest = hashlib.md5(normalize_email(email).encode()).hexdigest()
+        return f"otp:{kind}:{digest}"
+
+    def issue_code(self, email, code=None):
+        code = code or generate_code()
+        self.cache.set(self.key("code", email), code, self.code_ttl)
+        self.cache.delete(self.key("token", email))
+        return code
+
+    def verify_code(self, email, code):
+        key = self.key("code", email)
+        stored = self.cache.get(key)
+        # delete() reports whether the key was still there, so of two
+        # concurrent requests with the right code only one gets a token.
+        if not code or not stored or not constant_time_compare(stored, code) or not self.cache.delete(key):
+            return None
+        token = generate_token()
+        self.cache.set(self.key("token", email), token, self.token_ttl)
+        return token
+
+    def consume_token(self, email, token):
+        key = self.key("token", email)
+        stored = self.cache.get(key)
+        return bool(token and stored and constant_time_compare(stored, token) and self.cache.delete(key))
+
+    async def aissue_code(self, email, code=None):
+        code = code or generate_code()
+        await self.cache.aset(self.key("code", email), code, self.code_ttl)
+        await self.cache.adelete(self.key("token", email))
+        return code
+
+    async def averify_code(self, email, code):
+        key = self.key("code", email)
+        stored = await self.cache.aget(key)
+        if not code or not stored or not constant_time_compare(stored, code) or not await self.cache.adelete(key):
+            return None
+        token = generate_token()
+        await self.cache.aset(self.key("token", email), token, self.token_ttl)
+        return token
+
+    async def aconsume_token(self, email, token):
+        key = self.key("token", email)
+        stored = await self.cache.aget(key)
+        return bool(token and stored and constant_time_compare(stored, token) and await self.cache.adelete(key))
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """
+    One OTP row per email (the email is unique). Verifying a code and
+    spending a token are each a single conditional UPDATE or DELETE keyed on
+    the email, so a code or token cannot be used twice.
+    """
+
+    def _issue(self, email, code):
+        return (
+            {"email": normalize_email(email)},
+            {"otp": code, "token": None, "expires_at": timezone.now() + timedelta(seconds=self.code_ttl)},
+        )
+
+    def _verify(self, email, code):
+        now = timezone.now()
+        token = generate_token()
+        queryset = OTP.objects.filter(email=normalize_email(email), otp=code, expires_at__gt=now)
+        changes = {"otp": "", "token": token, "expires_at": now + timedelta(seconds=self.token_ttl)}
+        return queryset, changes, token
+
+    def _token(self, email, token):
+        return OTP.objects.filter(email=normalize_email(email), token=token, expires_at__gt=timezone.now())
+
+    def issue_code(self, email, code=None):
+        code = code or generate_code()
+        lookup, defaults = self._issue(email, code)
+        OTP.objects.update_or_create(**lookup, defaults=defaults)
+        return code
+
+    def verify_code(self, email, code):
+        if not code:
+            return None
+        queryset, changes, token = self._verify(email, code)
+        return token if queryset.update(**changes) else None
+
+    def consume_token(self, email, token):
+        if not token:
+            return False
+        deleted, _ = self._token(email, token).delete()
+        return bool(deleted)
+
+    async def aissue_code(self, email, code=None):
+        code = code or generate_code()
+        lookup, defaults = self._issue(email, code)
+        await OTP.objects.aupdate_or_create(**lookup, defaults=defaults)
+        return code
+
+    async def averify_code(self, email, code):
+        if not code:
+            return None
+        queryset, changes, token = self._verify(email, code)
+        return token if await queryset.aupdate(**changes) else None
+
+    async def aconsume_token(self, email, token):
+        if not token:
+            return False
+        deleted, _ = await self._token(email, token).adelete()
+        return bool(deleted)
+
+    def sweep(self, batch_size=1000):
+        total = 0
+        while True:
+            expired = OTP.objects.filter(expires_at__lte=timezone.now())
+            ids = list(expired.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return total
+            # Re-check the expiry so a row re-issued since the select survives.
+            deleted, _ = expired.filter(pk__in=ids).delete()
+            total += deleted
+
+
+_store = None
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        path = getattr(settings, "OTP_STORE", "elearning_app.otp_store.DatabaseOTPStore")
+        _store = import_string(path)()
+    return _store
@@ -1,7 +1,21 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 class CoursePagination(PageNumberPagination):
     page_size=10
     page_size_query_param = 'records'
     max_page_size=20
-    last_page_strings='last'
\ No newline at end of file
+    last_page_strings='last'
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the User backed list endpoints. Pages are read with
+    a seek on created_at so latency does not grow with the page depth.
+    User.created_at is NOT NULL, so no row falls outside the seek; rows
+    sharing a timestamp are told apart by the cursor offset, and id keeps
+    their order stable.
+    """
+    page_size = 20
+    page_size_query_param = 'records'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
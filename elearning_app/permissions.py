@@ -27,3 +27,12 @@ class IsSchoolAdmin(permissions.BasePermission):
         return user.user_type in ['admin']
     
 
+
+
+def can_manage_subsection(user, subsection):
+    """Admins and the owner of the subsection's course may replace its media."""
+    if user.user_type == "admin":
+        return True
+    section = subsection.course_section
+    course = section.course_name if section else None
+    return course is not None and course.created_by_id == user.id
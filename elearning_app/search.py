@@ -0,0 +1,377 @@
+"""
+Ranked full-text search over courses, sections and subsections.
+
+On Postgres each source table carries a ``search_vector`` tsvector column,
+kept current by a trigger (title weighted above description) and indexed with
+GIN. Queries go through websearch_to_tsquery, are ranked with ts_rank, and
+only the returned page is passed to ts_headline. On SQLite, for local
+development, the same text is mirrored by triggers into one FTS5 table that
+is ranked with bm25.
+
+Snippets are HTML: the database marks matches with control characters, and
+the text is escaped before those become <mark> tags, so markup in course
+content is never passed through.
+
+The columns, triggers and tables are created by migration 0013 and are not
+part of the models. ``install_search`` recreates them; run the
+rebuild_search_index command if a SQLite table rebuild has dropped the
+triggers.
+
+The people directory (``search_people``) is a type-ahead substring match
+over user names, contacts and parent names. On Postgres it is served by one
+pg_trgm GIN index over the lower-cased concatenation of those columns
+(migration 0014); elsewhere it falls back to icontains lookups.
+"""
+import re
+import uuid
+from html import escape
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "english"
+FTS_TABLE = "elearning_search"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# Match delimiters used inside the database; escape() leaves them alone.
+MATCH_START = "\x02"
+MATCH_STOP = "\x03"
+
+# kind -> (table, title column, description column or None)
+SOURCES = {
+    "course": ("elearning_app_coursedetails", "title", "description"),
+    "section": ("elearning_app_coursesection", "section", None),
+    "subsection": ("elearning_app_coursesubsection", "sub_section_name", "description"),
+}
+
+
+def _pg_vector(prefix, title, body):
+    vector = f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}{title}, '')), 'A')"
+    if body:
+        vector += f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}{body}, '')), 'B')"
+    return vector
+
+
+def _postgres_install_sql():
+    for table, title, body in SOURCES.values():
+        columns = ", ".join(column for column in (title, body) if column)
+        yield f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector"
+        yield f"""
+            CREATE OR REPLACE FUNCTION {table}_search_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {_pg_vector("NEW.", title, body)};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """
+        yield f"DROP TRIGGER IF EXISTS {table}_search_update ON {table}"
+        yield f"""
+            CREATE TRIGGER {table}_search_update
+            BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_update()
+        """
+        yield f"UPDATE {table} SET search_vector = {_pg_vector('', title, body)}"
+        yield f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)"
+
+
+def _postgres_uninstall_sql():
+    for table, _, _ in SOURCES.values():
+        yield f"DROP TRIGGER IF EXISTS {table}_search_update ON {table}"
+        yield f"DROP FUNCTION IF EXISTS {table}_search_update()"
+        yield f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"
+
+
+def _sqlite_row(kind, prefix, title, body):
+    body_sql = f"coalesce({prefix}{body}, '')" if body else "''"
+    return f"'{kind}', {prefix}id, coalesce({prefix}{title}, ''), {body_sql}"
+
+
+def _sqlite_install_sql():
+    yield f"DROP TABLE IF EXISTS {FTS_TABLE}"
+    yield (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, title, body, tokenize = 'porter unicode61')"
+    )
+    for kind, (table, title, body) in SOURCES.items():
+        columns = ", ".join(column for column in (title, body) if column)
+        insert = f"INSERT INTO {FTS_TABLE} (kind, object_id, title, body) VALUES ({_sqlite_row(kind, 'NEW.', title, body)});"
+        delete = f"DELETE FROM {FTS_TABLE} WHERE kind = '{kind}' AND object_id = OLD.id;"
+        for suffix in ("ai", "au", "ad"):
+            yield f"DROP TRIGGER IF EXISTS {table}_search_{suffix}"
+        yield f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END"
+        yield f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END"
+        yield f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END"
+        yield (
+            f"INSERT INTO {FTS_TABLE} (kind, object_id, title, body) "
+            f"SELECT {_sqlite_row(kind, '', title, body)} FROM {table}"
+        )
+
+
+def _sqlite_uninstall_sql():
+    for table, _, _ in SOURCES.values():
+        for suffix in ("ai", "au", "ad"):
+            yield f"DROP TRIGGER IF EXISTS {table}_search_{suffix}"
+    yield f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+
+def install_search(schema_editor):
+    """Create (or recreate) and populate the search structures for this database."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = _postgres_install_sql()
+    elif vendor == "sqlite":
+        statements = _sqlite_install_sql()
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+def uninstall_search(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = _postgres_uninstall_sql()
+    elif vendor == "sqlite":
+        statements = _sqlite_uninstall_sql()
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+def _postgres_search(cursor, text, kinds, limit, offset):
+    hits = " UNION ALL ".join(
+        f"""
+        SELECT '{kind}' AS kind, id, coalesce({title}, '') AS title,
+               {f"coalesce({body}, '')" if body else "''"} AS body,
+               ts_rank(search_vector, q.tsq) AS rank
+        FROM {table}, q
+        WHERE search_vector @@ q.tsq
+        """
+        for kind, (table, title, body) in SOURCES.items()
+        if kind in kinds
+    )
+    options = (
+        f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", '
+        "MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=\" … \""
+    )
+    cursor.execute(
+        f"""
+        WITH q AS (SELECT websearch_to_tsquery(%s, %s) AS tsq),
+        hits AS ({hits}),
+        page AS (
+            SELECT *, count(*) OVER () AS total FROM hits
+            ORDER BY rank DESC, kind, id LIMIT %s OFFSET %s
+        )
+        SELECT page.kind, page.id, page.title,
+               ts_headline(%s, page.title || ' ' || page.body, q.tsq, %s),
+               page.rank, page.total
+        FROM page, q
+        ORDER BY page.rank DESC, page.kind, page.id
+        """,
+        [SEARCH_CONFIG, text, limit, offset, SEARCH_CONFIG, options],
+    )
+    rows = cursor.fetchall()
+    if rows:
+        total = rows[0][5]
+    elif offset:
+        cursor.execute(
+            f"WITH q AS (SELECT websearch_to_tsquery(%s, %s) AS tsq) SELECT count(*) FROM ({hits}) hits",
+            [SEARCH_CONFIG, text],
+        )
+        total = cursor.fetchone()[0]
+    else:
+        total = 0
+    return total, [row[:5] for row in rows]
+
+
+def fts_query(text):
+    """Quote each word so user input can never be read as FTS5 syntax."""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", text))
+
+
+def _sqlite_search(cursor, text, kinds, limit, offset):
+    match = fts_query(text)
+    if not match:
+        return 0, []
+    where = f"{FTS_TABLE} MATCH %s"
+    if len(kinds) < len(SOURCES):
+        # kind is UNINDEXED, so filtering on it reads every match; skip it
+        # when all kinds are wanted.
+        where += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+    else:
+        kinds = []
+    cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {where}", [match, *kinds])
+    total = cursor.fetchone()[0]
+    cursor.execute(
+        f"""
+        SELECT kind, object_id, title,
+               snippet({FTS_TABLE}, -1, %s, %s, ' … ', 16),
+               -bm25({FTS_TABLE}, 0.0, 0.0, 10.0, 3.0) AS rank
+        FROM {FTS_TABLE}
+        WHERE {where}
+        ORDER BY rank DESC, kind, object_id
+        LIMIT %s OFFSET %s
+        """,
+        [MATCH_START, MATCH_STOP, match, *kinds, limit, offset],
+    )
+    rows = [
+        (kind, uuid.UUID(object_id), title, snippet, rank)
+        for kind, object_id, title, snippet, rank in cursor.fetchall()
+    ]
+    return total, rows
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn its match delimiters into <mark> tags."""
+    return escape(snippet).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_STOP, HIGHLIGHT_STOP)
+
+
+def search_content(text, kinds=None, limit=20, offset=0):
+    """
+    Return (total matches, page) for ``text``. Each hit is a dict with kind,
+    id, course_id, title (plain text), snippet (escaped HTML with matches
+    wrapped in <mark>) and rank.
+    """
+    from .models import CourseSection, CourseSubSection
+
+    kinds = [kind for kind in SOURCES if not kinds or kind in kinds]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            total, rows = _postgres_search(cursor, text, kinds, limit, offset)
+        else:
+            total, rows = _sqlite_search(cursor, text, kinds, limit, offset)
+
+    ids = {kind: [row[1] for row in rows if row[0] == kind] for kind in SOURCES}
+    course_ids = {object_id: object_id for object_id in ids["course"]}
+    if ids["section"]:
+        course_ids.update(
+            CourseSection.objects.filter(id__in=ids["section"]).values_list("id", "course_name_id")
+        )
+    if ids["subsection"]:
+        course_ids.update(
+            CourseSubSection.objects.filter(id__in=ids["subsection"]).values_list(
+                "id", "course_section__course_name_id"
+            )
+        )
+    results = [
+        {
+            "kind": kind,
+            "id": object_id,
+            "course_id": course_ids.get(object_id),
+            "title": title,
+            "snippet": highlight(snippet),
+            "rank": round(float(rank), 6),
+        }
+        for kind, object_id, title, snippet, rank in rows
+    ]
+    return total, results
+
+
+PEOPLE_TABLE = "elearning_app_user"
+PEOPLE_INDEX = "elearning_app_user_people_trgm"
+PEOPLE_COLUMNS = (
+    "first_name",
+    "middle_name",
+    "last_name",
+    "email",
+    "contact",
+    "mother_first_name",
+    "mother_middle_name",
+    "mother_last_name",
+    "father_first_name",
+    "father_middle_name",
+    "father_last_name",
+)
+# Must stay identical to the indexed expression for the planner to use it.
+PEOPLE_DOCUMENT = "lower({})".format(
+    " || ' ' || ".join(f"coalesce({column}, '')" for column in PEOPLE_COLUMNS)
+)
+PEOPLE_RESULT_FIELDS = (
+    "id",
+    "first_name",
+    "middle_name",
+    "last_name",
+    "email",
+    "contact",
+    "user_type",
+    "class_name_id",
+    "class_name__name",
+)
+
+
+def install_people_search(schema_editor):
+    """Create the trigram index behind ``search_people`` (Postgres only)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm", params=None)
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {PEOPLE_INDEX} ON {PEOPLE_TABLE} "
+        f"USING gin (({PEOPLE_DOCUMENT}) gin_trgm_ops)",
+        params=None,
+    )
+
+
+def uninstall_people_search(schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {PEOPLE_INDEX}", params=None)
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_people(text, user_types=None, class_name=None, limit=10):
+    """
+    Return up to ``limit`` compact user dicts where every word of ``text``
+    appears in a name, email, contact or parent name. On Postgres results
+    are ordered by trigram word similarity, otherwise by name.
+    """
+    from .models import User
+
+    terms = text.lower().split()
+    if not terms:
+        return []
+    queryset = User.objects.all()
+    if user_types:
+        queryset = queryset.filter(user_type__in=user_types)
+    if class_name:
+        queryset = queryset.filter(class_name=class_name)
+
+    if connection.vendor == "postgresql":
+        for term in terms:
+            queryset = queryset.filter(
+                RawSQL(
+                    f"{PEOPLE_DOCUMENT} LIKE %s ESCAPE '\\'", [_like_pattern(term)], output_field=BooleanField()
+                )
+            )
+        queryset = queryset.annotate(
+            rank=RawSQL(
+                f"word_similarity(%s, {PEOPLE_DOCUMENT})", [" ".join(terms)], output_field=FloatField()
+            )
+        ).order_by("-rank", "last_name", "first_name", "id")
+    else:
+        for term in terms:
+            match = Q()
+            for column in PEOPLE_COLUMNS:
+                match |= Q(**{f"{column}__icontains": term})
+            queryset = queryset.filter(match)
+        queryset = queryset.order_by("last_name", "first_name", "id")
+
+    return [
+        {
+            "id": row["id"],
+            "name": " ".join(
+                part for part in (row["first_name"], row["middle_name"], row["last_name"]) if part
+            ),
+            "email": row["email"],
+            "contact": row["contact"],
+            "user_type": row["user_type"],
+            "class_name": row["class_name_id"],
+            "class_label": row["class_name__name"],
+        }
+        for row in queryset.values(*PEOPLE_RESULT_FIELDS)[:limit]
+    ]
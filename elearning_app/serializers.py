@@ -1,10 +1,17 @@
 from rest_framework import serializers
 from .models import *
-from datetime import datetime
+from datetime import date, datetime
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken,AccessToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.hashers import make_password
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from .authentication import revocation_cache, token_expiry
 
 
 User = get_user_model()
@@ -137,16 +144,149 @@ class UserLogoutSerializer(serializers.Serializer):
 
     def logout_user(self):
         access_token = self.validated_data['access_token']
-        if BlacklistedToken.objects.filter(token=access_token).exists():
+        try:
+            token = AccessToken(access_token)
+        except TokenError:
+            raise serializers.ValidationError('Invalid access token')
+        jti = token[jwt_settings.JTI_CLAIM]
+        if BlacklistedToken.objects.filter(jti=jti).exists():
             raise serializers.ValidationError('Access token already blacklisted')
-        BlacklistedToken.objects.create(token=access_token)
+        expires_at = token_expiry(token)
+        BlacklistedToken.objects.create(token=access_token, jti=jti, expires_at=expires_at)
+        revocation_cache.add(jti, expires_at)
         
+class VariantURLsField(serializers.ReadOnlyField):
+    """Render a ``*_variants`` mapping as {variant: url}."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in (value or {}).items():
+            if variant in ('hash', 'source'):
+                continue
+            url = default_storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+def split_param(value):
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
 class UserDetailsSerializer(serializers.ModelSerializer):
+    """
+    ``fields`` restricts the output to the given names; relations listed in
+    ``expandable_fields`` are rendered nested (depth=1) when selected.
+    """
+    photo_variants = VariantURLsField()
+    expandable_fields = ['position', 'class_name']
 
     class Meta:
         model = User
-        fields = ['email', 'created_at', 'updated_at']
+        fields = ['email', 'created_at', 'updated_at', 'photo_variants']
         depth=1    
+
+    def __init__(self, *args, fields=None, **kwargs):
+        self.selected_fields = fields
+        super().__init__(*args, **kwargs)
+
+    def get_field_names(self, declared_fields, info):
+        if self.selected_fields is None:
+            return super().get_field_names(declared_fields, info)
+        return list(self.selected_fields)
+
+    @classmethod
+    def fieldset_from_request(cls, request):
+        """Resolve ``?fields=`` and ``?expand=`` into serializer field names."""
+        default = list(cls.Meta.fields)
+        fields = split_param(request.query_params.get('fields'))
+        expand = split_param(request.query_params.get('expand'))
+        unknown = [name for name in fields if name not in default + cls.expandable_fields]
+        unknown += [name for name in expand if name not in cls.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': [f"Unknown field: {name}" for name in unknown]}
+            )
+        selected = fields or default
+        return selected + [name for name in expand if name not in selected]
+
+    @classmethod
+    def optimize_queryset(cls, queryset, field_names, extra_fields=()):
+        """select_related the expanded relations and only() load used columns."""
+        columns = set(extra_fields)
+        for name in field_names:
+            try:
+                field = cls.Meta.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(name)
+        related = [name for name in field_names if name in cls.expandable_fields]
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+
+class BulkUserFieldsSerializer(serializers.ModelSerializer):
+    """Validates User field values for a bulk update without loading any row."""
+
+    class Meta:
+        model = User
+        fields = ['class_name', 'position', 'employee_type', 'user_type', 'language', 'leaves']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        self.selected_fields = fields
+        super().__init__(*args, **kwargs)
+
+    def get_field_names(self, declared_fields, info):
+        if self.selected_fields is None:
+            return super().get_field_names(declared_fields, info)
+        return list(self.selected_fields)
+
+
+class BulkUserUpdateSerializer(serializers.Serializer):
+    """
+    Body of the bulk PATCH endpoints: ``ids`` or ``filter`` selects the users
+    and ``changes`` holds the new values. The view passes which fields each
+    may name; values are validated once, however many rows they reach.
+    """
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False, max_length=10000
+    )
+    filter = serializers.DictField(required=False, allow_empty=False)
+    changes = serializers.DictField(allow_empty=False)
+
+    def __init__(self, *args, filter_fields=(), change_fields=(), **kwargs):
+        self.filter_fields = filter_fields
+        self.change_fields = change_fields
+        super().__init__(*args, **kwargs)
+
+    def check_values(self, value, allowed):
+        unknown = [name for name in value if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError([f"Unknown field: {name}" for name in unknown])
+        fields = BulkUserFieldsSerializer(data=value, fields=list(value), partial=True)
+        if not fields.is_valid():
+            raise serializers.ValidationError(fields.errors)
+        return fields.validated_data
+
+    def validate_filter(self, value):
+        return self.check_values(value, self.filter_fields)
+
+    def validate_changes(self, value):
+        return self.check_values(value, self.change_fields)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either ids or filter.")
+        return attrs
+
+
 class ClassDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClassDetails
@@ -158,11 +298,26 @@ class CourseSectionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class CourseSubSectionSerializer(serializers.ModelSerializer):
+    image_variants = VariantURLsField()
+
     class Meta:
         model = CourseSubSection
         fields = '__all__'
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'subsection', 'filename', 'size', 'offset', 'status', 'created_at']
+        read_only_fields = ['offset', 'status']
+
+    def validate_size(self, value):
+        max_size = settings.MEDIA_UPLOAD_MAX_SIZE
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(f"Size must be between 1 and {max_size} bytes.")
+        return value
+
+
 class CourseLevelSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseLevel
@@ -177,6 +332,23 @@ class CourseRatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseRating
         fields = '__all__'
+        # The model default of 0 is not a rating.
+        extra_kwargs = {'star': {'required': True, 'allow_null': False}}
+
+    def validate_star(self, value):
+        if value not in RATING_STARS:
+            raise serializers.ValidationError("Star must be between 1 and 5.")
+        return value
+
+
+class CourseRatingSummarySerializer(serializers.ModelSerializer):
+    course_id = serializers.UUIDField()
+    overall_rating = serializers.FloatField()
+    histogram = serializers.DictField(child=serializers.IntegerField())
+
+    class Meta:
+        model = CourseRatingSummary
+        fields = ['course_id', 'overall_rating', 'count', 'histogram']
 
 
 class CourseDetailsSerializer(serializers.ModelSerializer):
@@ -185,6 +357,46 @@ class CourseDetailsSerializer(serializers.ModelSerializer):
         fields = ['title']
 
 
+class UserImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserImportJob
+        fields = ['id', 'user_type', 'filename', 'status', 'report', 'created_at', 'started_at', 'finished_at']
+
+
+class CourseSubSectionTreeSerializer(serializers.ModelSerializer):
+    image_variants = VariantURLsField()
+
+    class Meta:
+        model = CourseSubSection
+        fields = [
+            'id', 'sub_section_name', 'description', 'image', 'image_variants',
+            'created_at', 'updated_at',
+        ]
+
+
+class CourseSectionTreeSerializer(serializers.ModelSerializer):
+    sub_sections = CourseSubSectionTreeSerializer(
+        source='coursesubsection_set', many=True, read_only=True
+    )
+
+    class Meta:
+        model = CourseSection
+        fields = ['id', 'section', 'created_at', 'updated_at', 'sub_sections']
+
+
+class CourseTreeSerializer(serializers.ModelSerializer):
+    sections = CourseSectionTreeSerializer(
+        source='coursesection_set', many=True, read_only=True
+    )
+
+    class Meta:
+        model = CourseDetails
+        fields = [
+            'id', 'title', 'description', 'class_name', 'duration',
+            'created_at', 'updated_at', 'sections',
+        ]
+
+
 class AttendanceSerializer(serializers.ModelSerializer):
     user = UserDetailsSerializer() 
     course_title = CourseDetailsSerializer(source='course')  # Nested serializer for the course field
@@ -197,6 +409,101 @@ class AttendanceSerializer(serializers.ModelSerializer):
         validate_data['user'] = self.context['request'].user
         print(validate_data['user'])
         return super().create(validate_data)
-   
 
-        
\ No newline at end of file
+
+class AttendanceRecordSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES)
+
+
+class BulkAttendanceSerializer(serializers.Serializer):
+    course_id = serializers.UUIDField()
+    date = serializers.DateField(required=False)
+    records = AttendanceRecordSerializer(many=True, allow_empty=False)
+
+    def validate_date(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError("Cannot update status for future dates")
+        return value
+
+    def validate_records(self, value):
+        user_ids = [record["user_id"] for record in value]
+        if len(user_ids) != len(set(user_ids)):
+            raise serializers.ValidationError("Each user can only be marked once.")
+        return value
+
+
+class AttendanceRatesQuerySerializer(serializers.Serializer):
+    group = serializers.ChoiceField(choices=['student', 'class', 'course'], default='course')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    course_id = serializers.UUIDField(required=False)
+    class_id = serializers.UUIDField(required=False)
+    user_id = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must be on or before end")
+        scoped = attrs.get('course_id') or attrs.get('class_id') or attrs.get('user_id')
+        if attrs['group'] == 'student' and not scoped:
+            raise serializers.ValidationError(
+                "course_id, class_id or user_id is required for student rates"
+            )
+        if attrs['group'] != 'student' and attrs.get('user_id'):
+            raise serializers.ValidationError("user_id can only be used with group=student")
+        return attrs
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # Not "format", which DRF reserves for renderer selection.
+    file_type = serializers.ChoiceField(choices=['csv', 'xlsx'], default='csv')
+
+
+class StudentExportQuerySerializer(ExportQuerySerializer):
+    class_name = serializers.UUIDField(required=False)
+
+
+class EmployeeExportQuerySerializer(ExportQuerySerializer):
+    user_type = serializers.ChoiceField(choices=['teacher', 'admin', 'other', 'driver'], required=False)
+
+
+class AttendanceExportQuerySerializer(ExportQuerySerializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    course_id = serializers.UUIDField(required=False)
+    class_id = serializers.UUIDField(required=False)
+    user_id = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must be on or before end")
+        return attrs
+
+
+class ContentSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    type = serializers.CharField(required=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    records = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate_type(self, value):
+        kinds = split_param(value)
+        unknown = [kind for kind in kinds if kind not in ('course', 'section', 'subsection')]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown type: {', '.join(unknown)}")
+        return kinds
+
+
+class PeopleSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100)
+    user_type = serializers.CharField(required=False)
+    class_name = serializers.UUIDField(required=False)
+    records = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+    def validate_user_type(self, value):
+        user_types = split_param(value)
+        known = [choice for choice, _ in USER_TYPE]
+        unknown = [user_type for user_type in user_types if user_type not in known]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown user_type: {', '.join(unknown)}")
+        return user_types
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import derivatives
+from .caching import bump_version_on_commit
+from .models import ClassDetails, CourseDetails, CourseSection, CourseSubSection, User
+
+# Models whose rows back cached responses (see caching.CachedResponseMixin).
+CACHED_MODELS = (ClassDetails, CourseDetails, CourseSection)
+
+
+@receiver(post_save, sender=User)
+def user_photo_derivatives(sender, instance, **kwargs):
+    derivatives.schedule(instance, "photo", "photo_variants")
+
+
+@receiver(post_save, sender=CourseSubSection)
+def subsection_image_derivatives(sender, instance, **kwargs):
+    derivatives.schedule(instance, "image", "image_variants")
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    bump_version_on_commit(sender)
+
+
+# Connected per model: a post_delete receiver without a sender would stop
+# every other model's QuerySet.delete() and cascades from fast-deleting.
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
@@ -0,0 +1,185 @@
+"""
+Byte-range file delivery for course media.
+
+Files are streamed from storage in fixed-size chunks so worker memory stays
+flat no matter how large the video is, and single ``Range`` requests are
+answered with 206 so players can seek without re-downloading. When a front
+end server is configured (MEDIA_SENDFILE_BACKEND), the response only carries
+an X-Accel-Redirect/X-Sendfile header and the server does the transfer.
+
+Django's ASGI handler buffers a synchronous streaming body in full before
+sending it, so requests that arrive through ASGI are given an async
+iterator that reads each chunk in a worker thread.
+"""
+import hashlib
+import mimetypes
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class MediaRenderer(BaseRenderer):
+    """
+    Lets media endpoints satisfy players that send Accept: video/*. Error
+    payloads are still rendered as JSON.
+    """
+
+    media_type = "*/*"
+    format = "media"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return JSONRenderer().render(data)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+class FileRange:
+    """Read ``length`` bytes from ``start`` in fixed-size chunks."""
+
+    def __init__(self, fileobj, start, length, chunk_size):
+        self.fileobj = fileobj
+        self.start = start
+        self.remaining = length
+        self.chunk_size = chunk_size
+        self.positioned = False
+
+    def read_chunk(self):
+        if not self.positioned:
+            self.fileobj.seek(self.start)
+            self.positioned = True
+        if self.remaining <= 0:
+            return b""
+        chunk = self.fileobj.read(min(self.chunk_size, self.remaining))
+        self.remaining = self.remaining - len(chunk) if chunk else 0
+        return chunk
+
+    def close(self):
+        self.fileobj.close()
+
+
+class FileRangeIterator(FileRange):
+    def __iter__(self):
+        while chunk := self.read_chunk():
+            yield chunk
+
+
+class AsyncFileRangeIterator(FileRange):
+    """FileRange for ASGI responses; reads run in a thread off the event loop."""
+
+    def __aiter__(self):
+        return self.chunks()
+
+    async def chunks(self):
+        read_chunk = sync_to_async(self.read_chunk, thread_sensitive=False)
+        while chunk := await read_chunk():
+            yield chunk
+
+
+def file_range_iterator(request, fileobj, start, length, chunk_size):
+    iterator_class = AsyncFileRangeIterator if is_asgi(request) else FileRangeIterator
+    return iterator_class(fileobj, start, length, chunk_size)
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single byte range, or None when
+    the header should be ignored and the whole file served. Multiple ranges
+    are not supported and fall back to the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def file_etag(field_file, size, modified):
+    key = f"{field_file.name}:{size}:{modified.timestamp() if modified else ''}"
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def if_range_matches(if_range, etag, modified):
+    if if_range.startswith(('"', "W/")):
+        return etag in parse_etags(if_range)
+    return bool(modified) and if_range == http_date(modified.timestamp())
+
+
+def serve_file(request, field_file, modified=None):
+    """
+    Build a 200/206/416 response for ``field_file`` honouring Range and
+    If-Range. ``modified`` (usually the row's updated_at) feeds the ETag and
+    Last-Modified validators.
+    """
+    storage = field_file.storage
+    size = storage.size(field_file.name)
+    etag = file_etag(field_file, size, modified)
+    content_type = mimetypes.guess_type(field_file.name)[0] or "application/octet-stream"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Type": content_type,
+    }
+    if modified:
+        headers["Last-Modified"] = http_date(modified.timestamp())
+
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", "")
+    if backend:
+        response = HttpResponse(headers=headers)
+        if backend == "nginx":
+            prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + field_file.name
+        else:
+            response["X-Sendfile"] = storage.path(field_file.name)
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (not if_range or if_range_matches(if_range, etag, modified)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return HttpResponse(
+                status=416, headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"}
+            )
+
+    start, end = byte_range or (0, size - 1)
+    length = max(0, end - start + 1)
+    chunk_size = getattr(settings, "MEDIA_STREAM_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        file_range_iterator(request, storage.open(field_file.name, "rb"), start, length, chunk_size),
+        status=206 if byte_range else 200,
+        headers=headers,
+    )
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
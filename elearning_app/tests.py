@@ -1,3 +1,1409 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.admin.sites import site as admin_site
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Sum
+from django.db.models.deletion import Collector
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import RevocationCache
+from .checks import check_response_cache, check_throttle_cache
+from .datasets import seed_dataset
+from .admin import OutboxEmailAdmin
+from .importers import UserImporter
+from .db_pool import pool_stats
+from .metrics import RequestTiming, Registry, install_query_timer, registry, render_pool_stats
+from .mail import deliver_outbox, queue_mail
+from .models import (
+    OTP,
+    Attendance,
+    AttendanceRollup,
+    BlacklistedToken,
+    ClassDetails,
+    CourseDetails,
+    CourseRating,
+    CourseRatingSummary,
+    CourseSection,
+    CourseSubSection,
+    EmployeePosition,
+    OutboxEmail,
+    UploadSession,
+    User,
+    UserImportJob,
+)
+from .otp_store import BaseOTPStore, CacheOTPStore, DatabaseOTPStore
+from .search import _like_pattern
+from .throttling import get_cache as throttle_cache
+from .throttling import acheck, ahit, check, client_ip, hit
+
+
+class FailingBackend:
+    def open(self):
+        raise ConnectionRefusedError("SMTP server unavailable")
+
+    def close(self):
+        pass
+
+
+class TransactionCheckingBackend:
+    """Records whether a transaction was open while a message was sent."""
+
+    def __init__(self):
+        self.atomic_depths = []
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        return len(messages)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTests(TestCase):
+    def test_queue_mail_does_not_send_inline(self):
+        queue_mail("Subject", "Body", "from@example.com", ["to@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.PENDING).count(), 1)
+
+    def test_worker_sends_batch(self):
+        for i in range(3):
+            queue_mail("Subject", f"Body {i}", "from@example.com", [f"to{i}@example.com"])
+        call_command("send_outbox_emails", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 3)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        email = queue_mail("Subject", "Body", "from@example.com", ["to@example.com"])
+        sent, failed = deliver_outbox(connection=FailingBackend(), backoff=60)
+        self.assertEqual((sent, failed), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+    def test_gives_up_after_max_attempts(self):
+        email = queue_mail("Subject", "Body", "from@example.com", ["to@example.com"])
+        deliver_outbox(connection=FailingBackend(), max_attempts=1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+        self.assertEqual(email.body, "")
+
+    def test_sends_outside_the_claim_transaction_and_clears_the_body(self):
+        email = queue_mail("Subject", "Your password is: SECRET12", "from@example.com", ["to@example.com"])
+        backend = TransactionCheckingBackend()
+        depth = len(connection.atomic_blocks)
+        self.assertEqual(deliver_outbox(connection=backend), (1, 0))
+        self.assertEqual(backend.atomic_depths, [depth])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (OutboxEmail.SENT, ""))
+
+    def test_body_is_not_in_the_admin(self):
+        form = OutboxEmailAdmin(OutboxEmail, admin_site).get_form(None)
+        self.assertNotIn("body", form.base_fields)
+
+    def test_purge_keeps_pending_and_recent_rows(self):
+        old = timezone.now() - timedelta(days=30)
+        for status in (OutboxEmail.SENT, OutboxEmail.FAILED, OutboxEmail.PENDING):
+            email = queue_mail(status, "Body", "from@example.com", ["to@example.com"])
+            OutboxEmail.objects.filter(id=email.id).update(status=status, updated_at=old)
+        queue_mail("recent", "Body", "from@example.com", ["to@example.com"])
+        OutboxEmail.objects.filter(subject="recent").update(status=OutboxEmail.SENT)
+        call_command("purge_outbox_emails", "--days=7", stdout=StringIO())
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("subject", flat=True)), {OutboxEmail.PENDING, "recent"}
+        )
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="someone@example.com", user_type="teacher")
+
+    def blacklist(self, token, created_at=None):
+        row = BlacklistedToken.objects.create(
+            token=str(token), jti=token["jti"], expires_at=timezone.now() + timedelta(hours=1)
+        )
+        if created_at:
+            BlacklistedToken.objects.filter(id=row.id).update(created_at=created_at)
+
+    def test_logout_rejects_the_token(self):
+        token = str(AccessToken.for_user(self.user))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(client.get("/api/class-details/").status_code, 200)
+        response = client.post("/api/user/logout/", {"access_token": token}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get("/api/class-details/").status_code, 401)
+
+    def test_rows_from_other_processes_are_synced(self):
+        cache = RevocationCache({"SYNC_INTERVAL": 0})
+        first, late = AccessToken.for_user(self.user), AccessToken.for_user(self.user)
+        self.assertFalse(cache.is_revoked(first["jti"]))
+        self.blacklist(first)
+        self.assertTrue(cache.is_revoked(first["jti"]))
+        # Committed after the first row but stamped before it.
+        self.blacklist(late, created_at=timezone.now() - timedelta(seconds=30))
+        with self.assertNumQueries(2):
+            self.assertTrue(cache.is_revoked(late["jti"]))
+
+    def test_false_positive_is_rechecked_once_revoked(self):
+        cache = RevocationCache({"SYNC_INTERVAL": 0})
+        token = AccessToken.for_user(self.user)
+        cache.is_revoked("warm-up")
+        cache._bloom.add(token["jti"])
+        self.assertFalse(cache.is_revoked(token["jti"]))
+        with self.assertNumQueries(1):
+            self.assertFalse(cache.is_revoked(token["jti"]))
+        self.blacklist(token)
+        self.assertTrue(cache.is_revoked(token["jti"]))
+
+
+class UserListFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        class_name = ClassDetails.objects.create(name="Class 1")
+        position = EmployeePosition.objects.create(name="Monitor")
+        User.objects.bulk_create(
+            User(
+                email=f"student{i}@example.com",
+                user_type="student",
+                class_name=class_name,
+                position=position,
+            )
+            for i in range(120)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_default_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/student-details/")
+        self.assertEqual(
+            set(response.json()["results"][0]),
+            {"email", "created_at", "updated_at", "photo_variants"},
+        )
+
+    def test_expanded_relations_use_one_query(self):
+        for records in (10, 100):
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    f"/api/student-details/?expand=class_name,position&records={records}"
+                )
+            results = response.json()["results"]
+            self.assertEqual(len(results), records)
+            self.assertEqual(results[0]["class_name"]["name"], "Class 1")
+            self.assertEqual(results[0]["position"]["name"], "Monitor")
+
+    def test_next_page_keeps_query_count(self):
+        first = self.client.get("/api/student-details/?fields=email,class_name").json()
+        with self.assertNumQueries(1):
+            response = self.client.get(first["next"])
+        self.assertEqual(set(response.json()["results"][0]), {"email", "class_name"})
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/employee-details/?fields=email")
+        self.assertEqual(set(response.json()["results"][0]), {"email"})
+
+    def test_sparse_fields_with_expand(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/student-details/?fields=email&expand=class_name")
+        row = response.json()["results"][0]
+        self.assertEqual(set(row), {"email", "class_name"})
+        self.assertEqual(row["class_name"]["name"], "Class 1")
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/student-details/?fields=password")
+        self.assertEqual(response.status_code, 400)
+
+
+class UserListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_type="teacher", employee_type="full_time"
+        )
+        User.objects.create(email="student@example.com", user_type="student", employee_type="full_time")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_employee_type_lists_employees_only(self):
+        response = self.client.get("/api/employee-type/?employee_type=full_time&fields=email")
+        self.assertEqual(response.json()["results"], [{"email": "teacher@example.com"}])
+        self.assertEqual(self.client.get("/api/employee-type/").status_code, 400)
+
+    def test_cursor_visits_rows_sharing_a_timestamp_once(self):
+        User.objects.bulk_create(
+            User(email=f"student{i}@example.com", user_type="student") for i in range(25)
+        )
+        User.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(self.admin)
+        url, emails = "/api/student-details/?fields=email&records=10", []
+        while url:
+            page = self.client.get(url).json()
+            emails += [row["email"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(len(emails), 26)
+        self.assertEqual(len(set(emails)), 26)
+
+
+class CourseTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="teacher@example.com", user_type="teacher")
+        cls.course = CourseDetails.objects.create(title="Algebra")
+        cls.section = CourseSection.objects.create(section="Basics", course_name=cls.course)
+        CourseSubSection.objects.create(sub_section_name="Sums", course_section=cls.section)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/course-details/{self.course.id}/tree/"
+
+    def test_tree_is_nested_and_revalidates(self):
+        response = self.client.get(self.url)
+        sections = response.json()["sections"]
+        self.assertEqual(sections[0]["sub_sections"][0]["sub_section_name"], "Sums")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH="*").status_code, 304)
+
+        CourseSubSection.objects.create(sub_section_name="Products", course_section=self.section)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_deleting_a_subsection_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        CourseSubSection.objects.all().delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_course(self):
+        self.assertEqual(self.client.get("/api/course-details/not-a-uuid/tree/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/course-details/{self.user.id}/tree/").status_code, 404)
+
+
+class MediaStreamingTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root, MEDIA_STREAM_CHUNK_SIZE=100))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="student@example.com", user_type="student")
+        cls.subsection = CourseSubSection.objects.create(sub_section_name="Lecture")
+        cls.subsection.image.save("lecture.mp4", ContentFile(cls.content))
+        cls.url = f"/api/course-subsection/{cls.subsection.id}/media/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_ranges(self):
+        for header, start, end in (("bytes=10-19", 10, 19), ("bytes=-5", 1019, 1023), ("bytes=1000-", 1000, 1023)):
+            with self.subTest(header=header):
+                response, body = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(body, self.content[start:end + 1])
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/1024")
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(Range="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range(self):
+        etag = self.get()[0]["ETag"]
+        self.assertEqual(self.get(Range="bytes=0-9", **{"If-Range": etag})[0].status_code, 206)
+        response, body = self.get(Range="bytes=0-9", **{"If-Range": '"stale"'})
+        self.assertEqual((response.status_code, body), (200, self.content))
+
+    def test_sendfile_backends(self):
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.subsection.image.name}")
+        self.assertEqual(response.content, b"")
+        with override_settings(MEDIA_SENDFILE_BACKEND="apache"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], self.subsection.image.path)
+
+    async def test_asgi_streams_without_buffering(self):
+        token = str(AccessToken.for_user(self.user))
+        headers = {"Authorization": f"Bearer {token}", "Range": "bytes=100-399"}
+        response = await AsyncClient().get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 100])
+        self.assertEqual(b"".join(chunks), self.content[100:400])
+
+
+class MediaUploadTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(email="owner@example.com", user_type="teacher")
+        cls.other = User.objects.create(email="other@example.com", user_type="teacher")
+        course = CourseDetails.objects.create(title="Physics", created_by=cls.owner)
+        section = CourseSection.objects.create(section="Intro", course_name=course)
+        cls.subsection = CourseSubSection.objects.create(sub_section_name="Lecture", course_section=section)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def start(self):
+        response = self.client.post(
+            "/api/media-uploads/",
+            {"subsection": self.subsection.id, "filename": "lecture.mp4", "size": len(self.content)},
+        )
+        self.assertEqual(response.status_code, 201)
+        return f"/api/media-uploads/{response.json()['id']}/"
+
+    def put(self, url, offset, data):
+        return self.client.put(
+            url, data, content_type="application/octet-stream", headers={"Upload-Offset": str(offset)}
+        )
+
+    def test_only_course_owner_or_admin_can_upload(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.post(
+            "/api/media-uploads/",
+            {"subsection": self.subsection.id, "filename": "lecture.mp4", "size": 10},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UploadSession.objects.exists())
+        self.client.force_authenticate(User.objects.create(email="admin@example.com", user_type="admin"))
+        self.start()
+
+    def test_chunks_and_finalize(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.content[:600]).json()["offset"], 600)
+        response = self.put(url, 100, self.content[600:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 600)
+        self.assertEqual(self.put(url, 600, self.content[600:]).json()["offset"], 1024)
+        self.assertEqual(self.client.post(url + "finalize/").status_code, 200)
+        self.subsection.refresh_from_db()
+        with self.subsection.image.open("rb") as image:
+            self.assertEqual(image.read(), self.content)
+
+    def test_claimed_chunk_is_busy(self):
+        url = self.start()
+        session = UploadSession.objects.get()
+        session.write_started_at = timezone.now()
+        session.save()
+        response = self.put(url, 0, self.content)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["message"], "Another chunk is being written")
+
+    def test_expired_sessions_are_rejected_and_purged(self):
+        url = self.start()
+        session = UploadSession.objects.get()
+        partial = os.path.join(self.media_root, session.partial_name)
+        self.assertTrue(os.path.exists(partial))
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.put(url, 0, self.content).status_code, 410)
+        call_command("purge_upload_sessions", stdout=StringIO())
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(partial))
+
+
+class MediaDerivativeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root, MEDIA_DERIVATIVE_WORKERS=1))
+        super().setUpClass()
+
+    def png(self):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (400, 300), "red").save(buffer, "PNG")
+        return ContentFile(buffer.getvalue())
+
+    def generate(self):
+        out = StringIO()
+        call_command("generate_media_derivatives", stdout=out)
+        return out.getvalue()
+
+    def test_upload_is_left_for_the_command(self):
+        subsection = CourseSubSection.objects.create(sub_section_name="Diagram")
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            subsection.image.save("diagram.png", self.png())
+        self.assertEqual(callbacks, [])
+        self.assertIn("Processed 1 files", self.generate())
+        subsection.refresh_from_db()
+        variants = subsection.image_variants
+        self.assertEqual(variants["source"], subsection.image.name)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, variants["thumbnail"])))
+        self.assertIn("Processed 0 files", self.generate())
+
+    @override_settings(MEDIA_DERIVATIVES_ASYNC=False)
+    def test_renders_in_process_when_not_async(self):
+        subsection = CourseSubSection.objects.create(sub_section_name="Diagram")
+        with self.captureOnCommitCallbacks(execute=True):
+            subsection.image.save("diagram.png", self.png())
+        subsection.refresh_from_db()
+        self.assertIn("medium", subsection.image_variants)
+
+    @override_settings(MEDIA_DERIVATIVES_ASYNC=False)
+    def test_videos_are_skipped(self):
+        subsection = CourseSubSection.objects.create(sub_section_name="Lecture")
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            subsection.image.save("lecture.mp4", ContentFile(b"not an image"))
+        self.assertEqual(callbacks, [])
+        self.assertIn("Processed 0 files", self.generate())
+        subsection.refresh_from_db()
+        self.assertEqual(subsection.image_variants, {})
+
+    def test_same_stem_sources_keep_their_own_variants(self):
+        subsections = []
+        for name in ("avatar.png", "avatar.jpg"):
+            subsection = CourseSubSection.objects.create(sub_section_name=name)
+            subsection.image.save(name, self.png())
+            subsections.append(subsection)
+        stamped = [subsection.updated_at for subsection in subsections]
+        self.assertIn("Processed 2 files", self.generate())
+        thumbnails = set()
+        for subsection, updated_at in zip(subsections, stamped):
+            subsection.refresh_from_db()
+            self.assertGreater(subsection.updated_at, updated_at)
+            thumbnails.add(subsection.image_variants["thumbnail"])
+        self.assertEqual(len(thumbnails), 2)
+        for name in thumbnails:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.cache_dir)
+        cls.enterClassContext(override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cls.cache_dir},
+            },
+            RESPONSE_CACHE_ENABLED=True,
+        ))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="teacher@example.com", user_type="teacher")
+        cls.class_name = ClassDetails.objects.create(name="Year 1")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def names(self):
+        response = self.client.get("/api/class-details/")
+        return response["X-Cache"], [row["name"] for row in response.json()]
+
+    def test_writes_invalidate_cached_lists(self):
+        self.assertEqual(self.names(), ("MISS", ["Year 1"]))
+        self.assertEqual(self.names(), ("HIT", ["Year 1"]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/class-details/", {"name": "Year 2"})
+        self.assertEqual(self.names(), ("MISS", ["Year 1", "Year 2"]))
+        # update() and bulk_create() send no signals.
+        with self.captureOnCommitCallbacks(execute=True):
+            ClassDetails.objects.filter(name="Year 2").update(name="Year 3")
+        self.assertEqual(self.names(), ("MISS", ["Year 1", "Year 3"]))
+        with self.captureOnCommitCallbacks(execute=True):
+            ClassDetails.objects.bulk_create([ClassDetails(name="Year 4")])
+        self.assertEqual(self.names()[0], "MISS")
+
+    def test_per_process_cache_is_not_used(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            response = self.client.get("/api/class-details/")
+            self.assertNotIn("X-Cache", response)
+            self.assertEqual([error.id for error in check_response_cache(None)], ["elearning_app.W001"])
+            with override_settings(RESPONSE_CACHE_ENABLED=False):
+                self.assertEqual(check_response_cache(None), [])
+        self.assertEqual(check_response_cache(None), [])
+
+    def test_uncached_models_keep_fast_deletes(self):
+        for model in (OTP, BlacklistedToken, Attendance, OutboxEmail, AttendanceRollup):
+            with self.subTest(model=model.__name__):
+                self.assertTrue(Collector(using="default").can_fast_delete(model.objects.all()))
+        self.assertFalse(Collector(using="default").can_fast_delete(ClassDetails.objects.all()))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="teacher@example.com", user_type="teacher")
+        ClassDetails.objects.create(name="Year 1")
+
+    def setUp(self):
+        # The test connection was opened before any middleware was loaded.
+        install_query_timer()
+        registry.reset()
+
+    def query_count(self, response):
+        db = response["Server-Timing"].split(", ")[0]
+        return int(db.split('desc="')[1].split(" ")[0])
+
+    def test_registry_renders_histograms(self):
+        metrics = Registry()
+        timing = RequestTiming()
+        timing.queries = 3
+        metrics.observe("class-details-list", "GET", 200, 0.02, timing)
+        metrics.observe("class-details-list", "GET", 500, 7.0, timing)
+        lines = metrics.render().splitlines()
+        labels = 'route="class-details-list",method="GET"'
+        self.assertIn(f'elearning_http_requests_total{{{labels},status="500"}} 1', lines)
+        self.assertIn(f'elearning_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 1', lines)
+        self.assertIn(f'elearning_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', lines)
+        self.assertIn(f'elearning_db_queries_per_request_bucket{{{labels},le="2"}} 0', lines)
+        self.assertIn(f"elearning_db_queries_per_request_count{{{labels}}} 2", lines)
+
+    def test_sync_requests_are_recorded(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/class-details/")
+        self.assertGreaterEqual(self.query_count(response), 1)
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        self.assertIn('route="class-details-list",method="GET",status="200"', registry.render())
+
+    async def test_async_orm_queries_are_counted(self):
+        data = {"email": "teacher@example.com", "password": ""}
+        response = await AsyncClient().post("/api/async/user/login/", data, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertGreaterEqual(self.query_count(response), 1)
+        self.assertIn('route="async-login"', registry.render())
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_metrics_endpoint_allow_list(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.5")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE elearning_http_request_duration_seconds histogram", response.content.decode())
+
+
+class DatabasePoolTests(TestCase):
+    pool = {"pool_min": 2, "pool_max": 10, "pool_size": 3, "requests_num": 40, "requests_waiting": 0}
+
+    def test_per_request_and_persistent_modes(self):
+        self.assertEqual(pool_stats()["default"]["mode"], "per-request")
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=60):
+            stats = pool_stats()["default"]
+        self.assertEqual((stats["mode"], stats["conn_max_age"], stats["pool"]), ("persistent", 60, None))
+
+    def test_pool_mode_reports_pool_counters(self):
+        pooled = SimpleNamespace(
+            alias="default",
+            vendor="postgresql",
+            settings_dict={"OPTIONS": {"pool": {"max_size": 10}}, "CONN_MAX_AGE": 0},
+            pool=SimpleNamespace(get_stats=lambda: self.pool),
+        )
+        with mock.patch("elearning_app.db_pool.connections", SimpleNamespace(all=lambda: [pooled])):
+            self.assertEqual(pool_stats()["default"]["pool"], self.pool)
+
+    def test_render_pool_stats(self):
+        lines = render_pool_stats({"default": {"pool": self.pool}, "replica": {"pool": None}}).splitlines()
+        self.assertIn("# TYPE elearning_db_pool_pool_size gauge", lines)
+        self.assertIn('elearning_db_pool_pool_size{alias="default"} 3', lines)
+        self.assertIn("# TYPE elearning_db_pool_requests_num_total counter", lines)
+        self.assertIn('elearning_db_pool_requests_num_total{alias="default"} 40', lines)
+        self.assertFalse([line for line in lines if "replica" in line])
+
+    def test_stats_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(email="teacher@example.com", user_type="teacher"))
+        self.assertEqual(client.get("/api/db-pool/stats/").status_code, 403)
+        client.force_authenticate(User.objects.create(email="admin@example.com", user_type="admin"))
+        response = client.get("/api/db-pool/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["default"]["mode"], "per-request")
+
+
+class DatasetTests(TestCase):
+    counts = dict(classes=2, students=12, employees=4, courses=2, sections=1, subsections=1, attendance_days=2, ratings=1)
+
+    def seeded_rows(self, seed):
+        with transaction.atomic():
+            seed_dataset("small", seed, **self.counts)
+            rows = (
+                sorted(User.objects.values_list("id", "email")),
+                sorted(Attendance.objects.values_list("user_id", "course_id", "date", "status")),
+            )
+            transaction.set_rollback(True)
+        return rows
+
+    def test_same_seed_gives_the_same_rows(self):
+        first = self.seeded_rows(1)
+        self.assertEqual(len(first[0]), 1 + 4 + 12)
+        self.assertEqual(self.seeded_rows(1), first)
+        self.assertNotEqual(self.seeded_rows(2)[0], first[0])
+
+    def test_derived_tables_match_the_rows(self):
+        seed_dataset("small", 0, **self.counts)
+        self.assertFalse(Attendance.objects.exclude(class_name=F("user__class_name")).exists())
+        rollups = AttendanceRollup.objects.aggregate(present=Sum("present"), absent=Sum("absent"))
+        self.assertEqual(rollups["present"], Attendance.objects.filter(status="present").count())
+        self.assertEqual(rollups["absent"], Attendance.objects.filter(status="absent").count())
+        self.assertEqual(
+            CourseRatingSummary.objects.aggregate(total=Sum("count"))["total"], CourseRating.objects.count()
+        )
+
+    def test_seed_command_refuses_a_seeded_database(self):
+        args = ["--size=small"] + [f"--{name.replace('_', '-')}={value}" for name, value in self.counts.items()]
+        out = StringIO()
+        call_command("seed_scale_data", *args, stdout=out)
+        self.assertIn("elearning_app.User", out.getvalue())
+        self.assertEqual(User.objects.filter(user_type="student").count(), 12)
+        with self.assertRaises(CommandError):
+            call_command("seed_scale_data", *args, stdout=StringIO())
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_benchmarked_endpoints_respond(self):
+        from .management.commands.bench_endpoints import ENDPOINTS, Command
+
+        ds = seed_dataset("small", 0, **self.counts)
+        command = Command(stdout=StringIO(), stderr=StringIO())
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint=endpoint.name):
+                result = command.run_endpoint(endpoint, ds, {"warmup": 0, "iterations": 1})
+                self.assertLess(max(result["statuses"]), 400)
+
+    def test_compare_fails_on_server_errors_and_status_changes(self):
+        from .management.commands.bench_endpoints import Command
+
+        options = {"threshold": 20.0, "min_delta_ms": 1.0}
+        result = {"p95_ms": 5.0, "queries": 3, "statuses": [200]}
+        baseline = {"size": "small", "seed": 0, "results": {"a": result, "b": result}}
+        command = Command(stdout=StringIO(), stderr=StringIO())
+        command.compare(baseline, baseline, options)
+        for statuses in ([500], [200, 404]):
+            with self.subTest(statuses=statuses):
+                current = dict(baseline, results={"a": result, "b": dict(result, statuses=statuses)})
+                with self.assertRaisesMessage(CommandError, ": b"):
+                    command.compare(baseline, current, options)
+        with self.assertRaises(CommandError):
+            command.compare(baseline, dict(baseline, results={"c": dict(result, statuses=[502])}), options)
+
+
+class ContentSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="student@example.com", user_type="student")
+        cls.algebra = CourseDetails.objects.create(title="Algebra", description="Equations and <b>graphs</b>")
+        cls.geometry = CourseDetails.objects.create(
+            title="Geometry", description='<script>alert("x")</script> shapes without algebra'
+        )
+        section = CourseSection.objects.create(section="Linear algebra", course_name=cls.algebra)
+        cls.lesson = CourseSubSection.objects.create(
+            sub_section_name="Matrices", description="Row reduction", course_section=section
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get("/api/search/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_titles_first_and_filters_by_kind(self):
+        body = self.search(q="algebra")
+        self.assertEqual(body["count"], 3)
+        # Geometry only mentions algebra in its description.
+        self.assertEqual(body["results"][-1]["id"], str(self.geometry.id))
+        self.assertEqual({row["course_id"] for row in body["results"]}, {str(self.algebra.id), str(self.geometry.id)})
+        body = self.search(q="algebra", type="section")
+        self.assertEqual([row["kind"] for row in body["results"]], ["section"])
+        body = self.search(q="algebra", records=2)
+        self.assertEqual(len(body["results"]), 2)
+        self.assertIsNotNone(body["next"])
+
+    def test_snippets_escape_course_text(self):
+        snippet = next(
+            row["snippet"] for row in self.search(q="shapes")["results"] if row["id"] == str(self.geometry.id)
+        )
+        self.assertIn("<mark>shapes</mark>", snippet)
+        self.assertNotIn("<script>", snippet)
+        self.assertIn("&lt;script&gt;", snippet)
+        snippet = self.search(q="equations")["results"][0]["snippet"]
+        self.assertNotIn("<b>", snippet)
+        self.assertEqual(snippet.replace("<mark>", "").replace("</mark>", "").count("<"), 0)
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.description = "Determinants"
+            self.lesson.save()
+        self.assertEqual(self.search(q="reduction")["count"], 0)
+        self.assertEqual(self.search(q="determinants")["results"][0]["id"], str(self.lesson.id))
+        self.geometry.delete()
+        self.assertEqual(self.search(q="shapes")["count"], 0)
+
+    def test_query_syntax_is_not_interpreted(self):
+        for q in ('algebra" OR', "NEAR(algebra", "title:algebra", "-algebra"):
+            with self.subTest(q=q):
+                self.assertGreaterEqual(self.search(q=q)["count"], 0)
+
+    @skipUnless(connection.vendor == "postgresql", "websearch_to_tsquery needs Postgres")
+    def test_postgres_websearch_syntax(self):
+        self.assertEqual(self.search(q='"linear algebra"')["count"], 1)
+        self.assertEqual(self.search(q="algebra -shapes")["count"], 2)
+
+
+class PeopleSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.year_one = ClassDetails.objects.create(name="Year 1")
+        cls.ada = User.objects.create(
+            email="ada_l@example.com", user_type="student", first_name="Ada", last_name="Lovelace",
+            father_first_name="George", contact="100% 555", class_name=cls.year_one,
+        )
+        cls.adam = User.objects.create(
+            email="adaxl@example.com", user_type="student", first_name="Adam", last_name="Smith",
+        )
+        cls.teacher = User.objects.create(
+            email="grace@example.com", user_type="teacher", first_name="Grace", last_name="Hopper",
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, q, **params):
+        response = self.client.get("/api/people/search/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row["email"] for row in response.json()["results"]]
+
+    def test_every_word_must_match_some_column(self):
+        self.assertEqual(self.search("ada"), ["ada_l@example.com", "adaxl@example.com"])
+        self.assertEqual(self.search("ada george"), ["ada_l@example.com"])
+        self.assertEqual(self.search("HOPPER"), ["grace@example.com"])
+        self.assertEqual(self.search("555"), ["ada_l@example.com"])
+
+    def test_filters(self):
+        self.assertEqual(self.search("example", user_type="teacher"), ["grace@example.com"])
+        self.assertEqual(self.search("ada", class_name=str(self.year_one.id)), ["ada_l@example.com"])
+        self.assertEqual(self.search("example", records=1, user_type="student"), ["ada_l@example.com"])
+
+    def test_like_wildcards_are_literal(self):
+        self.assertEqual(self.search("ada_l"), ["ada_l@example.com"])
+        self.assertEqual(self.search("100%"), ["ada_l@example.com"])
+        self.assertEqual(self.search("0%5"), [])
+        # The Postgres LIKE pattern escapes them for the trigram index path.
+        self.assertEqual(_like_pattern("a%b_c\\"), "%a\\%b\\_c\\\\%")
+
+    def test_only_admins_search(self):
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get("/api/people/search/", {"q": "ada"}).status_code, 403)
+
+    @skipUnless(connection.vendor == "postgresql", "trigram similarity needs Postgres")
+    def test_postgres_orders_by_similarity(self):
+        self.assertEqual(self.search("adam")[0], "adaxl@example.com")
+
+
+class CourseRatingSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email="student@example.com", user_type="student")
+        cls.course = CourseDetails.objects.create(title="Algebra")
+        cls.other_course = CourseDetails.objects.create(title="Geometry")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def summary(self, course):
+        summary = CourseRatingSummary.objects.get(course=course)
+        return summary.count, summary.total, summary.histogram
+
+    def post(self, star, course=None):
+        data = {"course_name": str((course or self.course).id), "comment": "ok"}
+        if star is not None:
+            data["star"] = star
+        return self.client.post("/api/course-review/", data, format="json")
+
+    def test_create_update_and_destroy_keep_summary_in_step(self):
+        self.assertEqual(self.post(4).status_code, 201)
+        self.assertEqual(self.post(2).status_code, 201)
+        self.assertEqual(self.summary(self.course), (2, 6, {1: 0, 2: 1, 3: 0, 4: 1, 5: 0}))
+
+        rating = CourseRating.objects.get(star=2)
+        response = self.client.patch(f"/api/course-review/{rating.id}/", {"star": 5}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.summary(self.course), (2, 9, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}))
+
+        data = {"course_name": str(self.other_course.id), "star": 5}
+        self.client.put(f"/api/course-review/{rating.id}/", data, format="json")
+        self.assertEqual(self.summary(self.course), (1, 4, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0}))
+        self.assertEqual(self.summary(self.other_course), (1, 5, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}))
+
+        self.assertEqual(self.client.delete(f"/api/course-review/{rating.id}/").status_code, 204)
+        self.assertEqual(self.summary(self.other_course)[:2], (0, 0))
+
+    def test_star_is_required_and_in_range(self):
+        for star in (None, 0, 6):
+            with self.subTest(star=star):
+                self.assertEqual(self.post(star).status_code, 400)
+        self.assertFalse(CourseRatingSummary.objects.exists())
+
+    def test_bulk_route_and_rebuild(self):
+        self.post(3)
+        self.post(5, course=self.other_course)
+        # A legacy row without a real star stays out of the summary.
+        CourseRating.objects.create(user=self.student, course_name=self.course, star=0)
+        expected = {self.course.id: (1, 3.0), self.other_course.id: (1, 5.0)}
+        CourseRatingSummary.objects.update(count=99)
+        call_command("rebuild_rating_summaries", stdout=StringIO())
+        ids = ",".join(str(course_id) for course_id in expected)
+        response = self.client.get(f"/api/course-rating/bulk/?course_ids={ids}")
+        rows = {row["course_id"]: row for row in response.json()}
+        for course_id, (count, overall) in expected.items():
+            row = rows[str(course_id)]
+            self.assertEqual((row["count"], row["overall_rating"]), (count, overall))
+            self.assertEqual(sum(row["histogram"].values()), count)
+
+    def test_unrated_course_has_the_full_shape(self):
+        response = self.client.get(f"/api/course-rating/{self.course.id}/")
+        self.assertEqual(
+            response.json(),
+            {"overall_rating": 0, "count": 0, "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}},
+        )
+
+
+class BulkAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.teacher = User.objects.create(email="teacher@example.com", user_type="teacher")
+        cls.course = CourseDetails.objects.create(title="Algebra")
+        cls.students = User.objects.bulk_create(
+            User(email=f"student{i}@example.com", user_type="student") for i in range(3)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def bulk_mark(self, statuses, **extra):
+        data = {
+            "course_id": str(self.course.id),
+            "records": [
+                {"user_id": str(student.id), "status": status}
+                for student, status in zip(self.students, statuses)
+            ],
+            **extra,
+        }
+        return self.client.post("/api/attendance/bulk-mark/", data, format="json")
+
+    def statuses(self):
+        by_user = dict(Attendance.objects.values_list("user_id", "status"))
+        return [by_user.get(student.id) for student in self.students]
+
+    def test_marks_roster_and_reports_counts(self):
+        response = self.bulk_mark(["present", "absent", "present"])
+        self.assertEqual(response.json(), {"created": 3, "updated": 0, "unchanged": 0})
+        self.assertEqual(self.statuses(), ["present", "absent", "present"])
+
+    def test_item_errors_are_reported_per_record(self):
+        response = self.bulk_mark(["present", "late", "absent"])
+        self.assertEqual(response.status_code, 400)
+        # Errors are keyed by the index of the failing record.
+        errors = response.json()["records"]
+        self.assertEqual(list(errors), ["1"])
+        self.assertIn("status", errors["1"])
+        self.assertFalse(Attendance.objects.exists())
+
+        data = {"course_id": str(self.course.id), "records": [{"user_id": "not-a-uuid", "status": "present"}]}
+        response = self.client.post("/api/attendance/bulk-mark/", data, format="json")
+        self.assertIn("user_id", response.json()["records"]["0"])
+
+    def test_duplicate_users_and_future_dates_are_rejected(self):
+        student = str(self.students[0].id)
+        data = {
+            "course_id": str(self.course.id),
+            "records": [{"user_id": student, "status": "present"}, {"user_id": student, "status": "absent"}],
+        }
+        response = self.client.post("/api/attendance/bulk-mark/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("records", response.json())
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        response = self.bulk_mark(["present"], date=tomorrow.isoformat())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_only_admins_overwrite_existing_marks(self):
+        self.bulk_mark(["present", "present"])
+        response = self.bulk_mark(["absent", "present", "absent"])
+        self.assertEqual(response.json(), {"created": 1, "updated": 0, "unchanged": 2})
+        self.assertEqual(self.statuses(), ["present", "present", "absent"])
+
+        self.client.force_authenticate(self.admin)
+        response = self.bulk_mark(["absent", "present", "absent"])
+        self.assertEqual(response.json(), {"created": 0, "updated": 1, "unchanged": 2})
+        self.assertEqual(self.statuses(), ["absent", "present", "absent"])
+
+
+class MarkAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.teacher = User.objects.create(email="teacher@example.com", user_type="teacher")
+        cls.student = User.objects.create(email="student@example.com", user_type="student")
+        cls.course = CourseDetails.objects.create(title="Algebra")
+
+    def mark(self, by, status, user=None):
+        client = APIClient()
+        client.force_authenticate(by)
+        data = {"user_id": str((user or self.student).id), "course_id": str(self.course.id), "status": status}
+        return client.post("/api/attendance/mark/", data, format="json")
+
+    def test_mark_upserts_one_row_per_day(self):
+        self.assertEqual(self.mark(self.teacher, "present").json()["status"], "present")
+        # A teacher cannot overwrite, whoever is marked; an admin can.
+        self.assertEqual(self.mark(self.teacher, "absent").json()["status"], "present")
+        self.assertEqual(self.mark(self.teacher, "absent", user=self.admin).json()["status"], "absent")
+        self.assertEqual(self.mark(self.teacher, "present", user=self.admin).json()["status"], "absent")
+        self.assertEqual(self.mark(self.admin, "absent").json()["status"], "absent")
+        row = Attendance.objects.get(user=self.student)
+        self.assertEqual(row.date, timezone.localdate())
+        self.assertEqual(Attendance.objects.count(), 2)
+
+
+class AttendanceRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.old_class = ClassDetails.objects.create(name="7A")
+        cls.new_class = ClassDetails.objects.create(name="8A")
+        cls.student = User.objects.create(email="student@example.com", user_type="student", class_name=cls.old_class)
+        cls.course = CourseDetails.objects.create(title="Algebra")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def mark(self, status):
+        data = {"user_id": str(self.student.id), "course_id": str(self.course.id), "status": status}
+        return self.client.post("/api/attendance/mark/", data, format="json")
+
+    def bulk_mark(self, status):
+        data = {"course_id": str(self.course.id), "records": [{"user_id": str(self.student.id), "status": status}]}
+        return self.client.post("/api/attendance/bulk-mark/", data, format="json")
+
+    def rollups(self):
+        return {
+            class_id: (present, absent)
+            for class_id, present, absent in AttendanceRollup.objects.values_list("class_name_id", "present", "absent")
+        }
+
+    def move_student(self):
+        User.objects.filter(pk=self.student.pk).update(class_name=self.new_class)
+
+    def test_remark_and_destroy_use_the_stored_class(self):
+        self.mark("present")
+        self.move_student()
+        self.mark("absent")
+        row = Attendance.objects.get()
+        self.assertEqual(row.class_name_id, self.old_class.id)
+        self.assertEqual(self.rollups(), {self.old_class.id: (0, 1)})
+
+        self.bulk_mark("present")
+        self.assertEqual(self.rollups(), {self.old_class.id: (1, 0)})
+        self.assertEqual(Attendance.objects.get().class_name_id, self.old_class.id)
+
+        self.assertEqual(self.client.delete(f"/api/attendance/{row.id}/").status_code, 204)
+        self.assertEqual(self.rollups(), {self.old_class.id: (0, 0)})
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.attendance, 0)
+
+    def test_patch_moves_the_rollup(self):
+        self.mark("present")
+        row = Attendance.objects.get()
+        response = self.client.patch(f"/api/attendance/{row.id}/", {"status": "absent"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rollups(), {self.old_class.id: (0, 1)})
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.attendance, 0)
+
+    def test_new_marks_use_the_current_class(self):
+        self.bulk_mark("present")
+        self.move_student()
+        other = CourseDetails.objects.create(title="Geometry")
+        data = {"user_id": str(self.student.id), "course_id": str(other.id), "status": "present"}
+        self.client.post("/api/attendance/mark/", data, format="json")
+        self.assertEqual(self.rollups(), {self.old_class.id: (1, 0), self.new_class.id: (1, 0)})
+        before = self.rollups()
+        call_command("rebuild_attendance_rollups", stdout=StringIO())
+        self.assertEqual(self.rollups(), before)
+
+
+class AttendanceMigrationTests(TransactionTestCase):
+    before = [("elearning_app", "0005_attendance_date")]
+    after = [("elearning_app", "0007_attendance_unique_per_day")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill_keeps_one_row_per_user_course_day(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        user = apps.get_model("elearning_app", "User").objects.create(email="s@example.com", user_type="student")
+        course = apps.get_model("elearning_app", "CourseDetails").objects.create(title="Algebra")
+        Attendance = apps.get_model("elearning_app", "Attendance")
+        morning = timezone.now().replace(hour=9, minute=0)
+        stamps = [morning, morning + timedelta(hours=1), morning + timedelta(days=1)]
+        for stamp in stamps:
+            row = Attendance.objects.create(user=user, course=course, status="present")
+            Attendance.objects.filter(id=row.id).update(date_time=stamp)
+        latest_same_day = Attendance.objects.order_by("id")[1].id
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        Attendance = executor.loader.project_state(self.after).apps.get_model("elearning_app", "Attendance")
+        rows = list(Attendance.objects.order_by("date").values_list("id", "date"))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][0], latest_same_day)
+        self.assertEqual([day for _, day in rows], [stamp.date() for stamp in stamps[1:]])
+
+
+class UserImportTests(TestCase):
+    header = "basic_info.email,basic_info.first_name,basic_info.date_of_birth,parent_info.mother_first_name\n"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        User.objects.create(email="taken@example.com", user_type="student")
+
+    def test_csv_upload_reports_error_rows(self):
+        rows = (
+            "One@Example.com,One,2015-04-01,Ann\n"
+            "not-an-email,Two,,\n"
+            "one@example.com,Again,,\n"
+            "taken@example.com,Three,,\n"
+            "four@example.com,Four,2015-13-01,\n"
+        )
+        upload = SimpleUploadedFile("students.csv", (self.header + rows).encode())
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post("/api/student-details/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/student-details/import/{response.json()['id']}/"
+        # Nothing is imported inside the request.
+        self.assertEqual(client.get(job_url).json()["status"], "pending")
+        self.assertFalse(User.objects.filter(email="one@example.com").exists())
+
+        call_command("run_user_imports", workers=0, stdout=StringIO())
+        job = client.get(job_url).json()
+        self.assertEqual(job["status"], "done")
+        self.assertFalse(UserImportJob.objects.get(id=job["id"]).file)
+        report = job["report"]
+        self.assertEqual((report["created"], report["failed"]), (1, 4))
+        self.assertEqual(
+            {error["row"]: list(error["errors"]) for error in report["errors"]},
+            {3: ["email"], 4: ["email"], 5: ["email"], 6: ["date_of_birth"]},
+        )
+        student = User.objects.get(email="one@example.com")
+        self.assertEqual((student.user_type, student.date_of_birth), ("student", date(2015, 4, 1)))
+        self.assertEqual(OutboxEmail.objects.filter(recipients=["one@example.com"]).count(), 1)
+
+    def test_repeated_emails_are_caught_across_chunks(self):
+        rows = "".join(f"s{i % 3}@example.com,S{i},,\n" for i in range(7))
+        report = UserImporter(chunk_size=2).run(StringIO(self.header + rows), "students.csv")
+        self.assertEqual((report["created"], report["failed"]), (3, 4))
+        self.assertEqual(User.objects.filter(email__startswith="s", user_type="student").count(), 3)
+
+    def test_xlsx_date_cells(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["email", "first_name", "date_of_birth"])
+        sheet.append(["xlsx@example.com", "Cell", datetime(2014, 2, 3)])
+        fileobj = BytesIO()
+        workbook.save(fileobj)
+        fileobj.seek(0)
+        report = UserImporter().run(fileobj, "students.xlsx")
+        self.assertEqual(report, {"created": 1, "failed": 0, "errors": []})
+        self.assertEqual(User.objects.get(email="xlsx@example.com").date_of_birth, date(2014, 2, 3))
+
+    def test_unreadable_file_fails_the_job(self):
+        upload = SimpleUploadedFile("students.xlsx", b"not a workbook")
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        job_id = client.post("/api/employee-details/import/", {"file": upload}, format="multipart").json()["id"]
+        self.assertEqual(client.get(f"/api/student-details/import/{job_id}/").status_code, 404)
+        call_command("run_user_imports", workers=0, stdout=StringIO(), stderr=StringIO())
+        job = client.get(f"/api/employee-details/import/{job_id}/").json()
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("XLSX", job["report"]["message"])
+
+
+class OTPStoreTests(TestCase):
+    stores = (DatabaseOTPStore, CacheOTPStore)
+
+    def test_code_and_token_are_single_use(self):
+        for store_class in self.stores:
+            with self.subTest(store=store_class.__name__):
+                store = store_class()
+                code = store.issue_code("Someone@example.com")
+                self.assertIsNone(store.verify_code("someone@example.com", "x" + code[1:]))
+                token = store.verify_code("someone@example.com", code)
+                self.assertTrue(token)
+                self.assertIsNone(store.verify_code("someone@example.com", code))
+                self.assertTrue(store.consume_token("someone@example.com", token))
+                self.assertFalse(store.consume_token("someone@example.com", token))
+
+    def test_reissuing_replaces_pending_code(self):
+        for store_class in self.stores:
+            with self.subTest(store=store_class.__name__):
+                store = store_class()
+                first = store.issue_code("someone@example.com", "1111")
+                store.issue_code("someone@example.com", "2222")
+                self.assertIsNone(store.verify_code("someone@example.com", first))
+
+    def test_stores_must_implement_every_operation(self):
+        class CodesOnly(BaseOTPStore):
+            def issue_code(self, email, code=None):
+                return code
+
+        with self.assertRaises(TypeError):
+            CodesOnly()
+
+    def test_expired_rows_are_rejected_and_swept(self):
+        store = DatabaseOTPStore()
+        code = store.issue_code("someone@example.com")
+        store.issue_code("other@example.com")
+        OTP.objects.filter(email="someone@example.com").update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertIsNone(store.verify_code("someone@example.com", code))
+        self.assertEqual(store.sweep(batch_size=1), 1)
+        self.assertEqual(list(OTP.objects.values_list("email", flat=True)), ["other@example.com"])
+
+    def test_reset_password_flow(self):
+        user = User.objects.create(email="someone@example.com", user_type="student")
+        client = APIClient()
+        code = DatabaseOTPStore().issue_code(user.email)
+        # Emails are normalized once in the view, for the store and the user lookup.
+        typed = " Someone@Example.com"
+        response = client.post("/api/user/verify-otp/", {"email": typed, "otp": code}, format="json")
+        token = response.json()["token"]
+        data = {"email": typed, "new_password": "n3w-passw0rd"}
+        response = client.post("/api/user/reset-password/", data, format="json", HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("n3w-passw0rd"))
+        response = client.post("/api/user/reset-password/", data, format="json", HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    THROTTLE_ENABLED=True,
+    THROTTLE_RATES={"login": {"ip": "100/min", "email": "2/min"}},
+)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        throttle_cache().clear()
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        for _ in range(10):
+            self.assertEqual(hit("test", 10, 60, now=59.0), 0)
+        # 3s into the next window, 95% of the previous count still applies.
+        self.assertGreater(hit("test", 10, 60, now=63.0), 0)
+        self.assertEqual(hit("test", 10, 60, now=105.0), 0)
+
+    def test_login_is_rejected_with_429_before_the_view_runs(self):
+        data = {"email": "someone@example.com", "password": "wrong"}
+        for path in ("/api/user/login/", "/api/async/user/login/"):
+            with self.subTest(path=path):
+                throttle_cache().clear()
+                client = APIClient()
+                for _ in range(2):
+                    self.assertEqual(client.post(path, data, format="json").status_code, 400)
+                response = client.post(path, data, format="json")
+                self.assertEqual(response.status_code, 429)
+                self.assertIn("Retry-After", response)
+                other = dict(data, email="other@example.com")
+                self.assertEqual(client.post(path, other, format="json").status_code, 400)
+
+    async def test_async_path_shares_counts_with_sync_path(self):
+        self.assertEqual(hit("test", 2, 60, now=0.0), 0)
+        self.assertEqual(await ahit("test", 2, 60, now=1.0), 0)
+        self.assertGreater(hit("test", 2, 60, now=2.0), 0)
+        request = RequestFactory().post("/", {"email": "someone@example.com"}, content_type="application/json")
+        self.assertEqual(check("login", request), 0)
+        self.assertEqual(await acheck("login", request), 0)
+        self.assertGreater(await acheck("login", request), 0)
+
+    def test_forwarded_for_is_only_trusted_behind_proxies(self):
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="1.2.3.4, 5.6.7.8")
+        self.assertEqual(client_ip(request), "10.0.0.1")
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1}):
+            self.assertEqual(client_ip(request), "5.6.7.8")
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 5}):
+            self.assertEqual(client_ip(request), "1.2.3.4")
+
+    def test_per_process_cache_is_reported(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertEqual([error.id for error in check_throttle_cache(None)], ["elearning_app.W002"])
+            with override_settings(THROTTLE_ENABLED=False):
+                self.assertEqual(check_throttle_cache(None), [])
+
+
+class BulkUserUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", user_type="admin")
+        cls.year_one = ClassDetails.objects.create(name="Year 1")
+        cls.year_two = ClassDetails.objects.create(name="Year 2")
+        User.objects.bulk_create(
+            User(email=f"student{i}@example.com", user_type="student", class_name=cls.year_one)
+            for i in range(5)
+        )
+        User.objects.create(email="teacher@example.com", user_type="teacher", class_name=cls.year_one)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_promote_class_with_one_update(self):
+        data = {
+            "filter": {"class_name": str(self.year_one.id)},
+            "changes": {"class_name": str(self.year_two.id)},
+        }
+        # Validating the two class ids, then the UPDATE.
+        with self.assertNumQueries(3):
+            response = self.client.patch("/api/student-details/bulk/", data, format="json")
+        self.assertEqual(response.json(), {"updated": 5})
+        self.assertEqual(User.objects.filter(class_name=self.year_two).count(), 5)
+        self.assertEqual(User.objects.get(email="teacher@example.com").class_name, self.year_one)
+
+    def test_promotion_keeps_attendance_rollups(self):
+        course = CourseDetails.objects.create(title="Algebra")
+        student = User.objects.filter(user_type="student").first()
+        data = {"course_id": str(course.id), "records": [{"user_id": str(student.id), "status": "present"}]}
+        self.client.post("/api/attendance/bulk-mark/", data, format="json")
+        data = {"filter": {"class_name": str(self.year_one.id)}, "changes": {"class_name": str(self.year_two.id)}}
+        self.client.patch("/api/student-details/bulk/", data, format="json")
+        row = Attendance.objects.get()
+        self.client.delete(f"/api/attendance/{row.id}/")
+        rollup = AttendanceRollup.objects.get()
+        self.assertEqual((rollup.class_name, rollup.present, rollup.absent), (self.year_one, 0, 0))
+
+    def test_ids_and_validation(self):
+        teacher = User.objects.get(email="teacher@example.com")
+        data = {"ids": [str(teacher.id)], "changes": {"employee_type": "part_time"}}
+        response = self.client.patch("/api/employee-details/bulk/", data, format="json")
+        self.assertEqual(response.json(), {"updated": 1})
+        for data in (
+            {"ids": [str(teacher.id)], "changes": {"email": "x@example.com"}},
+            {"ids": [str(teacher.id)], "changes": {"employee_type": "sometimes"}},
+            {"changes": {"employee_type": "part_time"}},
+        ):
+            response = self.client.patch("/api/employee-details/bulk/", data, format="json")
+            self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(TestCase):
+    def test_student_csv_streams_and_escapes_formulas(self):
+        admin = User.objects.create(email="admin@example.com", user_type="admin")
+        class_name = ClassDetails.objects.create(name="Class 1")
+        User.objects.create(
+            email="student@example.com",
+            first_name="=SUM(A1)",
+            contact="+27 11 555 0000",
+            user_type="student",
+            class_name=class_name,
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get(f"/api/student-details/export/?class_name={class_name.id}")
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn(",'=SUM(A1),", lines[1])
+        self.assertIn(",+27 11 555 0000,Class 1,", lines[1])
+
+    async def test_asgi_exports_use_async_iterators(self):
+        admin = await User.objects.acreate(email="admin@example.com", user_type="admin")
+        await User.objects.acreate(email="student@example.com", first_name="Ann", user_type="student")
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(admin)}"}
+        client = AsyncClient()
+        response = await client.get("/api/student-details/export/", headers=headers)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.splitlines()[1].split(",")[1:3], ["student@example.com", "Ann"])
+
+        response = await client.get("/api/student-details/export/?file_type=xlsx", headers=headers)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response["Content-Length"], str(len(body)))
+        self.assertTrue(body.startswith(b"PK"))
@@ -0,0 +1,254 @@
+"""
+Sliding-window request quotas for the auth and write endpoints.
+
+Each scope in THROTTLE_RATES (login, register, send_otp, ...) lists rules
+keyed by what they count: ``ip``, ``email`` (from the request body) or
+``user`` (the authenticated user). A rate is "<count>/<period>". The period
+is s, min, hour or day and may carry a multiplier ("5/15min"). A dict of
+rates keyed by user_type, with a "default" entry, gives user types
+different quotas.
+
+Counts use the sliding-window counter approximation. Each rule keeps a
+counter for the current and the previous fixed window, and the previous one
+is weighted by how much of it still overlaps the sliding window. A check
+costs one get_many and, if allowed, one incr per rule against the
+THROTTLE_CACHE_ALIAS cache; async views use the cache's async methods. It
+runs before the view body, so a rejected request does no hashing or
+database work. Use a shared cache (redis, memcached) in production: locmem
+quotas are per process, and a system check warns about them.
+
+Client addresses come from REMOTE_ADDR. X-Forwarded-For is only read when
+REST_FRAMEWORK["NUM_PROXIES"] says how many trusted proxies append to it.
+"""
+import hashlib
+import json
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = "throttle"
+PERIODS = {"s": 1, "sec": 1, "min": 60, "m": 60, "hour": 3600, "h": 3600, "day": 86400, "d": 86400}
+RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+)\s*$")
+
+_rate_cache = {}
+
+
+def parse_rate(rate):
+    """Return (limit, window seconds) for a rate such as "10/min" or "5/15min"."""
+    parsed = _rate_cache.get(rate)
+    if parsed is None:
+        match = RATE_RE.match(rate)
+        if not match or match.group(3) not in PERIODS:
+            raise ValueError(f"Invalid throttle rate: {rate!r}")
+        limit, multiplier, period = match.groups()
+        parsed = _rate_cache[rate] = (int(limit), int(multiplier or 1) * PERIODS[period])
+    return parsed
+
+
+def get_cache():
+    return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+
+def window_keys(key, window, now):
+    index = int(now // window)
+    return f"{KEY_PREFIX}:{key}:{index}", f"{KEY_PREFIX}:{key}:{index - 1}", now - index * window
+
+
+def wait_for(counts, current_key, previous_key, limit, window, elapsed):
+    current = counts.get(current_key, 0)
+    previous = counts.get(previous_key, 0)
+    if previous * (1 - elapsed / window) + current + 1 <= limit:
+        return 0
+    if current + 1 > limit or not previous:
+        return window - elapsed
+    # Wait until enough of the previous window has slid out.
+    return max(window * (1 - (limit - current - 1) / previous) - elapsed, 0.001)
+
+
+def hit(key, limit, window, now=None):
+    """
+    Count one request against ``key`` unless that would exceed ``limit`` in
+    the sliding ``window``. Returns 0 if the request is allowed, otherwise
+    the seconds until it would be.
+    """
+    cache = get_cache()
+    current_key, previous_key, elapsed = window_keys(key, window, time.time() if now is None else now)
+    counts = cache.get_many([current_key, previous_key])
+    wait = wait_for(counts, current_key, previous_key, limit, window, elapsed)
+    if wait:
+        return wait
+    try:
+        cache.incr(current_key)
+    except ValueError:
+        if not cache.add(current_key, 1, window * 2):
+            cache.incr(current_key)
+    return 0
+
+
+async def ahit(key, limit, window, now=None):
+    """Async version of hit()."""
+    cache = get_cache()
+    current_key, previous_key, elapsed = window_keys(key, window, time.time() if now is None else now)
+    counts = await cache.aget_many([current_key, previous_key])
+    wait = wait_for(counts, current_key, previous_key, limit, window, elapsed)
+    if wait:
+        return wait
+    try:
+        await cache.aincr(current_key)
+    except ValueError:
+        if not await cache.aadd(current_key, 1, window * 2):
+            await cache.aincr(current_key)
+    return 0
+
+
+def client_ip(request):
+    """
+    REMOTE_ADDR, or, behind NUM_PROXIES trusted proxies, the address the
+    outermost one recorded in X-Forwarded-For.
+    """
+    remote_addr = request.META.get("REMOTE_ADDR")
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    num_proxies = api_settings.NUM_PROXIES
+    if not num_proxies or not forwarded:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded.split(",")]
+    return addresses[-min(num_proxies, len(addresses))]
+
+
+def request_email(request):
+    data = getattr(request, "data", None)
+    if data is None:
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            data = request.POST
+    email = data.get("email") if hasattr(data, "get") else None
+    return str(email).strip().lower() if email else None
+
+
+def request_user(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def identify(kind, request, get_user):
+    if kind == "ip":
+        return client_ip(request)
+    if kind == "email":
+        return request_email(request)
+    if kind == "user":
+        user = get_user()
+        return str(user.pk) if user else None
+    raise ValueError(f"Unknown throttle key: {kind!r}")
+
+
+def get_rules(scope):
+    if not getattr(settings, "THROTTLE_ENABLED", True):
+        return {}
+    return getattr(settings, "THROTTLE_RATES", {}).get(scope) or {}
+
+
+def limits(scope, rules, request, get_user):
+    """Yield (key, limit, window) for each rule of ``scope`` that applies to the request."""
+    for kind, rate in rules.items():
+        if isinstance(rate, dict):
+            # Only resolved when needed: request.user may cost a query.
+            user_type = getattr(get_user(), "user_type", None)
+            rate = rate.get(user_type, rate.get("default"))
+        ident = identify(kind, request, get_user)
+        if not rate or ident is None:
+            continue
+        limit, window = parse_rate(rate)
+        digest = hashlib.md5(str(ident).encode()).hexdigest()
+        yield f"{scope}:{kind}:{digest}", limit, window
+
+
+def check(scope, request):
+    """
+    Apply every rule of ``scope`` to the request. Returns 0 if it may
+    proceed, otherwise the longest wait in seconds among the rules it broke.
+    """
+    rules = get_rules(scope)
+    wait = 0
+    for key, limit, window in limits(scope, rules, request, lambda: request_user(request)):
+        wait = max(wait, hit(key, limit, window))
+    return wait
+
+
+async def acheck(scope, request):
+    """Async version of check() for async views."""
+    rules = get_rules(scope)
+    user = None
+    if any(kind == "user" or isinstance(rate, dict) for kind, rate in rules.items()):
+        user = await request.auser()
+        if not user.is_authenticated:
+            user = None
+    wait = 0
+    for key, limit, window in limits(scope, rules, request, lambda: user):
+        wait = max(wait, await ahit(key, limit, window))
+    return wait
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    DRF throttle for one scope; use ``SlidingWindowThrottle.for_scope("login")``
+    in ``throttle_classes``. DRF checks throttles after authentication and
+    before the handler runs, and answers 429 with Retry-After.
+    """
+
+    scope = None
+
+    @classmethod
+    def for_scope(cls, scope):
+        return type(f"{scope.title().replace('_', '')}Throttle", (cls,), {"scope": scope})
+
+    def allow_request(self, request, view):
+        self.retry_after = check(self.scope, request)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+def throttled_response(wait):
+    response = JsonResponse(
+        {"message": "Too many requests. Please try again later."}, status=429
+    )
+    response["Retry-After"] = str(max(1, round(wait)))
+    return response
+
+
+def throttle(scope):
+    """Throttle a plain (sync or async) Django view, as SlidingWindowThrottle does for DRF."""
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                wait = await acheck(scope, request)
+                if wait:
+                    return throttled_response(wait)
+                return await view_func(request, *args, **kwargs)
+
+        else:
+
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                wait = check(scope, request)
+                if wait:
+                    return throttled_response(wait)
+                return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
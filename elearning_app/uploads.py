@@ -0,0 +1,167 @@
+"""
+Resumable chunked uploads for CourseSubSection media.
+
+A session owns a partial file in storage. Each chunk is streamed from the
+request body straight into that file at its offset while a SHA-256 is
+computed, and finalizing renames the partial file into the field's upload
+directory, so the assembled file is never copied. Requires a storage with
+local paths (FileSystemStorage).
+
+No row lock is held while a chunk is read from the client. The offset is
+claimed under a short lock (write_started_at), the chunk is written, and the
+offset is then advanced with an UPDATE conditional on that claim. Sessions
+idle for MEDIA_UPLOAD_SESSION_TTL seconds expire and are removed by
+purge_upload_sessions.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import UploadSession
+
+READ_SIZE = 64 * 1024
+# A claim older than this is treated as abandoned by a dead request.
+CHUNK_LEASE = timedelta(hours=1)
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+def create_partial_file(session):
+    path = default_storage.path(session.partial_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def parse_checksum(header):
+    """Accept ``sha256 <hex>`` (or a bare hex digest) from Upload-Checksum."""
+    if not header:
+        return None
+    algorithm, _, digest = header.strip().partition(" ")
+    if not digest:
+        algorithm, digest = "sha256", algorithm
+    if algorithm.lower() != "sha256":
+        raise UploadError("Only sha256 checksums are supported")
+    return digest.lower()
+
+
+def session_ttl():
+    return timedelta(seconds=getattr(settings, "MEDIA_UPLOAD_SESSION_TTL", 24 * 3600))
+
+
+def check_uploading(session, now=None):
+    if session.status != session.UPLOADING:
+        raise UploadError("Upload is already complete", status=409)
+    now = now or timezone.now()
+    if session.updated_at and session.updated_at < now - session_ttl():
+        raise UploadError("Upload has expired", status=410)
+    if session.write_started_at and session.write_started_at > now - CHUNK_LEASE:
+        raise UploadError("Another chunk is being written", status=409, offset=session.offset)
+
+
+def claim_chunk(session, offset):
+    """
+    Reserve ``session`` for one chunk at ``offset``. The caller must hold a
+    row lock on ``session``, and can release it once this returns.
+    """
+    now = timezone.now()
+    check_uploading(session, now)
+    if offset != session.offset:
+        raise UploadError("Offset mismatch", status=409, offset=session.offset)
+    session.write_started_at = now
+    session.save(update_fields=["write_started_at", "updated_at"])
+
+
+def write_chunk(session, offset, stream, checksum=None):
+    """
+    Write the request body into the session's partial file at ``offset``,
+    which must have been claimed with claim_chunk. Returns the new offset.
+    """
+    claimed = UploadSession.objects.filter(
+        pk=session.pk, offset=offset, write_started_at=session.write_started_at
+    )
+    try:
+        written = _write_partial(session, offset, stream, checksum)
+    except Exception:
+        claimed.update(write_started_at=None)
+        raise
+    if not claimed.update(offset=offset + written, write_started_at=None, updated_at=timezone.now()):
+        raise UploadError("Upload changed while the chunk was written", status=409)
+    session.offset = offset + written
+    session.write_started_at = None
+    return session.offset
+
+
+def _write_partial(session, offset, stream, checksum):
+    digest = hashlib.sha256()
+    written = 0
+    path = default_storage.path(session.partial_name)
+    with open(path, "r+b") as partial:
+        partial.seek(offset)
+        try:
+            while True:
+                data = stream.read(READ_SIZE) if stream is not None else b""
+                if not data:
+                    break
+                written += len(data)
+                if offset + written > session.size:
+                    raise UploadError("Chunk exceeds the declared upload size")
+                digest.update(data)
+                partial.write(data)
+            if checksum and digest.hexdigest() != checksum:
+                raise UploadError("Checksum mismatch", offset=offset)
+        except Exception:
+            partial.truncate(offset)
+            raise
+        partial.truncate(offset + written)
+    return written
+
+
+def finalize_upload(session):
+    """Move the completed partial file into place and attach it to the subsection."""
+    check_uploading(session)
+    if session.offset != session.size:
+        raise UploadError("Upload is incomplete", status=409, offset=session.offset)
+
+    subsection = session.subsection
+    field = subsection._meta.get_field("image")
+    name = default_storage.get_available_name(
+        field.generate_filename(subsection, session.filename),
+        max_length=field.max_length,
+    )
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(default_storage.path(session.partial_name), target)
+
+    subsection.image.name = name
+    subsection.save(update_fields=["image", "updated_at"])
+    session.status = session.COMPLETE
+    session.save(update_fields=["status", "updated_at"])
+    return subsection
+
+
+def discard_partial_file(session):
+    try:
+        os.remove(default_storage.path(session.partial_name))
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired_sessions():
+    """Delete sessions idle for longer than the TTL, with their partial files."""
+    expired = UploadSession.objects.filter(updated_at__lt=timezone.now() - session_ttl())
+    deleted = 0
+    for session in expired.only("id", "status").iterator():
+        if session.status == session.UPLOADING:
+            discard_partial_file(session)
+        deleted += UploadSession.objects.filter(pk=session.pk).delete()[0]
+    return deleted
@@ -1,7 +1,8 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
-from .views import UsersView,CourseDetailsViewset,ClassDetailsViewset,EmployeeDetailsView,StudentDetailView,EmployeeTypeView,CourseSectionViewset,CourseSubSectionViewset,mark_attendance
+from . import async_views
+from .views import UsersView,CourseDetailsViewset,ClassDetailsViewset,EmployeeDetailsView,StudentDetailView,EmployeeTypeView,CourseSectionViewset,CourseSubSectionViewset,mark_attendance,OverallRatingView,PostCourseReview,MediaUploadViewset,ResponseCacheStatsView,DatabasePoolStatsView,ContentSearchView,PeopleSearchView
 router = DefaultRouter()
 router.register(r"user", UsersView, basename="user")
 router.register(r"course-details", CourseDetailsViewset , basename="course-details")
@@ -10,12 +11,25 @@ router.register(r"employee-type", EmployeeTypeView, basename="employee-type")
 router.register(r"student-details", StudentDetailView, basename="student-details")
 router.register(r"class-details", ClassDetailsViewset, basename="class-details")
 router.register(r"course-section", CourseSectionViewset, basename="course-sections")
+router.register(r"course-subsection", CourseSubSectionViewset, basename="course-subsections")
 router.register(r'attendance', mark_attendance, basename="attendance")
+router.register(r"course-review", PostCourseReview, basename="course-review")
+router.register(r"media-uploads", MediaUploadViewset, basename="media-uploads")
 
 urlpatterns = router.urls
 
 urlpatterns = [
     *router.urls,
     path('mark-attendance/<int:course_id>/', mark_attendance.as_view, name='mark-attendance'),
+    path('async/user/login/', async_views.login_view, name='async-login'),
+    path('async/user/register/', async_views.register, name='async-register'),
+    path('async/user/send-otp/', async_views.send_otp, name='async-send-otp'),
+    path('async/user/verify-otp/', async_views.verify_otp, name='async-verify-otp'),
+    path('course-rating/bulk/', OverallRatingView.as_view({'get': 'bulk'}), name='course-rating-bulk'),
+    path('course-rating/<uuid:course_id>/', OverallRatingView.as_view({'get': 'list'}), name='course-rating'),
+    path('response-cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('db-pool/stats/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
+    path('search/', ContentSearchView.as_view(), name='content-search'),
+    path('people/search/', PeopleSearchView.as_view(), name='people-search'),
 ]
     
\ No newline at end of file
@@ -10,6 +10,8 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 # from datetime import datetime, t
 from rest_framework.decorators import permission_classes,action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
 import random
 from datetime import timedelta
 from django.utils import timezone
@@ -19,12 +21,124 @@ from .serializers import (
     UserLogoutSerializer,
 )
 from django.conf import settings
-from django.core.mail import send_mail
+from .mail import ACCOUNT_CREATED_SUBJECT, account_created_message, queue_mail
 from django.contrib.auth.hashers import make_password
 from rest_framework.exceptions import APIException, NotFound
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, Q, Sum
+from django.utils.http import parse_etags, quote_etag
+import hashlib
 import string
 from datetime import date,datetime
-from .permissions import IsSchoolAdmin
+from .permissions import IsSchoolAdmin, can_manage_subsection
+from .pagination import UserCursorPagination
+from .importers import queue_import
+from .streaming import MediaRenderer, is_asgi, serve_file
+from .search import search_content, search_people
+from .otp_store import get_otp_store, normalize_email
+from .throttling import SlidingWindowThrottle
+from .exports import attendance_rows, employee_rows, export_response, student_rows
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .caching import CachedResponseMixin, get_stats as response_cache_stats
+from .db_pool import pool_stats
+from .uploads import (
+    UploadError,
+    claim_chunk,
+    create_partial_file,
+    discard_partial_file,
+    finalize_upload,
+    parse_checksum,
+    write_chunk,
+)
+
+
+def import_users_response(request, user_type):
+    """
+    Queue an uploaded spreadsheet for run_user_imports. Hashing thousands of
+    passwords takes far longer than a request may, so the report is read
+    later from import_job_response.
+    """
+    if request.user.user_type != "admin":
+        return Response(
+            {"message": "You are not authorized to perform this action."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    upload = request.FILES.get("file")
+    if upload is None or not upload.name.lower().endswith((".csv", ".xlsx", ".xlsm")):
+        return Response(
+            {"message": "A CSV or XLSX file is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    job = queue_import(upload, user_type, request.user)
+    return Response(UserImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def import_job_response(request, user_type, job_id):
+    if request.user.user_type != "admin":
+        return Response(
+            {"message": "You are not authorized to perform this action."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    job = get_object_or_404(UserImportJob, id=job_id, user_type=user_type)
+    return Response(UserImportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+def etag_matches(etag, if_none_match):
+    if if_none_match.strip() == "*":
+        return True
+    etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+    return etag in etags
+
+
+def paginated_user_response(view, request, queryset):
+    field_names = UserDetailsSerializer.fieldset_from_request(request)
+    paginator = UserCursorPagination()
+    queryset = UserDetailsSerializer.optimize_queryset(
+        queryset,
+        field_names,
+        extra_fields=[name.lstrip('-') for name in paginator.ordering],
+    )
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = UserDetailsSerializer(
+        page, many=True, fields=field_names, context={'request': request}
+    )
+    return paginator.get_paginated_response(serializer.data)
+
+
+def export_rows_response(request, query_serializer, name, rows):
+    query = query_serializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = dict(query.validated_data)
+    file_type = params.pop('file_type')
+    columns, queryset = rows(**params)
+    try:
+        return export_response(name, columns, queryset, file_type, asgi=is_asgi(request))
+    except ValueError as e:
+        return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def bulk_update_users(request, queryset, filter_fields, change_fields):
+    """
+    Apply one validated set of changes to the selected users with a single
+    UPDATE. No post_save is sent, so ``change_fields`` must not name fields
+    that signal handlers react to (photo). A class_name change is safe for
+    attendance rollups, which count rows under Attendance.class_name.
+    """
+    serializer = BulkUserUpdateSerializer(
+        data=request.data, filter_fields=filter_fields, change_fields=change_fields
+    )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    if 'ids' in data:
+        queryset = queryset.filter(id__in=data['ids'])
+    else:
+        queryset = queryset.filter(**data['filter'])
+    # update() skips auto_now, so stamp updated_at explicitly.
+    updated = queryset.update(**data['changes'], updated_at=timezone.now())
+    return Response({'updated': updated}, status=status.HTTP_200_OK)
 
 
 class UsersView(viewsets.ModelViewSet):
@@ -32,7 +146,12 @@ class UsersView(viewsets.ModelViewSet):
     serializer_class = UserDetailsSerializer
 
 
-    @action(detail=False, methods=["POST"], url_path="register")
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="register",
+        throttle_classes=[SlidingWindowThrottle.for_scope("register")],
+    )
     def register(self, request):
         try:
             serializer = UserRegistrationSerializer(data=request.data)
@@ -55,7 +174,12 @@ class UsersView(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
     
-    @action(detail=False, methods=["POST"], url_path="login")
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="login",
+        throttle_classes=[SlidingWindowThrottle.for_scope("login")],
+    )
     def login_view(self, request):
         email = request.data.get("email").lower()
         try:
@@ -81,9 +205,14 @@ class UsersView(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         
-    @action(detail=False, methods=["POST"], url_path="send-otp")
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="send-otp",
+        throttle_classes=[SlidingWindowThrottle.for_scope("send_otp")],
+    )
     def send_otp(self, request):
-        email = request.data.get("email").lower()
+        email = normalize_email(request.data.get("email"))
         try:
             user = User.objects.get(email=email)
         except Exception as e:
@@ -92,14 +221,12 @@ class UsersView(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            otp = "".join([str(random.randint(0, 9)) for _ in range(4)])
-            OTP.objects.update_or_create(email=email, defaults={"otp": otp})
-            send_mail(
+            otp = get_otp_store().issue_code(email)
+            queue_mail(
                 "Password Reset OTP",
                 f"Your OTP for password reset is: {otp}",
                 settings.EMAIL_HOST_USER,
                 [email],
-                fail_silently=False,
             )
 
             return Response(
@@ -111,22 +238,20 @@ class UsersView(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-    @action(detail=False, methods=["POST"], url_path="verify-otp")
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="verify-otp",
+        throttle_classes=[SlidingWindowThrottle.for_scope("verify_otp")],
+    )
     def verify_otp(self, request):
         try:
-            email = request.data.get("email")
+            email = normalize_email(request.data.get("email"))
             otp = request.data.get("otp")
             if not email or not otp:
                 raise APIException("Email and OTP are required.")
-            otp_obj = OTP.objects.filter(email=email, otp=otp).first()
-            if otp_obj:
-                token = "".join(
-                    random.choices(string.ascii_uppercase + string.digits, k=12)
-                )
-                otp_obj.token = token
-                otp_obj.otp = ""
-                otp_obj.save()
-                # otp_obj.delete()
+            token = get_otp_store().verify_code(email, otp)
+            if token:
                 return Response(
                     {"message": "OTP verified successfully.", "token": token},
                     status=status.HTTP_200_OK,
@@ -144,17 +269,15 @@ class UsersView(viewsets.ModelViewSet):
     @action(detail=False, methods=["POST"], url_path="reset-password")
     def reset_password(self, request):
         try:
-            email = request.data.get("email")
+            email = normalize_email(request.data.get("email"))
             new_password = request.data.get("new_password")
             token = request.headers.get("Authorization")
             if not email or not new_password:
                 raise APIException("Email and new password are required.")
-            otp_obj = OTP.objects.filter(email=email, token=token).first()
-            if otp_obj:
+            if get_otp_store().consume_token(email, token):
                 user = User.objects.get(email=email)
                 user.password = make_password(new_password)
                 user.save()
-                otp_obj.delete()
                 return Response(
                     {"message": "Password reset successfully."},
                     status=status.HTTP_200_OK,
@@ -180,16 +303,61 @@ class UsersView(viewsets.ModelViewSet):
             return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class CourseDetailsViewset(viewsets.ModelViewSet):
+class CourseDetailsViewset(CachedResponseMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = CourseDetails.objects.all()
     serializer_class = CourseDetailsSerializer
+    cache_models = (CourseDetails,)
+
+    @action(detail=True, methods=["GET"], url_path="tree")
+    def tree(self, request, pk=None):
+        try:
+            state = (
+                CourseDetails.objects.filter(pk=pk)
+                .annotate(
+                    sections_updated=Max("coursesection__updated_at"),
+                    sections=Count("coursesection", distinct=True),
+                    sub_sections_updated=Max("coursesection__coursesubsection__updated_at"),
+                    sub_sections=Count("coursesection__coursesubsection", distinct=True),
+                )
+                .values_list(
+                    "updated_at",
+                    "sections_updated",
+                    "sections",
+                    "sub_sections_updated",
+                    "sub_sections",
+                )
+                .first()
+            )
+        except ValidationError:
+            state = None
+        if state is None:
+            raise NotFound("Course not found")
+        etag = quote_etag(hashlib.md5(repr(state).encode()).hexdigest())
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and etag_matches(etag, if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        course = CourseDetails.objects.prefetch_related(
+            Prefetch(
+                "coursesection_set",
+                queryset=CourseSection.objects.order_by("created_at").prefetch_related(
+                    Prefetch(
+                        "coursesubsection_set",
+                        queryset=CourseSubSection.objects.order_by("created_at"),
+                    )
+                ),
+            )
+        ).get(pk=pk)
+        serializer = CourseTreeSerializer(course, context={"request": request})
+        return Response(serializer.data, headers={"ETag": etag})
    
 
-class ClassDetailsViewset(viewsets.ModelViewSet):
+class ClassDetailsViewset(CachedResponseMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = ClassDetails.objects.all()
     serializer_class = ClassDetailsSerializer
+    cache_models = (ClassDetails,)
    
 
 
@@ -198,6 +366,22 @@ class EmployeeDetailsView(viewsets.ModelViewSet):
 
     queryset = User.objects.all()
     serializer_class = UserDetailsSerializer
+
+    @action(
+        detail=False,
+        methods=['patch'],
+        url_path='bulk',
+        permission_classes=[IsAuthenticated, IsSchoolAdmin],
+    )
+    def bulk(self, request):
+        """PATCH {"ids": [...] | "filter": {...}, "changes": {...}} -> {"updated": n}"""
+        return bulk_update_users(
+            request,
+            User.objects.filter(user_type__in=["teacher", "admin", "other", "driver"]),
+            filter_fields=['user_type', 'employee_type', 'position'],
+            change_fields=['employee_type', 'position', 'leaves'],
+        )
+
     def update(self, request,pk=None):
         if request.user.user_type == "admin":
             employee = self.get_object()
@@ -222,8 +406,7 @@ class EmployeeDetailsView(viewsets.ModelViewSet):
                 employees = User.objects.filter(
                     user_type__in=["teacher", "admin", "other", "driver"]
                 )
-            serializer = UserDetailsSerializer(employees, many=True)
-            return Response(serializer.data)
+            return paginated_user_response(self, request, employees)
         else:
             return Response(
                 {"message": "You are not authorized to perform this action."},
@@ -244,14 +427,14 @@ class EmployeeDetailsView(viewsets.ModelViewSet):
             data["password"] = password
             serializer = EmployeeRegistrationSerializer(data=data)
             if serializer.is_valid():
-                serializer.save()
-                send_mail(
-                "Your Account has been added successfully",
-                f"Your email is your Username and Your password for login is: {password}"+"\nClick this link for login: https://web-app.testyourapp.online/",
-                settings.EMAIL_HOST_USER,
-                [email],
-                fail_silently=False,
-            )
+                with transaction.atomic():
+                    serializer.save()
+                    queue_mail(
+                        ACCOUNT_CREATED_SUBJECT,
+                        account_created_message(password),
+                        settings.EMAIL_HOST_USER,
+                        [email],
+                    )
                 return Response({'message':'Employee created Successfully'}, status=status.HTTP_201_CREATED)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -262,32 +445,64 @@ class EmployeeDetailsView(viewsets.ModelViewSet):
             )
         
 
+    @action(detail=False, methods=["POST"], url_path="import", parser_classes=[MultiPartParser])
+    def import_employees(self, request):
+        return import_users_response(request, "employee")
+
+    @action(detail=False, methods=["GET"], url_path=r"import/(?P<job_id>[0-9a-f-]{36})")
+    def import_employees_job(self, request, job_id):
+        return import_job_response(request, "employee", job_id)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="export",
+        permission_classes=[IsAuthenticated, IsSchoolAdmin],
+    )
+    def export(self, request):
+        """GET employee-details/export/?file_type=csv|xlsx&user_type=teacher"""
+        return export_rows_response(request, EmployeeExportQuerySerializer, "employees", employee_rows)
+
+
 class EmployeeTypeView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
 
     def list(self, request):
         employee_type = request.query_params.get("employee_type")
         position = request.query_params.get("position")
-        if employee_type:
-            employees = User.objects.filter(employee_type=employee_type)
-            serializer = UserDetailsSerializer(employees, many=True)
-            return Response(serializer.data)
-        elif position:
-            employees = User.objects.filter(position=position)
-            serializer = UserDetailsSerializer(employees, many=True)
-            return Response(serializer.data)
-        elif position and employee_type:
-            employees = User.objects.filter(
-                employee_type=employee_type, position=position
+        if not employee_type and not position:
+            return Response(
+                {"message": "employee_type or position is required."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            serializer = UserDetailsSerializer(employees, many=True)
-            return Response(serializer.data)
+        employees = User.objects.filter(user_type__in=["teacher", "admin", "other", "driver"])
+        if employee_type:
+            employees = employees.filter(employee_type=employee_type)
+        if position:
+            employees = employees.filter(position=position)
+        return paginated_user_response(self, request, employees)
 
 
 class StudentDetailView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = User.objects.all()
     serializer_class = UserDetailsSerializer
+
+    @action(
+        detail=False,
+        methods=['patch'],
+        url_path='bulk',
+        permission_classes=[IsAuthenticated, IsSchoolAdmin],
+    )
+    def bulk(self, request):
+        """PATCH {"ids": [...] | "filter": {...}, "changes": {...}} -> {"updated": n}"""
+        return bulk_update_users(
+            request,
+            User.objects.filter(user_type="student"),
+            filter_fields=['class_name'],
+            change_fields=['class_name', 'language', 'leaves'],
+        )
+
     def update(self, request,pk=None):
         if request.user.user_type == "admin":
             student = self.get_object()
@@ -312,8 +527,7 @@ class StudentDetailView(viewsets.ModelViewSet):
                 )
             else:
                 students = User.objects.filter(user_type__in=["student"])
-            serializer = UserDetailsSerializer(students, many=True)
-            return Response(serializer.data)
+            return paginated_user_response(self, request, students)
         else:
             return Response(
                 {"message": "You are not authorized to perform this action."},
@@ -339,14 +553,14 @@ class StudentDetailView(viewsets.ModelViewSet):
             basic_data["password"] = password
             serializer = StudentRegistrationSerializer(data=basic_data)
             if serializer.is_valid():
-                serializer.save()
-                send_mail(
-                "Your Account has been added successfully",
-                f"Your email is your Username and Your password for login is: {password} "+"\nClick this link for login: https://web-app.testyourapp.online/",
-                settings.EMAIL_HOST_USER,
-                [email],
-                fail_silently=False,
-                )
+                with transaction.atomic():
+                    serializer.save()
+                    queue_mail(
+                        ACCOUNT_CREATED_SUBJECT,
+                        account_created_message(password),
+                        settings.EMAIL_HOST_USER,
+                        [email],
+                    )
                 return Response({'message':'Student created Successfully'}, status=status.HTTP_201_CREATED)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -356,10 +570,29 @@ class StudentDetailView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-class CourseSectionViewset(viewsets.ModelViewSet):
+    @action(detail=False, methods=["POST"], url_path="import", parser_classes=[MultiPartParser])
+    def import_students(self, request):
+        return import_users_response(request, "student")
+
+    @action(detail=False, methods=["GET"], url_path=r"import/(?P<job_id>[0-9a-f-]{36})")
+    def import_students_job(self, request, job_id):
+        return import_job_response(request, "student", job_id)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="export",
+        permission_classes=[IsAuthenticated, IsSchoolAdmin],
+    )
+    def export(self, request):
+        """GET student-details/export/?file_type=csv|xlsx&class_name=<id>"""
+        return export_rows_response(request, StudentExportQuerySerializer, "students", student_rows)
+
+class CourseSectionViewset(CachedResponseMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = CourseSection.objects.all()
     serializer_class = CourseSectionSerializer
+    cache_models = (CourseSection,)
 
 
 class CourseSubSectionViewset(viewsets.ModelViewSet):
@@ -367,41 +600,244 @@ class CourseSubSectionViewset(viewsets.ModelViewSet):
     queryset = CourseSubSection.objects.all()
     serializer_class = CourseSubSectionSerializer
 
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_path="media",
+        renderer_classes=[JSONRenderer, MediaRenderer],
+    )
+    def media(self, request, pk=None):
+        subsection = self.get_object()
+        if not subsection.image:
+            raise NotFound("This subsection has no media file")
+        return serve_file(request, subsection.image, modified=subsection.updated_at)
+
+
+class MediaUploadViewset(viewsets.ViewSet):
+    """
+    Resumable uploads for CourseSubSection media:
+
+    POST   media-uploads/                 {subsection, filename, size}
+    GET    media-uploads/{id}/            current offset, to resume
+    PUT    media-uploads/{id}/            raw chunk, Upload-Offset and
+                                          optional Upload-Checksum: sha256 <hex>
+    POST   media-uploads/{id}/finalize/   attach the file to the subsection
+
+    Only admins and the owner of the subsection's course may upload.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_session(self, request, pk, lock=False):
+        sessions = UploadSession.objects.select_related("subsection__course_section__course_name")
+        if lock:
+            sessions = sessions.select_for_update()
+        try:
+            session = sessions.get(pk=pk)
+        except (UploadSession.DoesNotExist, ValidationError):
+            raise NotFound("Upload not found")
+        if session.created_by_id != request.user.id and request.user.user_type != "admin":
+            raise NotFound("Upload not found")
+        return session
+
+    def upload_error_response(self, error):
+        return Response({"message": error.message, **error.extra}, status=error.status)
+
+    def create(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not can_manage_subsection(request.user, serializer.validated_data["subsection"]):
+            return Response(
+                {"message": "You are not authorized to perform this action."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        session = serializer.save(created_by=request.user)
+        create_partial_file(session)
+        return Response(
+            UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, pk=None):
+        session = self.get_session(request, pk)
+        return Response(
+            UploadSessionSerializer(session).data,
+            headers={"Upload-Offset": str(session.offset)},
+        )
+
+    def update(self, request, pk=None):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response(
+                {"message": "Upload-Offset header is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            checksum = parse_checksum(request.headers.get("Upload-Checksum"))
+            with transaction.atomic():
+                session = self.get_session(request, pk, lock=True)
+                claim_chunk(session, offset)
+            # The row lock is released while the body is read.
+            new_offset = write_chunk(session, offset, request.stream, checksum)
+        except UploadError as e:
+            return self.upload_error_response(e)
+        return Response(
+            {"offset": new_offset, "size": session.size},
+            headers={"Upload-Offset": str(new_offset)},
+        )
 
-class OverallRatingView(viewsets.ModelViewSet):
+    def destroy(self, request, pk=None):
+        with transaction.atomic():
+            session = self.get_session(request, pk, lock=True)
+            discard_partial_file(session)
+            session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["POST"], url_path="finalize")
+    def finalize(self, request, pk=None):
+        try:
+            with transaction.atomic():
+                session = self.get_session(request, pk, lock=True)
+                if not can_manage_subsection(request.user, session.subsection):
+                    raise NotFound("Upload not found")
+                subsection = finalize_upload(session)
+        except UploadError as e:
+            return self.upload_error_response(e)
+        return Response(
+            CourseSubSectionSerializer(subsection, context={"request": request}).data
+        )
+
+
+class OverallRatingView(viewsets.ViewSet):
     def list(self, request, course_id):
-        ratings = CourseRating.objects.filter(course_name_id=course_id)
-        total_ratings = ratings.count()
-        if total_ratings == 0:
-            return Response({"overall_rating": 0}, status=status.HTTP_200_OK)
-        total_stars = sum([rating.star for rating in ratings])
-        overall_rating = total_stars / total_ratings
-        return Response({"overall_rating": overall_rating}, status=status.HTTP_200_OK)
+        # A course nobody has rated yet reads as an empty summary.
+        summary = CourseRatingSummary.objects.filter(course_id=course_id).first() or CourseRatingSummary(
+            course_id=course_id
+        )
+        return Response(
+            {
+                "overall_rating": summary.overall_rating,
+                "count": summary.count,
+                "histogram": summary.histogram,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def bulk(self, request):
+        course_ids = [
+            course_id
+            for course_id in request.query_params.get("course_ids", "").split(",")
+            if course_id
+        ]
+        try:
+            summaries = CourseRatingSummary.objects.filter(course_id__in=course_ids)
+            serializer = CourseRatingSummarySerializer(summaries, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except ValidationError:
+            return Response(
+                {"message": "Invalid course id"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
 
 class PostCourseReview(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
-    queryset = CourseSubSection.objects.all()
-    serializer_class = CourseSubSectionSerializer
+    queryset = CourseRating.objects.all()
+    serializer_class = CourseRatingSerializer
 
     def create(self, request):
         data = request.data.copy()
         data["user"] = request.user.id
         serializer = CourseRatingSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                rating = serializer.save()
+                CourseRatingSummary.apply(rating.course_name_id, rating.star)
             return Response(
                 {"message": "Review posted successfully"},
                 status=status.HTTP_201_CREATED,
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def update(self, request, pk=None, partial=False):
+        with transaction.atomic():
+            rating = get_object_or_404(
+                CourseRating.objects.select_for_update(), pk=pk
+            )
+            if rating.user_id != request.user.id and request.user.user_type != "admin":
+                return Response(
+                    {"message": "You are not authorized to perform this action."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            old_course_id, old_star = rating.course_name_id, rating.star
+            data = request.data.copy()
+            data["user"] = rating.user_id
+            serializer = CourseRatingSerializer(rating, data=data, partial=partial)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            rating = serializer.save()
+            if (old_course_id, old_star) != (rating.course_name_id, rating.star):
+                CourseRatingSummary.apply(old_course_id, old_star, delta=-1)
+                CourseRatingSummary.apply(rating.course_name_id, rating.star)
+        return Response(serializer.data)
+
+    def destroy(self, request, pk=None):
+        with transaction.atomic():
+            rating = get_object_or_404(
+                CourseRating.objects.select_for_update(), pk=pk
+            )
+            if rating.user_id != request.user.id and request.user.user_type != "admin":
+                return Response(
+                    {"message": "You are not authorized to perform this action."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            CourseRatingSummary.apply(rating.course_name_id, rating.star, delta=-1)
+            rating.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class mark_attendance(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
 
-    @action(detail=False, methods=['post','put'], url_path="mark")
+    # Every write to Attendance also moves the rollup, as mark and bulk_mark do.
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            attendance = serializer.save(class_name_id=self.request.user.class_name_id)
+            AttendanceRollup.record(
+                attendance.course_id,
+                attendance.date,
+                [(attendance.user_id, attendance.class_name_id, None, attendance.status)],
+            )
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            previous_status = (
+                Attendance.objects.select_for_update()
+                .values_list('status', flat=True)
+                .get(pk=serializer.instance.pk)
+            )
+            attendance = serializer.save()
+            AttendanceRollup.record(
+                attendance.course_id,
+                attendance.date,
+                [(attendance.user_id, attendance.class_name_id, previous_status, attendance.status)],
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            AttendanceRollup.record(
+                instance.course_id,
+                instance.date,
+                [(instance.user_id, instance.class_name_id, instance.status, None)],
+            )
+
+    @action(
+        detail=False,
+        methods=['post','put'],
+        url_path="mark",
+        throttle_classes=[SlidingWindowThrottle.for_scope("mark")],
+    )
     def mark(self, request):    
         user_id = request.data.get('user_id')
         course_id = request.data.get('course_id')
@@ -415,7 +851,8 @@ class mark_attendance(viewsets.ModelViewSet):
         except CourseDetails.DoesNotExist:
             return Response({'detail': 'Course not found'}, status=status.HTTP_400_BAD_REQUEST)
         
-        date_today = date.today()
+        date_today = timezone.localdate()
+        attendance_date = date_today
 
         if 'date_time' in request.data:
             try:
@@ -424,29 +861,244 @@ class mark_attendance(viewsets.ModelViewSet):
 
                 if date_request > date_today:
                     return Response({'detail': 'Cannot update status for future dates'},status=status.HTTP_400_BAD_REQUEST)
+                attendance_date = date_request
             except ValueError:
                 return Response({'detail': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)    
-                                    
-        attendance_qs = Attendance.objects.filter(
-            user=user,
-            course=course,
-            date_time__date=date_today
-        )
-        if attendance_qs.exists():
-            attendance = attendance_qs.first()
-            if user.user_type =='admin':
-                attendance.status = attendance_status
-                attendance.save()
-            else:
-                attendance_status = attendance.status
-        else:
-            attendance = Attendance.objects.create(
+
+        with transaction.atomic():
+            attendance, created = Attendance.objects.select_for_update().get_or_create(
                 user=user,
                 course=course,
-                date_time=timezone.now(),
-                status=attendance_status
+                date=attendance_date,
+                defaults={'status': attendance_status, 'class_name_id': user.class_name_id},
+            )
+            previous_status = None if created else attendance.status
+            # Same rule as bulk_mark: only admins overwrite an existing mark.
+            if not created and request.user.user_type == 'admin':
+                attendance.status = attendance_status
+                attendance.save()
+            AttendanceRollup.record(
+                course.id,
+                attendance_date,
+                [(user.id, attendance.class_name_id, previous_status, attendance.status)],
             )
 
         serializer = AttendanceSerializer(attendance)
         return Response(serializer.data, status=status.HTTP_200_OK)
-        
\ No newline at end of file
+
+    @action(detail=False, methods=['post'], url_path="bulk-mark")
+    def bulk_mark(self, request):
+        serializer = BulkAttendanceSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        course_id = serializer.validated_data['course_id']
+        records = {
+            record['user_id']: record['status']
+            for record in serializer.validated_data['records']
+        }
+
+        if not CourseDetails.objects.filter(id=course_id).exists():
+            return Response({'detail': 'Course not found'}, status=status.HTTP_400_BAD_REQUEST)
+        user_classes = dict(
+            User.objects.filter(id__in=records).values_list('id', 'class_name_id')
+        )
+        unknown_ids = [str(user_id) for user_id in records if user_id not in user_classes]
+        if unknown_ids:
+            return Response(
+                {'detail': 'User not found', 'user_ids': unknown_ids},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        attendance_date = serializer.validated_data.get('date', timezone.localdate())
+        overwrite = request.user.user_type == 'admin'
+        with transaction.atomic():
+            existing, existing_classes = {}, {}
+            for user_id, previous_status, class_id in (
+                Attendance.objects.select_for_update()
+                .filter(course_id=course_id, user_id__in=records, date=attendance_date)
+                .values_list('user_id', 'status', 'class_name_id')
+            ):
+                existing[user_id] = previous_status
+                existing_classes[user_id] = class_id
+            # Existing rows keep the class they were first marked under.
+            user_classes.update(existing_classes)
+            rows = [
+                Attendance(
+                    user_id=user_id,
+                    course_id=course_id,
+                    class_name_id=user_classes[user_id],
+                    date=attendance_date,
+                    status=record_status,
+                )
+                for user_id, record_status in records.items()
+            ]
+            if overwrite:
+                Attendance.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['user', 'course', 'date'],
+                    update_fields=['status', 'date_time'],
+                )
+            else:
+                Attendance.objects.bulk_create(rows, ignore_conflicts=True)
+            AttendanceRollup.record(
+                course_id,
+                attendance_date,
+                [
+                    (
+                        user_id,
+                        user_classes[user_id],
+                        existing.get(user_id),
+                        record_status if overwrite or user_id not in existing else existing[user_id],
+                    )
+                    for user_id, record_status in records.items()
+                ],
+            )
+        changed = [
+            user_id
+            for user_id, previous_status in existing.items()
+            if overwrite and previous_status != records[user_id]
+        ]
+
+        return Response(
+            {
+                'created': len(records) - len(existing),
+                'updated': len(changed),
+                'unchanged': len(existing) - len(changed),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path="export",
+        permission_classes=[IsAuthenticated, IsSchoolAdmin],
+    )
+    def export(self, request):
+        """GET attendance/export/?file_type=csv|xlsx&start=&end=&course_id=&class_id=&user_id="""
+        return export_rows_response(request, AttendanceExportQuerySerializer, "attendance", attendance_rows)
+
+    @action(detail=False, methods=['get'], url_path="rates")
+    def rates(self, request):
+        query = AttendanceRatesQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        group = params['group']
+
+        # Course and class rates come from the daily rollup; student rates
+        # read Attendance through its (user, course, date) unique index.
+        if group == 'student':
+            rows = Attendance.objects.all()
+            key = 'user_id'
+            totals = {
+                'present': Count('id', filter=Q(status='present')),
+                'absent': Count('id', filter=Q(status='absent')),
+            }
+        else:
+            rows = AttendanceRollup.objects.all()
+            key = 'course_id' if group == 'course' else 'class_name_id'
+            totals = {'present': Sum('present'), 'absent': Sum('absent')}
+
+        if 'start' in params:
+            rows = rows.filter(date__gte=params['start'])
+        if 'end' in params:
+            rows = rows.filter(date__lte=params['end'])
+        if 'course_id' in params:
+            rows = rows.filter(course_id=params['course_id'])
+        if 'class_id' in params:
+            rows = rows.filter(class_name_id=params['class_id'])
+        if 'user_id' in params:
+            rows = rows.filter(user_id=params['user_id'])
+
+        results = []
+        for row in rows.values(key).order_by(key).annotate(**totals):
+            total = row['present'] + row['absent']
+            results.append({
+                'id': row[key],
+                'present': row['present'],
+                'absent': row['absent'],
+                'total': total,
+                'rate': round(row['present'] / total, 4) if total else 0,
+            })
+        return Response(
+            {
+                'group': group,
+                'start': params.get('start'),
+                'end': params.get('end'),
+                'results': results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = (IsAuthenticated, IsSchoolAdmin)
+
+    def get(self, request):
+        return Response(response_cache_stats(), status=status.HTTP_200_OK)
+
+
+class DatabasePoolStatsView(APIView):
+    permission_classes = (IsAuthenticated, IsSchoolAdmin)
+
+    def get(self, request):
+        return Response(pool_stats(), status=status.HTTP_200_OK)
+
+
+class ContentSearchView(APIView):
+    """
+    GET search/?q=<text>&type=course,section,subsection&page=1&records=20
+    Ranked matches with <mark>-highlighted snippets.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        query = ContentSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        page, records = params['page'], params['records']
+        total, results = search_content(
+            params['q'], params.get('type'), limit=records, offset=(page - 1) * records
+        )
+        url = request.build_absolute_uri()
+        next_url = replace_query_param(url, 'page', page + 1) if page * records < total else None
+        if page == 1:
+            previous_url = None
+        elif page == 2:
+            previous_url = remove_query_param(url, 'page')
+        else:
+            previous_url = replace_query_param(url, 'page', page - 1)
+        return Response(
+            {
+                'count': total,
+                'next': next_url,
+                'previous': previous_url,
+                'results': results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PeopleSearchView(APIView):
+    """
+    GET people/search/?q=<text>&user_type=student,teacher&class_name=<id>&records=10
+    Type-ahead lookup of students and employees by name, email, contact or
+    parent name.
+    """
+    permission_classes = (IsAuthenticated, IsSchoolAdmin)
+
+    def get(self, request):
+        query = PeopleSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        results = search_people(
+            params['q'],
+            user_types=params.get('user_type'),
+            class_name=params.get('class_name'),
+            limit=params['records'],
+        )
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning_backend.settings')
+# Persistent connections are per thread and ASGI requests do not share
+# threads, so reuse connections through DB_POOL instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
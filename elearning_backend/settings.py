@@ -73,6 +73,7 @@ INSTALLED_APPS = [
 ]
 AUTH_USER_MODEL = "elearning_app.User"
 MIDDLEWARE = [
+    "elearning_app.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -111,9 +112,37 @@ DATABASES = {
         "PASSWORD": env("DBPASSWORD"),
         "HOST": env("DBHOST"),
         "PORT": env("DBPORT"),
+        # Ping a reused connection before the first query of a request.
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Connection reuse. DB_POOL=true gives every worker process a psycopg 3
+# connection pool that its WSGI threads or ASGI requests borrow from and
+# return to at the end of each request. OPTIONS["pool"] needs Django 5.1 or
+# later (this header still names the 4.2 it was generated with) and
+# psycopg[pool]. Otherwise
+# connections persist for DB_CONN_MAX_AGE seconds; asgi.py defaults that to
+# 0, because ASGI requests run on fresh threads and cannot reuse them.
+# Pool statistics are served at /metrics and /api/db-pool/stats/.
+DB_POOL = env.bool("DB_POOL", default=False)
+if DB_POOL:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+            # Seconds a request waits for a free connection before failing.
+            "timeout": env.float("DB_POOL_TIMEOUT", default=10.0),
+            # Connections are recycled after max_lifetime and closed after
+            # max_idle seconds unused (down to min_size).
+            "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", default=1800.0),
+            "max_idle": env.float("DB_POOL_MAX_IDLE", default=300.0),
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", default=60)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -149,6 +178,26 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = "static/"
+
+# Course media is streamed by the app in MEDIA_STREAM_CHUNK_SIZE chunks unless
+# MEDIA_SENDFILE_BACKEND is "nginx" (X-Accel-Redirect to MEDIA_ACCEL_PREFIX)
+# or "apache" (X-Sendfile), in which case the front end server sends the file.
+MEDIA_STREAM_CHUNK_SIZE = 64 * 1024
+MEDIA_SENDFILE_BACKEND = env("MEDIA_SENDFILE_BACKEND", default="")
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+# Largest file accepted by the resumable media-uploads endpoint.
+MEDIA_UPLOAD_MAX_SIZE = env.int("MEDIA_UPLOAD_MAX_SIZE", default=5 * 1024 ** 3)
+# Upload sessions idle this long expire; purge_upload_sessions deletes them.
+MEDIA_UPLOAD_SESSION_TTL = env.int("MEDIA_UPLOAD_SESSION_TTL", default=24 * 3600)
+# Resized copies of profile photos and subsection images. With
+# MEDIA_DERIVATIVES_ASYNC on, run generate_media_derivatives periodically to
+# render them; off renders in the request process (see elearning_app/derivatives.py).
+MEDIA_DERIVATIVES = {
+    "thumbnail": (150, 150),
+    "medium": (800, 800),
+}
+MEDIA_DERIVATIVE_WORKERS = env.int("MEDIA_DERIVATIVE_WORKERS", default=2)
+MEDIA_DERIVATIVES_ASYNC = env.bool("MEDIA_DERIVATIVES_ASYNC", default=True)
 local_models = []
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -193,15 +242,74 @@ JAZZMIN_SETTINGS = {
 }
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "elearning_app.authentication.RevocationAwareJWTAuthentication",
     ],
     # "DEFAULT_PERMISSION_CLASSES": [
     #     "rest_framework.permissions.IsAuthenticated",
     # ],
+    # Trusted proxies appending to X-Forwarded-For; with 0 client addresses
+    # come from REMOTE_ADDR alone.
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=0),
 }
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
 }
+# Cache for versioned API responses (elearning_app/caching.py). CACHE_URL
+# takes django-environ URLs such as redis://, pymemcache:// or
+# filecache:///var/tmp/elearning. The locmemcache:// default is per-process,
+# so response caching is off by default; turn RESPONSE_CACHE_ENABLED on
+# together with a shared CACHE_URL.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=300)
+RESPONSE_CACHE_ENABLED = env.bool("RESPONSE_CACHE_ENABLED", default=False)
+
+# Password-reset codes and tokens (elearning_app/otp_store.py). Use
+# elearning_app.otp_store.CacheOTPStore with a shared cache such as redis
+# or memcached; locmem is per process.
+OTP_STORE = env("OTP_STORE", default="elearning_app.otp_store.DatabaseOTPStore")
+OTP_CACHE_ALIAS = "default"
+OTP_CODE_TTL = env.int("OTP_CODE_TTL", default=600)
+OTP_TOKEN_TTL = env.int("OTP_TOKEN_TTL", default=900)
+
+# Sliding-window quotas per route (elearning_app/throttling.py). Each rule
+# counts by "ip", "email" or "user"; a dict of rates is keyed by user_type.
+# Quotas only hold across processes with a shared cache (see CACHE_URL).
+THROTTLE_ENABLED = env.bool("THROTTLE_ENABLED", default=True)
+THROTTLE_CACHE_ALIAS = "default"
+THROTTLE_RATES = {
+    "login": {"ip": "30/min", "email": "10/15min"},
+    "register": {"ip": "20/hour"},
+    "send_otp": {"ip": "20/hour", "email": "5/hour"},
+    "verify_otp": {"ip": "30/min", "email": "10/15min"},
+    "mark": {"user": {"default": "120/min", "teacher": "600/min", "admin": "1200/min"}},
+}
+
+# Rows fetched per server-side cursor round trip by the CSV/XLSX exports
+# (elearning_app/exports.py).
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+# Per-route request metrics (elearning_app/metrics.py), scraped from /metrics
+# by the addresses in METRICS_ALLOWED_IPS (empty allows everyone).
+METRICS_SERVER_TIMING = env.bool("METRICS_SERVER_TIMING", default=True)
+# Serializer timing patches rest_framework's BaseSerializer.data process-wide.
+METRICS_SERIALIZER_TIMING = env.bool("METRICS_SERIALIZER_TIMING", default=True)
+METRICS_ALLOWED_IPS = env.list("METRICS_ALLOWED_IPS", default=["127.0.0.1", "::1"])
+
+# Threads used by the async auth views for PBKDF2 (defaults to the CPU count).
+PASSWORD_HASHING_WORKERS = env.int("PASSWORD_HASHING_WORKERS", default=None)
+
+# Revoked access tokens are checked against an in-process bloom filter that is
+# refreshed from BlacklistedToken every SYNC_INTERVAL seconds.
+TOKEN_REVOCATION = {
+    "CAPACITY": env.int("TOKEN_REVOCATION_CAPACITY", default=100000),
+    "ERROR_RATE": 0.001,
+    "SYNC_INTERVAL": env.int("TOKEN_REVOCATION_SYNC_INTERVAL", default=5),
+    "SYNC_OVERLAP": env.int("TOKEN_REVOCATION_SYNC_OVERLAP", default=60),
+    "PURGE_INTERVAL": env.int("TOKEN_REVOCATION_PURGE_INTERVAL", default=3600),
+}
 
 EMAIL_BACKEND = env("EMAIL_BACKEND")
 EMAIL_HOST = env("EMAIL_HOST")
@@ -209,3 +317,5 @@ EMAIL_USE_TLS = env("EMAIL_USE_TLS")
 EMAIL_PORT = env("EMAIL_PORT")
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
+# Sent and failed OutboxEmail rows older than this are deleted by purge_outbox_emails.
+OUTBOX_RETENTION_DAYS = env.int("OUTBOX_RETENTION_DAYS", default=7)
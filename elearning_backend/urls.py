@@ -18,11 +18,13 @@ from django.contrib import admin
 from django.urls import path,include
 from django.conf.urls.i18n import i18n_patterns 
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from elearning_app.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("i18n/", include("django.conf.urls.i18n")),
-    path('api/',include('elearning_app.urls'))
+    path('api/',include('elearning_app.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # urlpatterns +=staticfiles_urlpatterns()